@@ -0,0 +1,141 @@
+import itertools
+import logging
+import math
+import mmap
+import time
+
+log = logging.getLogger("pwpolicylogger")
+
+
+def count_lines(path, chunk_size=1 << 24):
+    """(lines, bytes) of a file, memory-mapped and counted chunk by chunk.
+
+    Nothing but the current chunk is ever in memory, so multi-GB wordlists
+    are fine. A last line without a newline counts too.
+    """
+    with open(path, "rb") as f:
+        f.seek(0, 2)
+        size = f.tell()
+        if not size:
+            return 0, 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            lines = 0
+            for start in range(0, size, chunk_size):
+                lines += m[start : start + chunk_size].count(b"\n")
+            if m[size - 1 : size] != b"\n":
+                lines += 1
+    return lines, size
+
+
+def iter_rules(path):
+    """hashcat rules of a rules file, blank lines and comments left out."""
+    with open(path, encoding="latin-1") as f:
+        for line in f:
+            line = line.rstrip("\r\n")
+            if line.strip() and not line.startswith("#"):
+                yield line
+
+
+def log_candidates(words, rule_counts=(), log_mask_keyspace=0.0):
+    # every rules file multiplies (hashcat -r a.rule -r b.rule), a hybrid
+    # mask (-a 6/-a 7) multiplies once more
+    if not words or 0 in rule_counts:
+        return -math.inf
+    return math.log(words) + sum(map(math.log, rule_counts)) + log_mask_keyspace
+
+
+# the common single-word rule functions, enough to time candidate generation
+def _toggle(c):
+    return c.lower() if c.isupper() else c.upper()
+
+
+def _position(p):
+    return int(p, 36)
+
+
+rule_functions = {
+    ":": (0, lambda w: w),
+    "l": (0, str.lower),
+    "u": (0, str.upper),
+    "c": (0, str.capitalize),
+    "C": (0, lambda w: w[:1].lower() + w[1:].upper()),
+    "t": (0, str.swapcase),
+    "r": (0, lambda w: w[::-1]),
+    "d": (0, lambda w: w + w),
+    "f": (0, lambda w: w + w[::-1]),
+    "{": (0, lambda w: w[1:] + w[:1]),
+    "}": (0, lambda w: w[-1:] + w[:-1]),
+    "[": (0, lambda w: w[1:]),
+    "]": (0, lambda w: w[:-1]),
+    "$": (1, lambda w, x: w + x),
+    "^": (1, lambda w, x: x + w),
+    "@": (1, lambda w, x: w.replace(x, "")),
+    "T": (
+        1,
+        lambda w, n: w[: _position(n)]
+        + _toggle(w[_position(n) : _position(n) + 1])
+        + w[_position(n) + 1 :],
+    ),
+    "D": (1, lambda w, n: w[: _position(n)] + w[_position(n) + 1 :]),
+    "s": (2, lambda w, x, y: w.replace(x, y)),
+}
+
+
+def compile_rule(rule):
+    """Rule string to a list of (function, args), None if unsupported."""
+    ops = list()
+    i = 0
+    while i < len(rule):
+        op = rule[i]
+        if op == " ":
+            i += 1
+            continue
+        if op not in rule_functions:
+            return None
+        nargs, fn = rule_functions[op]
+        args = rule[i + 1 : i + 1 + nargs]
+        if len(args) != nargs:
+            return None
+        ops.append((fn, args))
+        i += 1 + nargs
+    return ops
+
+
+def apply_rule(ops, word):
+    for fn, args in ops:
+        word = fn(word, *args)
+    return word
+
+
+def sample_words(path, limit):
+    """Up to limit words from the start of a wordlist, streamed."""
+    words = list()
+    with open(path, "rb") as f:
+        for line in f:
+            if len(words) >= limit:
+                break
+            words.append(line.rstrip(b"\r\n").decode("latin-1"))
+    return words
+
+
+def cpu_candidate_rate(wordlist, rules=(), sample=200000, max_rules=1000):
+    """Candidates per second one CPU core generates from a wordlist sample.
+
+    Applies (at most max_rules of) the supported rules to the first words
+    of the wordlist, about sample candidates in total. Returns (rate,
+    share of the rules that could be timed).
+    """
+    compiled = [compile_rule(r) for r in itertools.islice(rules, max_rules)] or [[]]
+    supported = [ops for ops in compiled if ops is not None]
+    if not supported:
+        return None, 0.0
+    words = sample_words(wordlist, max(1, sample // len(supported)))
+    generated = 0
+    start = time.perf_counter()
+    for ops in supported:
+        for word in words:
+            apply_rule(ops, word)
+        generated += len(words)
+    elapsed = time.perf_counter() - start
+    rate = generated / elapsed if elapsed > 0 else math.inf
+    return rate, len(supported) / len(compiled)
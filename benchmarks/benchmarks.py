@@ -1,97 +1,29 @@
 from requests_cache import CachedSession
 import logging
 from datetime import timedelta
-from collections import defaultdict
 from bs4 import BeautifulSoup
-from utils import normalize_device
+from fetch import fetch_all
+from benchmarks.hashcat import iter_hashcat_benchmark
 
 log = logging.getLogger("pwpolicylogger")
 
 
-def consolidate_stats(stat_list):
-    total_stats = defaultdict(list)
-    for x in stat_list:
-        for source in x:
-            for dev in x[source]:
-                if normalize_device(dev):
-                    total_stats[normalize_device(dev)].append(x[source][dev])
-    # should be avg here, but can't be bothered rn
-    for x in total_stats:
-        total_stats[x] = total_stats[x][0]
-    return total_stats
+def consolidate_stats(benchmark):
+    """Aggregate all samples per (device, hashmode) in a single groupby.
 
-
-def parse_hashcat_benchmark(benchmark):
-    no_devices = 16  # Ugly, but should be enough
-    errors = [
-        "CUDA SDK Toolkit installation NOT detected or incorrectly installed.",
-        "WARNING",
-    ]
-    states = ["devices", "hashmode", "speed"]
-    state = "devices"
-    hashmode = ""
-    devices = dict()
-    speeds = dict()
-    stats = dict()
-    lines = benchmark.splitlines()
-    counter = 0
-    unit_table = {
-        "H/s": 1,
-        "kH/s": 1000,
-        "MH/s": 1000000,
-        "GH/s": 1000000000,
-    }
-    while counter < len(lines):
-        line = lines[counter]
-        if state == "devices":
-            moved = False
-            for i in range(1, no_devices + 1):
-                line = lines[counter]
-                if line.startswith(f"* Device #{i}") and all(
-                    [error not in line for error in errors]
-                ):
-                    devices[i] = line.split(":")[1].split(",")[0].strip()
-                    counter += 1
-                    if counter >= len(lines):
-                        break
-                    moved = True
-                else:
-                    break
-            if moved:
-                state = "hashmode"
-        elif state == "hashmode":
-            if line.startswith("Hashmode: "):
-                hashmode = line.split(":")[1].split("-")[0].strip()
-                state = "speed"
-            elif line.startswith("* Hash-Mode"):
-                hashmode = line.split(" ")[2]
-                state = "speed"
-        elif state == "speed":
-            speeds = dict()
-            moved = False
-            for i in range(1, no_devices + 1):
-                line = lines[counter]
-                if line.startswith(f"Speed.#{i}") or line.startswith(f"Speed.Dev.#{i}"):
-                    raw_speed, unit = (
-                        line.split(":")[1].split("(")[0].strip().split(" ")
-                    )
-                    speeds[i] = float(raw_speed) * unit_table[unit]
-                    counter += 1
-                    if counter >= len(lines):
-                        break
-                    moved = True
-                else:
-                    break
-            if moved:
-                stats[hashmode] = speeds
-                state = "hashmode"
-        counter += 1
-    more_stats = dict()
-    for i in devices:
-        more_stats[devices[i] + " #" + str(i)] = {
-            hashmode: stats[hashmode][i] for hashmode in stats
-        }
-    return more_stats
+    benchmark is a DataFrame with device, hashmode and speed columns and the
+    devices already normalized (see utils.load_frames), unknown ones are
+    dropped. Returns one row per (device, hashmode) with the sample count,
+    mean, median, p10, p90 and max speed.
+    """
+    # speeds may be stored as float32, the stats are computed in float64
+    benchmark = benchmark.dropna(subset=["device"]).astype({"speed": "float64"})
+    grouped = benchmark.groupby(["device", "hashmode"], observed=True)
+    consolidated = grouped["speed"].agg(["count", "mean", "median", "max"])
+    quantiles = grouped["speed"].quantile([0.1, 0.9]).unstack()
+    consolidated["p10"] = quantiles[0.1]
+    consolidated["p90"] = quantiles[0.9]
+    return consolidated.rename(columns={"count": "samples"}).reset_index()
 
 
 class GistScraper:
@@ -102,9 +34,13 @@ class GistScraper:
         base_url="https://api.github.com",
         cache_name="./benchmarks/gh_cache",
         backend="sqlite",
+        workers=4,
+        rate=5,
     ):
         log.info("Init github gist session...")
         self.base_url = base_url
+        self.workers = workers
+        self.rate = rate
         self.gist_session = CachedSession(
             cache_name=cache_name,
             backend=backend,
@@ -127,19 +63,21 @@ class GistScraper:
             for f in gist["files"]
             if "benchmark" in gist["description"].lower()
         ]
-        self.benchmarks = list()
-        for link in links:
-            try:
-                raw_bm = self.gist_session.get(link).text
-            except Exception as e:
-                log.error(f"Bad scrape of {link} - {e}")
-            self.benchmarks.append(raw_bm)
+        # parse in the workers as well, failed scrapes come back as None
+        # and every benchmark is a list of (device, hashmode, speed) rows
+        self.benchmarks = fetch_all(
+            self.gist_session,
+            links,
+            handler=lambda r: list(iter_hashcat_benchmark(r.text)),
+            workers=self.workers,
+            rate=self.rate,
+        )
         full_stats = dict()
         counter = 0
-        for bm in self.benchmarks:
+        for rows in self.benchmarks:
             counter += 1
-            stats = parse_hashcat_benchmark(bm)
-            full_stats[f"gist_bm_{counter}"] = stats
+            if rows is not None:
+                full_stats[f"gist_bm_{counter}"] = rows
         return full_stats
 
 
@@ -151,9 +89,13 @@ class OHCScraper:
         base_url="https://onlinehashcrack.com",
         cache_name="./benchmarks/ohc_cache",
         backend="sqlite",
+        workers=4,
+        rate=5,
     ):
         log.info("Init onlinehashcrack session...")
         self.base_url = base_url
+        self.workers = workers
+        self.rate = rate
         self.ohc_session = CachedSession(
             cache_name=cache_name,
             backend=backend,
@@ -176,23 +118,24 @@ class OHCScraper:
         links = [
             x["href"] for x in text.find_all("a") if x.string == "Full benchmark here"
         ]
-        self.benchmarks = list()
-        for link in links:
-            try:
-                raw_bm = self.scrape_benchmark(link)
-            except Exception as e:
-                log.error(f"Bad scrape of {link} - {e}")
-            self.benchmarks.append(raw_bm)
+        self.benchmarks = fetch_all(
+            self.ohc_session,
+            links,
+            handler=lambda r: list(
+                iter_hashcat_benchmark(self.parse_benchmark_page(r))
+            ),
+            workers=self.workers,
+            rate=self.rate,
+        )
         full_stats = dict()
         counter = 0
-        for bm in self.benchmarks:
+        for rows in self.benchmarks:
             counter += 1
-            stats = parse_hashcat_benchmark(bm)
-            full_stats[f"ohc_bm_{counter}"] = stats
+            if rows is not None:
+                full_stats[f"ohc_bm_{counter}"] = rows
         return full_stats
 
-    def scrape_benchmark(self, link):
-        text_r = self.ohc_session.get(link)
+    def parse_benchmark_page(self, text_r):
         text = BeautifulSoup(text_r.text, "html.parser")
         pre = (
             text.find("div", {"class": "entry-content notopmargin"}).find("pre").string
@@ -0,0 +1,69 @@
+import io
+import re
+from collections import defaultdict
+
+DEVICE_RE = re.compile(r"^\* Device #(\d+): ([^,]+)")
+HASHMODE_RE = re.compile(r"^(?:Hashmode: (\d+)|\* Hash-Mode (\d+))")
+SPEED_RE = re.compile(r"^Speed\.(?:Dev\.)?#(\d+)\.*:\s*([\d.]+)\s*([kMGT]?H/s)")
+DEVICE_ERRORS = [
+    "CUDA SDK Toolkit installation NOT detected or incorrectly installed.",
+    "WARNING",
+    "skipped",
+]
+UNIT_TABLE = {
+    "H/s": 1,
+    "kH/s": 1000,
+    "MH/s": 1000000,
+    "GH/s": 1000000000,
+    "TH/s": 1000000000000,
+}
+
+
+def iter_hashcat_benchmark(lines):
+    """Stream (device, hashmode, speed) rows out of a hashcat --benchmark log.
+
+    lines is any iterable of str or bytes lines (open file,
+    response.iter_lines(), stdin), bytes are decoded as UTF-8, or a whole
+    string. Devices are named "<name> #<id>" as hashcat numbers
+    them, speeds are in H/s and the "#*" totals are skipped.
+    """
+    if isinstance(lines, str):
+        lines = io.StringIO(lines)
+    devices = dict()
+    hashmode = None
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode(errors="replace")
+        if hashmode is None and line.startswith("* Device #"):
+            m = DEVICE_RE.match(line)
+            if m and all(error not in line for error in DEVICE_ERRORS):
+                devices.setdefault(m.group(1), m.group(2).strip())
+            continue
+        m = HASHMODE_RE.match(line)
+        if m:
+            hashmode = m.group(1) or m.group(2)
+            continue
+        if hashmode is not None and line.startswith("Speed."):
+            m = SPEED_RE.match(line)
+            if m and m.group(1) in devices:
+                yield (
+                    f"{devices[m.group(1)]} #{m.group(1)}",
+                    hashmode,
+                    float(m.group(2)) * UNIT_TABLE[m.group(3)],
+                )
+
+
+def parse_hashcat_benchmark(benchmark):
+    stats = defaultdict(dict)
+    for device, hashmode, speed in iter_hashcat_benchmark(benchmark):
+        stats[device][hashmode] = speed
+    return dict(stats)
+
+
+def parse_benchmark_file(path):
+    """Rows of one benchmark log on disk, read line by line.
+
+    Module level so it can run in a process pool.
+    """
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return list(iter_hashcat_benchmark(f))
@@ -0,0 +1,130 @@
+import json
+import logging
+import numpy as np
+from pathlib import Path
+from profiling import stage
+from utils import save_npy, write_json
+
+log = logging.getLogger("pwpolicylogger")
+
+
+class BenchmarkStore:
+    """Columnar, hashmode-sorted copy of benchmark.csv.
+
+    Device names are stored once and referenced by small integer codes,
+    hashmodes are int32 and speeds float32. Rows are sorted by hashmode and
+    offsets[i]:offsets[i + 1] is the row group of hashmodes[i], so the
+    hashmode column isn't stored per row at all.
+    """
+
+    version = 2
+    columns = ["device_codes", "speed"]
+
+    def __init__(self, devices, hashmodes, offsets, device_codes, speed):
+        self.devices = list(devices)
+        self.hashmodes = np.asarray(hashmodes, dtype=np.int32)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.device_codes = device_codes
+        self.speed = speed
+
+    @classmethod
+    def from_csv(cls, benchmark_input_file, chunksize=1 << 20):
+        import pandas as pd
+
+        # chunked, so the full string columns are never in memory at once
+        devices = dict()
+        codes, hashmodes, speeds = list(), list(), list()
+        chunks = pd.read_csv(
+            benchmark_input_file,
+            dtype={"device": "category", "hashmode": np.int32, "speed": np.float32},
+            chunksize=chunksize,
+        )
+        for chunk in chunks:
+            categories = chunk["device"].cat.categories
+            remap = np.array(
+                [devices.setdefault(d, len(devices)) for d in categories] + [-1]
+            )
+            codes.append(remap[chunk["device"].cat.codes.to_numpy()])
+            hashmodes.append(chunk["hashmode"].to_numpy())
+            speeds.append(chunk["speed"].to_numpy())
+        codes = np.concatenate(codes) if codes else np.empty(0, np.int64)
+        hashmodes = np.concatenate(hashmodes) if hashmodes else np.empty(0, np.int32)
+        speeds = np.concatenate(speeds) if speeds else np.empty(0, np.float32)
+
+        # missing devices get their own code past the known ones
+        code_dtype = np.min_scalar_type(len(devices))
+        codes = np.where(codes < 0, len(devices), codes).astype(code_dtype)
+        order = np.argsort(hashmodes, kind="stable")
+        modes, starts = np.unique(hashmodes[order], return_index=True)
+        return cls(
+            list(devices),
+            modes,
+            np.append(starts, len(order)),
+            codes[order],
+            speeds[order],
+        )
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def frame(self):
+        """DataFrame with device (categorical), hashmode and speed columns."""
+        import pandas as pd
+
+        codes = np.asarray(self.device_codes, dtype=np.int64)
+        codes = np.where(codes == len(self.devices), -1, codes)
+        return pd.DataFrame(
+            {
+                "device": pd.Categorical.from_codes(codes, categories=self.devices),
+                "hashmode": np.repeat(self.hashmodes, np.diff(self.offsets)),
+                "speed": np.array(self.speed),
+            }
+        )
+
+    def save(self, store_dir, key):
+        store_dir = Path(store_dir)
+        store_dir.mkdir(exist_ok=True, parents=True)
+        for name in self.columns:
+            save_npy(store_dir / f"{name}.npy", getattr(self, name))
+        manifest = {
+            "version": self.version,
+            "key": key,
+            "devices": self.devices,
+            "hashmodes": self.hashmodes.tolist(),
+            "offsets": self.offsets.tolist(),
+        }
+        # manifest goes last, like the cube
+        write_json(store_dir / "manifest.json", manifest, indent=None)
+
+    @classmethod
+    def load(cls, store_dir, key):
+        store_dir = Path(store_dir)
+        try:
+            with open(store_dir / "manifest.json") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get("version") != cls.version or manifest.get("key") != key:
+            return None
+        return cls(
+            manifest["devices"],
+            manifest["hashmodes"],
+            manifest["offsets"],
+            *(np.load(store_dir / f"{n}.npy", mmap_mode="r") for n in cls.columns),
+        )
+
+
+def load_store(benchmark_input_file, store_dir=None):
+    """The compact store of a benchmark CSV, rebuilt if the CSV changed."""
+    from cube import input_key
+
+    if store_dir is None:
+        return BenchmarkStore.from_csv(benchmark_input_file)
+    key = input_key(benchmark_input_file)
+    store = BenchmarkStore.load(store_dir, key)
+    if store is None:
+        log.info(f"Benchmark store in {store_dir} is missing or stale, rebuilding")
+        with stage("load CSV"):
+            store = BenchmarkStore.from_csv(benchmark_input_file)
+        store.save(store_dir, key)
+    return store
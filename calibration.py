@@ -0,0 +1,272 @@
+import json
+import logging
+import math
+import re
+from datetime import datetime
+from pathlib import Path
+from statistics import median
+
+log = logging.getLogger("pwpolicylogger")
+
+TIMESTAMP_RE = re.compile(r"^(\d\d:\d\d:\d\d(?:\.\d+)?)$")
+# runcat.sh echoes the hash file, then "mode file mask" before running it
+FILE_RE = re.compile(r"^(\S*hash_(\d+)_len\d+_\S+\.txt)$")
+COMMAND_RE = re.compile(r"^(\d+) (\S+\.txt) (\S+)$")
+RUN_BREAK = "---break---"
+STATUS_RUNNING = 3
+
+version = 4
+
+
+def _seconds_between(start, end):
+    t1 = datetime.strptime(start, "%H:%M:%S.%f")
+    t2 = datetime.strptime(end, "%H:%M:%S.%f")
+    # runcat.sh only logs the time of day, runs going past midnight wrap
+    return (t2 - t1).total_seconds() % 86400
+
+
+def _load_hashes(path):
+    try:
+        with open(path) as f:
+            return {line.strip() for line in f if line.strip()}
+    except OSError:
+        return set()
+
+
+def _cracked_count(target, hashes):
+    """How many of hashes hashcat cracked, None when there's no outfile.
+
+    runcat.sh cracks into <target>.cracked and then appends those to
+    cracked_answers.log next to the hash files.
+    """
+    for path in [Path(f"{target}.cracked"), target.parent / "cracked_answers.log"]:
+        if not path.exists():
+            continue
+        cracked = set()
+        with open(path, errors="replace") as f:
+            for line in f:
+                # hash:password, salted hashes have a ":" of their own
+                parts = line.rstrip("\n").split(":")
+                for i in range(1, len(parts)):
+                    if ":".join(parts[:i]) in hashes:
+                        cracked.add(":".join(parts[:i]))
+                        break
+        return len(cracked)
+    return None
+
+
+def parse_runcat_log(lines, base_dir="."):
+    """Timed runs out of a runcat.sh log like experiment/experiment_log.txt.
+
+    A run lasts from its timestamp to the next one. Only runs that left
+    some hashes uncracked went through the whole keyspace ("exhausted"),
+    which takes the cracked outfile next to the hash file (relative to
+    base_dir) to tell. Otherwise hashcat stopped at the last crack, n / (n
+    + 1) of the keyspace on average for n random passwords but anywhere
+    from 0 to all of it for a single one, so their speed is only a guess
+    and fit_factors leaves them out.
+    """
+    from policy import Policy, log_mask_keyspace
+
+    runs = list()
+    pending, current = None, None
+    for line in lines:
+        line = line.strip()
+        if line == RUN_BREAK:
+            pending, current = None, None
+            continue
+        m = FILE_RE.match(line)
+        if m:
+            pending = {"target": m.group(1), "mode": int(m.group(2))}
+            continue
+        m = TIMESTAMP_RE.match(line)
+        if m:
+            if current is not None and "mask" in current:
+                current["seconds"] = _seconds_between(current.pop("start"), m.group(1))
+                runs.append(current)
+            current, pending = pending, None
+            if current is not None:
+                current["start"] = m.group(1)
+            continue
+        m = COMMAND_RE.match(line)
+        if m and current is not None and m.group(2) == current["target"]:
+            # the mode hashcat actually ran with
+            current["mode"] = int(m.group(1))
+            current["mask"] = m.group(3)
+
+    for run in runs:
+        target = Path(base_dir) / run["target"]
+        hashes = _load_hashes(target)
+        cracked = _cracked_count(target, hashes) if hashes else None
+        mask = Policy.parse(run.pop("mask"))
+        run["length"] = len(mask.mask_charsets())
+        log_size = log_mask_keyspace(mask)
+        if cracked is not None and cracked < len(hashes):
+            run["measured"] = "exhausted"
+            log_searched = log_size
+        else:
+            run["measured"] = "cracked" if cracked is not None else "unknown"
+            n = len(hashes) or 1
+            log_searched = log_size + math.log(n / (n + 1))
+        run["keyspace (log10)"] = log_size / math.log(10)
+        run["speed"] = math.exp(log_searched - math.log(max(run["seconds"], 1e-3)))
+    return runs
+
+
+def parse_status_json(lines, mode=None):
+    """Measured speeds out of hashcat --status --status-json output.
+
+    One run per (target, start time), its speed is the median of the summed
+    device speeds while running. The hashmode comes from a runcat style
+    target name (hash_<mode>_...) or mode, the password length from a
+    _len<length>_ in it.
+    """
+    sessions = dict()
+    for line in lines:
+        line = line.strip()
+        if not line.startswith("{"):
+            continue
+        try:
+            status = json.loads(line)
+        except ValueError:
+            continue
+        if status.get("status") != STATUS_RUNNING or not status.get("devices"):
+            continue
+        key = (status.get("target", ""), status.get("time_start"))
+        session = sessions.setdefault(key, {"speeds": list(), "progress": None})
+        session["speeds"].append(sum(d.get("speed", 0) for d in status["devices"]))
+        session["progress"] = status.get("progress")
+
+    runs = list()
+    for (target, start), session in sessions.items():
+        m = re.search(r"hash_(\d+)_", Path(target).name)
+        run_mode = int(m.group(1)) if m else mode
+        m = re.search(r"_len(\d+)_", Path(target).name)
+        length = int(m.group(1)) if m else None
+        if run_mode is None:
+            log.warning(f"Unknown hashmode of the status of {target}, skipping")
+            continue
+        progress = session["progress"]
+        runs.append(
+            {
+                "target": target,
+                "mode": run_mode,
+                "length": length,
+                "keyspace (log10)": math.log10(progress[1]) if progress else None,
+                "seconds": None,
+                "measured": "status",
+                "speed": median(session["speeds"]),
+            }
+        )
+    return runs
+
+
+def parse_run_log(path, mode=None):
+    """Runs in a runcat.sh log and/or hashcat --status-json output."""
+    with open(path, errors="replace") as f:
+        lines = f.read().splitlines()
+    return parse_runcat_log(lines, Path(path).parent) + parse_status_json(lines, mode)
+
+
+def compare(cube, observations):
+    """Observed against predicted VM speed of every observation.
+
+    The prediction is the VM speed calc prices with (cube.vm_speed), throughput
+    model included, so the factors only cover what that model gets wrong.
+    Runs without a known password length count as optimized kernel runs.
+    Observations whose SKU or hashmode the cube doesn't know are left out.
+    """
+    sku_index = {s: i for i, s in enumerate(cube.skus)}
+    mode_index = {m: i for i, m in enumerate(cube.hashmodes.tolist())}
+    rows = list()
+    for obs in observations:
+        if obs["sku"] not in sku_index or obs["mode"] not in mode_index:
+            log.warning(
+                f"No prediction for mode {obs['mode']} on {obs['sku']}, skipping {obs['target']}"
+            )
+            continue
+        s = sku_index[obs["sku"]]
+        predicted = cube.vm_speed(mode_index[obs["mode"]], obs.get("length") or 0)[s]
+        if not predicted > 0:
+            continue
+        rows.append(
+            {
+                **obs,
+                "device": str(cube.devices[cube.sku_device[s]]),
+                "predicted speed": float(predicted),
+                "efficiency": obs["speed"] / float(predicted),
+            }
+        )
+    return rows
+
+
+# runs whose speed hashcat measured, the rest only timed a first crack
+fit_measures = {"exhausted", "status"}
+
+
+def fit_factors(rows, min_samples=3, max_ratio=5.0):
+    """Per-device, per-hashmode efficiency, the geometric mean of observed /
+    predicted. {device: {mode: factor...}}, a V100 factor says nothing
+    about an A100.
+
+    Only measured runs (see fit_measures) count, ratios further than
+    max_ratio from 1 either way are treated as broken runs, and a hashmode
+    needs min_samples of what's left to get a factor. Marks every row
+    with whether it was used.
+    """
+    by_mode = dict()
+    for row in rows:
+        ratio = row["efficiency"]
+        row["used"] = (
+            row.get("measured") in fit_measures and 1 / max_ratio <= ratio <= max_ratio
+        )
+        if row.get("measured") in fit_measures and not row["used"]:
+            log.warning(
+                f"Efficiency {ratio:.3g} of {row['target']} is implausible, skipping it"
+            )
+        if row["used"]:
+            by_mode.setdefault((row["device"], row["mode"]), list()).append(ratio)
+
+    factors = dict()
+    for (device, mode), ratios in sorted(by_mode.items()):
+        if len(ratios) < min_samples:
+            log.warning(
+                f"Only {len(ratios)} usable run(s) of mode {mode} on {device}, need {min_samples} for a factor"
+            )
+            continue
+        factors.setdefault(device, dict())[str(mode)] = {
+            "factor": math.exp(sum(map(math.log, ratios)) / len(ratios)),
+            "samples": len(ratios),
+            "min": min(ratios),
+            "max": max(ratios),
+        }
+    return factors
+
+
+def load_calibration(calibration_file):
+    empty = {"version": version, "ingested": {}, "observations": [], "factors": {}}
+    try:
+        with open(calibration_file) as f:
+            calibration = json.load(f)
+    except FileNotFoundError:
+        return empty
+    if calibration.get("version") != version:
+        log.warning(f"Ignoring {calibration_file}, it's from another version")
+        return empty
+    return calibration
+
+
+def save_calibration(calibration, calibration_file):
+    Path(calibration_file).parent.mkdir(exist_ok=True, parents=True)
+    with open(calibration_file, "w") as f:
+        json.dump(calibration, f, indent=2)
+
+
+def load_factors(calibration_file):
+    """{(device, hashmode): efficiency factor} of a calibration file."""
+    factors = load_calibration(calibration_file)["factors"]
+    return {
+        (device, int(mode)): f["factor"]
+        for device, modes in factors.items()
+        for mode, f in modes.items()
+    }
@@ -3,6 +3,7 @@ import logging
 from collections import defaultdict
 from datetime import timedelta
 from bs4 import BeautifulSoup
+from fetch import HostRateLimiter, fetch, fetch_all
 
 log = logging.getLogger("pwpolicylogger")
 
@@ -17,11 +18,17 @@ class AzureScraper:
         base_api_url="https://prices.azure.com",
         cache_name="./cloud/azure_cache",
         backend="sqlite",
+        workers=4,
+        rate=5,
+        batch_size=10,
     ):
         log.info("Init azure session...")
         self.base_url = base_doc_url
         self.api_url = base_api_url
         self.cards = cards
+        self.workers = workers
+        self.limiter = HostRateLimiter(rate)
+        self.batch_size = batch_size
         self.azure_session = CachedSession(
             cache_name=cache_name,
             backend=backend,
@@ -48,26 +55,23 @@ class AzureScraper:
         content = text.find("main")
         ul = content.find_all("ul")[1]
         links = [path + link["href"] for link in ul.find_all("a")]
+        pages = fetch_all(
+            self.azure_session,
+            [self.base_url + link for link in links],
+            handler=lambda r: self.parse_vm_details(r.text),
+            workers=self.workers,
+            limiter=self.limiter,
+        )
         self.pricing_reqs = list()
-        for link in links:
-            try:
-                log.debug(link)
-                text_r = self.azure_session.get(self.base_url + link)
-                stats = self.parse_vm_details(text_r.text)
+        for stats in pages:
+            if stats is not None:
                 self.pricing_reqs += stats
-            except Exception as e:
-                log.error(f"Bad scrape of {link} - {e}")
+
+        offers = self.fetch_offers(sorted({x["sku"] for x in self.pricing_reqs}))
         full_data = list()
         for x in self.pricing_reqs:
             try:
-                sku = x["sku"]
-                prices = self.azure_api_session.get(
-                    self.api_url + "/api/retail/prices",
-                    params={
-                        "$filter": f"armSkuName eq '{sku}' and priceType eq 'Consumption'"
-                    },
-                ).json()
-                offer = self.parse_pricing(prices)
+                offer = self.parse_pricing({"Items": offers.get(x["sku"], [])})
                 x["price"] = offer["unitPrice"]
                 x["unit"] = offer["unitOfMeasure"]
                 full_data.append(x)
@@ -79,8 +83,54 @@ class AzureScraper:
             x["gpu_num"] = float(x["gpu_num"].split(" ")[0])
             x["price"] = x["price"] / x["gpu_num"]
 
+        # and the full table across regions and price types, also per 1 GPU
+        self.price_table = list()
+        for x in full_data:
+            for row in self.parse_price_table(offers[x["sku"]]):
+                row["sku"] = x["sku"]
+                row["gpu_type"] = x["gpu_type"]
+                row["price"] = row["price"] / x["gpu_num"]
+                self.price_table.append(row)
+
         return full_data
 
+    def fetch_offers(self, skus):
+        """Get retail prices for all skus, several per OData filter.
+
+        Returns the offers grouped by armSkuName.
+        """
+        batches = [
+            skus[i : i + self.batch_size] for i in range(0, len(skus), self.batch_size)
+        ]
+        filters = [
+            {"$filter": " or ".join(f"armSkuName eq '{sku}'" for sku in batch)}
+            for batch in batches
+        ]
+        results = fetch_all(
+            self.azure_api_session,
+            [self.api_url + "/api/retail/prices"] * len(filters),
+            handler=self.collect_pages,
+            params=filters,
+            workers=self.workers,
+            limiter=self.limiter,
+        )
+        offers = defaultdict(list)
+        for items in results:
+            for item in items or list():
+                offers[item["armSkuName"]].append(item)
+        return offers
+
+    def collect_pages(self, r):
+        data = r.json()
+        items = list(data["Items"])
+        while data.get("NextPageLink"):
+            r = fetch(
+                self.azure_api_session, data["NextPageLink"], limiter=self.limiter
+            )
+            data = r.json()
+            items += data["Items"]
+        return items
+
     def parse_vm_details(self, text_r):
         text = BeautifulSoup(text_r, "html.parser")
         content = text.find("main")
@@ -106,8 +156,45 @@ class AzureScraper:
 
     def parse_pricing(self, pricing_data):
         less_data = [
-            x for x in pricing_data["Items"] if "effectiveEndDate" not in x
-        ]  # exclude old offers
+            x
+            for x in pricing_data["Items"]
+            if "effectiveEndDate" not in x and x.get("type") == "Consumption"
+        ]  # exclude old offers and reservations
         return min(
             less_data, key=lambda x: x["unitPrice"]
         )  # hopefully they're all billed by the hour
+
+    def parse_price_table(self, items):
+        """Hourly price for every (region, price type) of one SKU.
+
+        Reservations are billed for the whole term, so they're spread over
+        its hours. Windows offers are dropped, nobody runs hashcat on those.
+        """
+        term_hours = {"1 Year": 365 * 24, "3 Years": 3 * 365 * 24}
+        best = dict()
+        for x in items:
+            if "effectiveEndDate" in x or "Windows" in x.get("productName", ""):
+                continue
+            price = x["unitPrice"]
+            if x.get("type") == "Reservation":
+                if x.get("reservationTerm") not in term_hours:
+                    continue
+                price_type = "reservation " + x["reservationTerm"].lower()
+                price = price / term_hours[x["reservationTerm"]]
+            elif x.get("type") == "DevTestConsumption":
+                price_type = "devtest"
+            elif "Spot" in x.get("meterName", ""):
+                price_type = "spot"
+            elif "Low Priority" in x.get("meterName", ""):
+                price_type = "low priority"
+            else:
+                price_type = "consumption"
+            key = (x["armRegionName"], price_type)
+            if key not in best or price < best[key]["price"]:
+                best[key] = {
+                    "region": key[0],
+                    "price_type": price_type,
+                    "price": price,
+                    "unit": "1 Hour",
+                }
+        return list(best.values())
@@ -0,0 +1,210 @@
+import base64
+import hashlib
+import itertools
+import json
+import logging
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from utils import charset_chars
+
+log = logging.getLogger("pwpolicylogger")
+
+# the experiment gen-experiment has always generated, one password per cell
+default_spec = {
+    "scrypt": {"n": 1024, "r": 1, "p": 1},
+    "experiments": [
+        {"mode": 0, "len": 8, "charset": "ascii_printable", "dir": "full"},
+        {"mode": 0, "len": 11, "charset": "lowercase", "dir": "full"},
+        {
+            "mode": [100, 1400, 1410, 1700],
+            "len": 7,
+            "charset": "ascii_printable",
+            "dir": "full",
+        },
+        {"mode": 8900, "len": 5, "charset": "ascii_printable", "dir": "full"},
+        {"mode": 0, "len": 4, "charset": "ascii_printable", "dir": "halved"},
+        {"mode": 0, "len": 5, "charset": "lowercase", "dir": "halved"},
+        {
+            "mode": [100, 1400, 1410, 1700],
+            "len": 3,
+            "charset": "ascii_printable",
+            "dir": "halved",
+        },
+        {"mode": 8900, "len": 2, "charset": "ascii_printable", "dir": "halved"},
+    ],
+}
+
+# hashmode -> (hashlib function, salted), salted ones are hash($pass.$salt)
+hash_functions = {
+    0: ("md5", False),
+    10: ("md5", True),
+    100: ("sha1", False),
+    110: ("sha1", True),
+    1400: ("sha256", False),
+    1410: ("sha256", True),
+    1700: ("sha512", False),
+    1710: ("sha512", True),
+    8900: ("scrypt", True),
+}
+
+
+def _as_list(value):
+    return value if isinstance(value, list) else [value]
+
+
+def load_spec(spec_file):
+    with open(spec_file) as f:
+        return json.load(f)
+
+
+def expand_cells(spec):
+    """One cell per (mode, len, charset) of every experiment in the spec.
+
+    mode, len and charset can each be a single value or a list, lists are
+    crossed. count (default 1) passwords are generated per cell.
+    """
+    cells = list()
+    for i, exp in enumerate(spec["experiments"]):
+        for mode, length, charset in itertools.product(
+            _as_list(exp["mode"]), _as_list(exp["len"]), _as_list(exp["charset"])
+        ):
+            if mode not in hash_functions:
+                raise ValueError(
+                    f"Experiment {i} has unsupported hashmode {mode}, "
+                    f"expected one of {list(hash_functions)}"
+                )
+            if charset not in charset_chars:
+                raise ValueError(
+                    f"Experiment {i} has unknown charset {charset}, "
+                    f"expected one of {list(charset_chars)}"
+                )
+            cells.append(
+                {
+                    "mode": mode,
+                    "len": length,
+                    "charset": charset,
+                    "count": exp.get("count", 1),
+                    "dir": exp.get("dir", "full"),
+                    "salt": exp.get("salt"),
+                }
+            )
+    return cells
+
+
+def scrypt_hash(password, salt, n, r, p):
+    """scrypt in the SCRYPT:N:r:p:salt:digest format hashcat wants."""
+    # hashlib refuses anything above 32MB by default, allow what n and r need
+    digest = hashlib.scrypt(
+        password,
+        salt=salt,
+        n=n,
+        r=r,
+        p=p,
+        dklen=32,
+        maxmem=128 * r * (n + p + 2) + (1 << 20),
+    )
+    salt_b64 = base64.b64encode(salt).decode()
+    digest_b64 = base64.b64encode(digest).decode()
+    return f"SCRYPT:{n}:{r}:{p}:{salt_b64}:{digest_b64}"
+
+
+def hash_password(mode, password, salt, scrypt_params):
+    func, salted = hash_functions[mode]
+    if func == "scrypt":
+        return scrypt_hash(password, salt, **scrypt_params)
+    if not salted:
+        return hashlib.new(func, password).hexdigest()
+    return hashlib.new(func, password + salt).hexdigest() + ":" + salt.decode()
+
+
+def chunk_path(experiment_dir, cell, chunk, chunks):
+    # runcat.sh parses mode, length and charset from the _ separated name,
+    # so the chunk number goes in a field of its own after them
+    name = "hash_{}_len{}_{}".format(
+        cell["mode"], cell["len"], cell["charset"].replace("_", "-")
+    )
+    if chunks > 1:
+        name += f"_{chunk:05d}"
+    return Path(experiment_dir) / cell["dir"] / f"{name}.txt"
+
+
+def hash_batch(task):
+    """Hash count random passwords of a cell, returns (hashes, answers) text."""
+    cell, count, seed, scrypt_params = task
+    # urandom seeded unless the run is meant to be reproducible
+    rng = random.Random(seed)
+    chars = charset_chars[cell["charset"]]
+    hashes, answers = list(), list()
+    for _ in range(count):
+        password = "".join(rng.choices(chars, k=cell["len"])).encode()
+        if cell["salt"] is not None:
+            salt = cell["salt"].encode()
+        elif cell["mode"] == 8900:
+            salt = rng.randbytes(16)
+        else:
+            salt = rng.randbytes(4).hex().encode()
+        h = hash_password(cell["mode"], password, salt, scrypt_params)
+        hashes.append(h + "\n")
+        answers.append(f"{h}:{password.decode()}\n")
+    return "".join(hashes), "".join(answers)
+
+
+def batch_size(cell, chunk_size):
+    # scrypt is slow enough that a chunk would keep one worker busy for ages
+    return min(chunk_size, 64 if cell["mode"] == 8900 else 10000)
+
+
+def plan_batches(cells, experiment_dir, chunk_size, scrypt_params, seed=None):
+    """(path, batch task) pairs, batches of a chunk are consecutive."""
+    for i, cell in enumerate(cells):
+        chunks = max(1, -(-cell["count"] // chunk_size))
+        size = batch_size(cell, chunk_size)
+        for j in range(chunks):
+            path = chunk_path(experiment_dir, cell, j, chunks)
+            count = min(chunk_size, cell["count"] - j * chunk_size)
+            for k, start in enumerate(range(0, max(count, 1), size)):
+                batch_seed = None if seed is None else f"{seed}:{i}:{j}:{k}"
+                task = (cell, min(size, count - start), batch_seed, scrypt_params)
+                yield path, task
+
+
+def generate(spec, experiment_dir, chunk_size=100000, workers=None, seed=None):
+    """Generate the password/hash corpus of a spec into experiment_dir.
+
+    Passwords are hashed in batches in a process pool, the hashes are
+    streamed into chunk files of chunk_size and the answers into one
+    answers.log per output directory. Returns the number of passwords per
+    directory.
+    """
+    scrypt_params = dict(default_spec["scrypt"], **spec.get("scrypt", {}))
+    cells = expand_cells(spec)
+    batches = list(plan_batches(cells, experiment_dir, chunk_size, scrypt_params, seed))
+    workers = workers or os.cpu_count()
+
+    answer_files = dict()
+    counts = dict()
+    chunk_file = None
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(hash_batch, [task for _, task in batches])
+            for (path, task), (hashes, answers) in zip(batches, results):
+                if chunk_file is None or chunk_file.name != str(path):
+                    if chunk_file is not None:
+                        chunk_file.close()
+                    path.parent.mkdir(exist_ok=True, parents=True)
+                    chunk_file = open(path, "w")
+                dname = task[0]["dir"]
+                if dname not in answer_files:
+                    answer_files[dname] = open(path.parent / "answers.log", "w")
+                    counts[dname] = 0
+                chunk_file.write(hashes)
+                answer_files[dname].write(answers)
+                counts[dname] += task[1]
+                log.debug(f"{counts[dname]} passwords in {dname} so far")
+    finally:
+        for f in [chunk_file, *answer_files.values()]:
+            if f is not None:
+                f.close()
+    return counts
@@ -0,0 +1,660 @@
+import numpy as np
+import json
+from keyspace import (
+    cost_time,
+    from_log,
+    keyspace_cost_time,
+    log_keyspace,
+    size_cost_time,
+)
+from utils import calculate_policy_size, save_npy, write_json
+from profiling import stage
+from throughput import ThroughputModel
+import logging
+from pathlib import Path
+
+log = logging.getLogger("pwpolicylogger")
+
+
+class CostCube:
+    """Device x hashmode speed matrix joined with per-SKU prices.
+
+    The speed matrix keeps the best known speed for each (device, hashmode),
+    which is exactly what the idxmin over the merged table used to pick.
+    The stats matrices (samples, p10, median, p90) have the same shape and
+    give the error bars.
+    """
+
+    arrays = ["hashmodes", "speed", "sku_device", "price", "gpus"]
+    stat_names = ["samples", "mean", "median", "p10", "p90"]
+    version = 4
+
+    def __init__(
+        self,
+        devices,
+        hashmodes,
+        speed,
+        skus,
+        sku_device,
+        price,
+        units,
+        hashmode_map=None,
+        regions=None,
+        stats=None,
+        gpus=None,
+        throughput=None,
+    ):
+        self.devices = np.asarray(devices, dtype=object)
+        self.hashmodes = np.asarray(hashmodes, dtype=np.int64)
+        self.speed = np.asarray(speed, dtype=np.float64)
+        self.skus = np.asarray(skus, dtype=object)
+        self.sku_device = np.asarray(sku_device, dtype=np.int64)
+        self.price = np.asarray(price, dtype=np.float64)
+        self.units = np.asarray(units, dtype=object)
+        self.hashmode_map = hashmode_map or dict()
+        self.regions = None if regions is None else np.asarray(regions, dtype=object)
+        # GPUs per VM, prices are always per GPU
+        self.gpus = np.ones(len(self.skus)) if gpus is None else np.asarray(gpus, float)
+        # share of the benchmark speed a GPU of each SKU really gets
+        self.throughput = throughput or ThroughputModel()
+        self.efficiency = self.throughput.gpu_efficiency(self.gpus)
+        if stats is None:
+            # a single sample per cell, for cubes built from bare speeds
+            stats = {name: self.speed for name in self.stat_names}
+            stats["samples"] = (~np.isnan(self.speed)).astype(np.int64)
+        self.stats = stats
+
+    @classmethod
+    def from_frames(cls, benchmark, azure_data, hashmode_map=None):
+        from benchmarks.benchmarks import consolidate_stats
+
+        # benchmark devices are expected to be normalized already
+        devices = sorted(set(azure_data["device"].dropna()))
+        dev_index = {d: i for i, d in enumerate(devices)}
+        known = benchmark.loc[benchmark["device"].isin(dev_index)]
+        with stage("merge"):
+            consolidated = consolidate_stats(known)
+        hashmodes = np.sort(consolidated["hashmode"].unique()).astype(np.int64)
+
+        rows = consolidated["device"].astype(object).map(dev_index).to_numpy(int)
+        cols = np.searchsorted(hashmodes, consolidated["hashmode"].to_numpy())
+        matrices = dict()
+        for name in ["max"] + cls.stat_names:
+            matrices[name] = np.full((len(devices), len(hashmodes)), np.nan)
+            matrices[name][rows, cols] = consolidated[name].to_numpy()
+        matrices["samples"] = np.nan_to_num(matrices["samples"]).astype(np.int64)
+
+        return cls(
+            devices,
+            hashmodes,
+            matrices.pop("max"),
+            azure_data["sku"].to_numpy(),
+            azure_data["device"].map(dev_index).to_numpy(),
+            azure_data["price"].to_numpy(),
+            azure_data["time unit"].to_numpy(),
+            hashmode_map,
+            stats=matrices,
+            gpus=azure_data["gpus"].to_numpy() if "gpus" in azure_data else None,
+        )
+
+    def save(self, cube_dir, key):
+        cube_dir = Path(cube_dir)
+        cube_dir.mkdir(exist_ok=True, parents=True)
+        # replaced, not rewritten, other processes may have them mapped
+        for name in self.arrays:
+            save_npy(cube_dir / f"{name}.npy", getattr(self, name))
+        for name in self.stat_names:
+            save_npy(cube_dir / f"speed_{name}.npy", self.stats[name])
+        manifest = {
+            "version": self.version,
+            "key": key,
+            "devices": self.devices.tolist(),
+            "skus": self.skus.tolist(),
+            "units": self.units.tolist(),
+            "hashmode_map": self.hashmode_map,
+        }
+        # manifest goes last, a half-written cube is never considered fresh
+        write_json(cube_dir / "manifest.json", manifest, indent=None)
+
+    @classmethod
+    def load(cls, cube_dir, key):
+        """Memory-map a saved cube, or return None if it's missing or stale."""
+        cube_dir = Path(cube_dir)
+        try:
+            with open(cube_dir / "manifest.json") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get("version") != cls.version or manifest.get("key") != key:
+            return None
+        arrays = {
+            name: np.load(cube_dir / f"{name}.npy", mmap_mode="r")
+            for name in cls.arrays
+        }
+        stats = {
+            name: np.load(cube_dir / f"speed_{name}.npy", mmap_mode="r")
+            for name in cls.stat_names
+        }
+        return cls(
+            manifest["devices"],
+            arrays["hashmodes"],
+            arrays["speed"],
+            manifest["skus"],
+            arrays["sku_device"],
+            arrays["price"],
+            manifest["units"],
+            manifest["hashmode_map"],
+            stats=stats,
+            gpus=arrays["gpus"],
+        )
+
+    def mode_frame(self, mode_idx):
+        """Rows of the merged table for one hashmode (an index into hashmodes).
+
+        Only reads that hashmode's column of the (memory-mapped) speeds, so
+        nothing the size of the whole table gets built.
+        """
+        import pandas as pd
+
+        speed = self.speed[self.sku_device, mode_idx] * self.efficiency
+        sku_idx = np.flatnonzero(~np.isnan(speed))
+        return pd.DataFrame(
+            {
+                "device": self.devices[self.sku_device[sku_idx]],
+                "hashmode": np.full(len(sku_idx), self.hashmodes[mode_idx]),
+                "speed": speed[sku_idx],
+                "sku": self.skus[sku_idx],
+                "price": self.price[sku_idx],
+                "time unit": self.units[sku_idx],
+            }
+        )
+
+    def mode_frames(self):
+        """Per-hashmode merged tables, built when first asked for."""
+        return ModeFrames(self)
+
+    def with_prices(self, prices):
+        """Same speeds, priced by (skus, devices, regions, price, units) instead.
+
+        Rows for devices without benchmarks are dropped.
+        """
+        skus, devices, regions, price, units = prices
+        dev_index = {d: i for i, d in enumerate(self.devices)}
+        sku_gpus = dict(zip(self.skus, self.gpus))
+        known = np.array([d in dev_index for d in devices], dtype=bool)
+        if not known.all():
+            log.warning(f"No benchmarks for {sorted(set(devices[~known]))}, skipping")
+        return CostCube(
+            self.devices,
+            self.hashmodes,
+            self.speed,
+            skus[known],
+            [dev_index[d] for d in devices[known]],
+            price[known],
+            units[known],
+            self.hashmode_map,
+            regions[known],
+            self.stats,
+            [sku_gpus.get(x, 1) for x in skus[known]],
+            self.throughput,
+        )
+
+    def with_calibration(self, factors):
+        """Same cube with the speeds of a device on a hashmode scaled by
+        factors[(device, mode)].
+
+        factors are measured / benchmarked speeds (see calibration.py),
+        devices and hashmodes without one keep their benchmark speeds.
+        """
+        dev_index = {d: i for i, d in enumerate(self.devices)}
+        mode_index = {m: i for i, m in enumerate(self.hashmodes.tolist())}
+        scale = np.ones(self.speed.shape)
+        for (device, mode), factor in factors.items():
+            if device in dev_index and mode in mode_index:
+                scale[dev_index[device], mode_index[mode]] = factor
+        stats = {
+            name: m if name == "samples" else m * scale
+            for name, m in self.stats.items()
+        }
+        return CostCube(
+            self.devices,
+            self.hashmodes,
+            self.speed * scale,
+            self.skus,
+            self.sku_device,
+            self.price,
+            self.units,
+            self.hashmode_map,
+            self.regions,
+            stats,
+            self.gpus,
+            self.throughput,
+        )
+
+    def with_throughput(self, throughput):
+        """Same cube, priced with another ThroughputModel."""
+        return CostCube(
+            self.devices,
+            self.hashmodes,
+            self.speed,
+            self.skus,
+            self.sku_device,
+            self.price,
+            self.units,
+            self.hashmode_map,
+            self.regions,
+            self.stats,
+            self.gpus,
+            throughput,
+        )
+
+    def mode_index(self, modes):
+        modes = np.asarray(modes, dtype=np.int64)
+        idx = np.searchsorted(self.hashmodes, modes)
+        idx = np.minimum(idx, len(self.hashmodes) - 1)
+        missing = modes[self.hashmodes[idx] != modes]
+        if len(missing):
+            raise KeyError(f"No benchmark data for hashmode(s) {missing.tolist()}")
+        return idx
+
+    def sku_selection(self, sku):
+        if not len(self.skus):
+            raise KeyError("No priced SKUs with benchmark data")
+        if sku == "cheapest":
+            return np.arange(len(self.skus))
+        selected = np.flatnonzero(self.skus == sku)
+        if not len(selected):
+            raise KeyError(f"Unknown SKU {sku}")
+        return selected
+
+    def query(self, modes, pw_lens, charset_lens, skus):
+        """Price a batch of independent policies, one per array element.
+
+        Unlike grid, nothing is crossed - element i of every argument
+        describes query i. skus holds SKU names or "cheapest".
+        """
+        modes = np.asarray(modes, dtype=np.int64)
+        pw_lens = np.asarray(pw_lens, dtype=np.int64)
+        charset_lens = np.asarray(charset_lens, dtype=np.int64)
+        skus = np.asarray(skus, dtype=object)
+        mode_idx = self.mode_index(modes)
+        unknown = set(skus.tolist()) - set(self.skus.tolist()) - {"cheapest"}
+        if unknown:
+            raise KeyError(f"Unknown SKU(s) {sorted(unknown)}")
+
+        # (Q,) keyspaces, (S, Q) speeds, SKUs not asked for are masked out
+        speed = self.speed[self.sku_device][:, mode_idx]
+        effective = (
+            speed
+            * self.efficiency[:, None]
+            * self.throughput.kernel_efficiency(modes, pw_lens)[None, :]
+        )
+        allowed = (skus[None, :] == "cheapest") | (self.skus[:, None] == skus[None, :])
+        policy_cost, policy_time, log_cost, log_time = keyspace_cost_time(
+            charset_lens[None, :], pw_lens[None, :], effective, self.price[:, None]
+        )
+
+        masked = np.where(allowed & ~np.isnan(log_cost), log_cost, np.inf)
+        best = masked.argmin(axis=0)
+        cols = np.arange(len(modes))
+        bars = self.error_bars(
+            best,
+            mode_idx,
+            speed[best, cols],
+            policy_cost[best, cols],
+            log_cost[best, cols],
+        )
+        result = {
+            "mode": modes,
+            "pw_len": pw_lens,
+            "charset_length": charset_lens,
+            "sku": self.skus[best],
+            "device": self.devices[self.sku_device[best]],
+            "policy_cost": policy_cost[best, cols],
+            "policy_time (s)": policy_time[best, cols],
+            "policy_time (h)": policy_time[best, cols] / 3600,
+            "policy_cost (log10)": log_cost[best, cols] / np.log(10),
+            "policy_time (log10 s)": log_time[best, cols] / np.log(10),
+            **bars,
+        }
+        if self.regions is not None:
+            result["region"] = self.regions[best]
+        return result
+
+    def grid(self, modes, pw_lens, charset_lens, sku="cheapest"):
+        """Price every (mode, pw_len, charset_len) cell in one go.
+
+        Returns a dict of equally long columns, one row per cell, with the
+        cheapest SKU (or the requested one) for each cell.
+        """
+        modes = np.asarray(modes, dtype=np.int64)
+        pw_lens = np.asarray(pw_lens, dtype=np.int64)
+        charset_lens = np.asarray(charset_lens, dtype=np.int64)
+
+        # (L, C) keyspaces flattened into cells
+        size_log = log_keyspace(charset_lens[None, :], pw_lens[:, None]).ravel()
+        with np.errstate(over="ignore"):
+            size = np.power(
+                charset_lens[None, :].astype(np.float64), pw_lens[:, None]
+            ).ravel()
+        m, l, c = np.meshgrid(
+            np.arange(len(modes)),
+            np.arange(len(pw_lens)),
+            np.arange(len(charset_lens)),
+            indexing="ij",
+        )
+        # (M, L) kernel factors, the same for every charset of a length
+        kernel = np.repeat(
+            self.throughput.kernel_efficiency(modes[:, None], pw_lens[None, :]),
+            len(charset_lens),
+            axis=1,
+        )
+        return {
+            "mode": modes[m].ravel(),
+            "pw_len": pw_lens[l].ravel(),
+            "charset_length": charset_lens[c].ravel(),
+            **self.cheapest(modes, size_log, size, sku, kernel),
+        }
+
+    def price_keyspaces(self, modes, size_log, sku="cheapest"):
+        """Like grid, but for arbitrary keyspaces given as natural logs.
+
+        One row per (mode, keyspace) with modes varying slowest.
+        """
+        modes = np.asarray(modes, dtype=np.int64)
+        size_log = np.asarray(size_log, dtype=np.float64)
+        m, k = np.meshgrid(
+            np.arange(len(modes)), np.arange(len(size_log)), indexing="ij"
+        )
+        return {
+            "mode": modes[m].ravel(),
+            "keyspace (log10)": (size_log / np.log(10))[k].ravel(),
+            **self.cheapest(modes, size_log, from_log(size_log), sku),
+        }
+
+    def cheapest(self, modes, size_log, size, sku="cheapest", kernel=None):
+        """Cheapest SKU (or the requested one) for every (mode, keyspace).
+
+        size_log and size are (K,) arrays of the same keyspaces, the columns
+        come back flattened from (M, K). kernel is an optional (M, K) array
+        of kernel speed factors (see ThroughputModel.kernel_efficiency).
+        """
+        mode_idx = self.mode_index(modes)
+        selected = self.sku_selection(sku)
+
+        # (S, M) speeds broadcast against (K,) keyspaces to (S, M, K)
+        speed = self.speed[self.sku_device[selected]][:, mode_idx]
+        price = self.price[selected]
+        effective = speed[:, :, None] * self.efficiency[selected][:, None, None]
+        if kernel is not None:
+            effective = effective * kernel[None]
+        with stage("enrich"):
+            policy_cost, policy_time, log_cost, log_time = size_cost_time(
+                size_log[None, None, :],
+                size[None, None, :],
+                effective,
+                price[:, None, None],
+            )
+
+        with stage("select"):
+            best = np.where(np.isnan(log_cost), np.inf, log_cost).argmin(axis=0)
+            policy_cost = np.take_along_axis(policy_cost, best[None], axis=0)[0]
+            policy_time = np.take_along_axis(policy_time, best[None], axis=0)[0]
+            log_cost = np.take_along_axis(log_cost, best[None], axis=0)[0]
+            log_time = np.take_along_axis(log_time, best[None], axis=0)[0]
+            best_sku = selected[best]
+            cell_mode = np.arange(len(mode_idx))[:, None]
+            bars = self.error_bars(
+                best_sku,
+                mode_idx[cell_mode],
+                speed[best, cell_mode],
+                policy_cost,
+                log_cost,
+            )
+
+            result = {
+                "sku": self.skus[best_sku].ravel(),
+                "device": self.devices[self.sku_device[best_sku]].ravel(),
+                "policy_cost": policy_cost.reshape(-1),
+                "policy_time (s)": policy_time.reshape(-1),
+                "policy_time (h)": (policy_time / 3600).reshape(-1),
+                "policy_cost (log10)": (log_cost / np.log(10)).reshape(-1),
+                "policy_time (log10 s)": (log_time / np.log(10)).reshape(-1),
+                **{k: v.reshape(-1) for k, v in bars.items()},
+            }
+        if self.regions is not None:
+            result["region"] = self.regions[best_sku].ravel()
+        return result
+
+    def fleet(self, mode, pw_len, charset_len):
+        """Per-VM work time and price of every SKU for one policy.
+
+        Returns (sku indices, work seconds on one VM, hourly price per VM)
+        for the SKUs that have a benchmark for mode.
+        """
+        mode_idx = self.mode_index([mode])[0]
+        size = calculate_policy_size(charset_len, pw_len)
+        vm_speed = self.vm_speed(mode_idx, pw_len)
+        known = np.flatnonzero(~np.isnan(vm_speed))
+        if not len(known):
+            raise KeyError(f"No priced SKUs with benchmark data for hashmode {mode}")
+        vm_price = self.price[known] * self.gpus[known]
+        return known, cost_time(size, vm_speed[known], vm_price)[1], vm_price
+
+    def vm_speed(self, mode_idx, pw_len):
+        """Effective speed of a whole VM of every SKU on one hashmode."""
+        kernel = self.throughput.kernel_efficiency(self.hashmodes[mode_idx], pw_len)
+        return (
+            self.speed[self.sku_device, mode_idx] * self.gpus * self.efficiency * kernel
+        )
+
+    def throughput_table(self, mode, pw_len):
+        """Effective VM speed and hashes per dollar of every SKU on mode.
+
+        Sorted by hashes per dollar, SKUs without benchmarks left out.
+        """
+        mode_idx = self.mode_index([mode])[0]
+        vm_speed = self.vm_speed(mode_idx, pw_len)
+        vm_price = self.price * self.gpus
+        known = np.flatnonzero(~np.isnan(vm_speed))
+        per_dollar = vm_speed[known] * 3600 / vm_price[known]
+        order = known[np.argsort(-per_dollar)]
+        return {
+            "sku": self.skus[order],
+            "device": self.devices[self.sku_device[order]],
+            "GPUs per VM": self.gpus[order],
+            "GPU efficiency": self.efficiency[order],
+            "VM speed (H/s)": vm_speed[order],
+            "VM price (per hour)": vm_price[order],
+            "hashes per $": vm_speed[order] * 3600 / vm_price[order],
+        }
+
+    def frontier(
+        self, mode, pw_len, charset_len, max_vms=64, overhead=300, granularity=60
+    ):
+        """Cost/time Pareto set over SKUs and fleet sizes of 1..max_vms VMs.
+
+        Every VM pays overhead seconds (provisioning, hashcat startup) on top
+        of its share of the work and is billed per started granularity
+        seconds, so more VMs finish sooner but cost a bit more.
+        """
+        skus, work, vm_price = self.fleet(mode, pw_len, charset_len)
+        vms, wall, cost = fleet_sizes(work, vm_price, max_vms, overhead, granularity)
+
+        # sort by time (then cost), a point is on the frontier if it's
+        # strictly cheaper than everything that finishes sooner. Times are
+        # compared to the second, sub-second wins aren't worth paying for
+        sku_idx, vm_idx = np.divmod(np.arange(wall.size), len(vms))
+        wall, cost = wall.ravel(), cost.ravel()
+        order = np.lexsort((cost, np.round(wall)))
+        cheapest_before = np.minimum.accumulate(
+            np.concatenate([[np.inf], cost[order][:-1]])
+        )
+        keep = order[cost[order] < cheapest_before]
+        return self.fleet_table(
+            skus[sku_idx[keep]], vms[vm_idx[keep]], wall[keep], cost[keep]
+        )
+
+    def deadline(
+        self,
+        mode,
+        pw_len,
+        charset_len,
+        deadline,
+        max_vms=64,
+        overhead=300,
+        granularity=60,
+    ):
+        """Cheapest fleet per SKU that finishes within deadline seconds.
+
+        Billing per started granularity seconds makes the cost zigzag with
+        the fleet size (a bigger fleet can round down into fewer billed
+        minutes), so every size up to max_vms is priced like in frontier.
+        Ties go to the smaller fleet. Sorted by cost, infeasible SKUs left out.
+        """
+        skus, work, vm_price = self.fleet(mode, pw_len, charset_len)
+        vms, wall, cost = fleet_sizes(work, vm_price, max_vms, overhead, granularity)
+        cost = np.where(wall <= deadline, cost, np.inf)
+
+        best = np.argmin(cost, axis=1)
+        rows = np.arange(len(skus))
+        feasible = np.isfinite(cost[rows, best])
+        rows, best = rows[feasible], best[feasible]
+        order = np.argsort(cost[rows, best], kind="stable")
+        rows, best = rows[order], best[order]
+        return self.fleet_table(
+            skus[rows], vms[best], wall[rows, best], cost[rows, best]
+        )
+
+    def fleet_table(self, sku_idx, vms, wall, cost):
+        return {
+            "sku": self.skus[sku_idx],
+            "device": self.devices[self.sku_device[sku_idx]],
+            "GPUs per VM": self.gpus[sku_idx],
+            "VMs": vms,
+            "policy_cost": cost,
+            "policy_time (s)": wall,
+            "policy_time (h)": wall / 3600,
+        }
+
+    def error_bars(self, sku_idx, mode_idx, speed, policy_cost, log_cost):
+        """Optimistic (fastest benchmark) and pessimistic (p10 speed) costs.
+
+        The cost is priced at the fastest benchmark, so that's the optimistic
+        bound and the cost always lies within the bars. Same SKU as the best
+        pick, the cost just scales with the speed. Like the cost itself they
+        come as log10 too, for policies past a float.
+        """
+        dev_idx = self.sku_device[sku_idx]
+        bars = {"samples": self.stats["samples"][dev_idx, mode_idx]}
+        bounds = [
+            ("optimistic", speed),
+            ("pessimistic", self.stats["p10"][dev_idx, mode_idx]),
+        ]
+        for name, bound in bounds:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                log_ratio = np.log(speed) - np.log(bound)
+            bars[f"policy_cost ({name})"] = np.where(
+                np.isfinite(policy_cost),
+                policy_cost * np.exp(log_ratio),
+                from_log(log_cost + log_ratio),
+            )
+            bars[f"policy_cost ({name}, log10)"] = (log_cost + log_ratio) / np.log(10)
+        return bars
+
+
+def fleet_sizes(work, vm_price, max_vms, overhead, granularity):
+    """(sizes, wall seconds, cost) of fleets of 1..max_vms VMs per SKU row."""
+    vms = np.arange(1, max_vms + 1)
+    wall = overhead + work[:, None] / vms[None, :]
+    billed = np.ceil(wall / granularity) * granularity
+    # VM-seconds first, they're whole so equal bills tie exactly
+    cost = vm_price[:, None] * (vms[None, :] * billed) / 3600
+    return vms, wall, cost
+
+
+class ModeFrames:
+    """Merged (sku x hashmode) table, one hashmode at a time.
+
+    frames[mode] builds that hashmode's rows from the cube arrays the first
+    time (see CostCube.mode_frame) instead of filtering a full merged table,
+    so processes sharing a memory-mapped cube only add the slices they use.
+    """
+
+    def __init__(self, cube):
+        self.cube = cube
+        self.frames = dict()
+
+    def __getitem__(self, mode):
+        i = self.cube.mode_index([mode])[0]
+        if i not in self.frames:
+            self.frames[i] = self.cube.mode_frame(i)
+        # a copy, enrich_cost_time adds columns to it
+        return self.frames[i].copy()
+
+    def __contains__(self, mode):
+        return mode in self.cube.hashmodes
+
+
+def input_key(*paths):
+    """Cache key of input files: resolved path and content hash, in order.
+
+    Lists rather than a dict keyed by file name, so two inputs with the same
+    name can't shadow each other (and it compares equal after a JSON trip).
+    """
+    from utils import file_sha256
+
+    return [[str(Path(path).resolve()), file_sha256(path)] for path in paths]
+
+
+def apply_models(cube, calibration_file=None, throughput_file=None):
+    """The cube with the throughput model (when the file exists) and the
+    measured efficiency factors (when asked for) applied."""
+    if throughput_file and Path(throughput_file).exists():
+        log.info(f"Applying throughput model from {throughput_file}")
+        cube = cube.with_throughput(ThroughputModel.load(throughput_file))
+    if calibration_file:
+        from calibration import load_calibration, load_factors
+
+        fitted = load_calibration(calibration_file).get("throughput")
+        if fitted is not None and fitted != vars(cube.throughput):
+            log.warning(
+                f"{calibration_file} was fitted with another throughput model, its factors are off for this one"
+            )
+        cube = cube.with_calibration(load_factors(calibration_file))
+    return cube
+
+
+def build_cube(
+    benchmark_input_file, azure_input_file, hashmode_input_file, store_dir=None
+):
+    from utils import load_frames, load_hashmode_map
+
+    benchmark, azure_data = load_frames(
+        benchmark_input_file, azure_input_file, store_dir
+    )
+    hashmode_map = load_hashmode_map(hashmode_input_file)
+    return CostCube.from_frames(benchmark, azure_data, hashmode_map)
+
+
+def load_cube(
+    benchmark_input_file,
+    azure_input_file,
+    hashmode_input_file,
+    cube_dir=None,
+    rebuild=False,
+):
+    """Load the cost cube from cube_dir, rebuilding it from the CSVs if stale."""
+    inputs = [benchmark_input_file, azure_input_file, hashmode_input_file]
+    if cube_dir is None:
+        return build_cube(*inputs)
+    with stage("hash inputs"):
+        key = input_key(*inputs)
+    with stage("load cube"):
+        cube = None if rebuild else CostCube.load(cube_dir, key)
+    if cube is None:
+        log.info(f"Cost cube in {cube_dir} is missing or stale, rebuilding")
+        with stage("build cube"):
+            cube = build_cube(*inputs, Path(cube_dir) / "benchmarks")
+            cube.save(cube_dir, key)
+    return cube
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""hashcat stand-in for trying the work queue without a GPU.
+
+Understands the -a 3 calls the work queue makes (-m, -1..-4, -o, --skip,
+--limit, --status-json), walks the chunk of the mask like hashcat splits it
+and checks every candidate with hashlib, so it's only for small masks.
+FAKE_HASHCAT_SPEED (candidates/s) slows it down, FAKE_HASHCAT_DIE is the
+chance it dies without a trace (like a VM going away) when it starts.
+
+    python3 pw_policy_cost_tool.py work --cracker "python3 experiment/fake_hashcat.py"
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from corpus import hash_functions  # noqa: E402
+from planner import amplifier_positions  # noqa: E402
+from policy import Policy  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-m", type=int, default=0)
+    parser.add_argument("-a", type=int, default=3)
+    parser.add_argument("-o")
+    parser.add_argument("-O", action="store_true")
+    for i in "1234":
+        parser.add_argument(f"-{i}", dest=f"cs{i}")
+    parser.add_argument("--skip", type=int, default=0)
+    parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--status", action="store_true")
+    parser.add_argument("--status-json", action="store_true")
+    parser.add_argument("--status-timer", type=int, default=10)
+    parser.add_argument("--potfile-disable", action="store_true")
+    parser.add_argument("--quiet", action="store_true")
+    parser.add_argument("hash_file")
+    parser.add_argument("mask")
+    args = parser.parse_args()
+
+    if random.random() < float(os.environ.get("FAKE_HASHCAT_DIE", 0)):
+        os._exit(137)
+    speed = float(os.environ.get("FAKE_HASHCAT_SPEED", 0))
+
+    func, salted = hash_functions.get(args.m, ("", False))
+    if func not in hashlib.algorithms_available:
+        print(f"Hash-mode {args.m} isn't supported by the fake", file=sys.stderr)
+        sys.exit(255)
+    with open(args.hash_file) as f:
+        targets = {line.strip() for line in f if line.strip()}
+    salts = {t.split(":", 1)[1] for t in targets} if salted else {""}
+
+    custom = {i: getattr(args, f"cs{i}") for i in "1234" if getattr(args, f"cs{i}")}
+    positions = [
+        sorted(p) for p in Policy(mask=args.mask, custom=custom).mask_charsets()
+    ]
+    amp_positions = amplifier_positions([len(p) for p in positions], args.m)
+    left, right = positions[:amp_positions], positions[amp_positions:]
+    base = math.prod(len(p) for p in right)
+    amp = math.prod(len(p) for p in left)
+    limit = args.limit or base - args.skip
+
+    found = list()
+    start = time.time()
+    last_status = start
+    for b in range(args.skip, min(base, args.skip + limit)):
+        # base index in mixed radix over the right positions
+        suffix, rest = list(), b
+        for p in reversed(right):
+            rest, i = divmod(rest, len(p))
+            suffix.append(p[i])
+        suffix = "".join(reversed(suffix))
+        for prefix in itertools.product(*left):
+            password = ("".join(prefix) + suffix).encode()
+            for salt in salts:
+                h = hashlib.new(func, password + salt.encode()).hexdigest()
+                target = f"{h}:{salt}" if salted else h
+                if target in targets:
+                    found.append(f"{target}:{password.decode()}")
+                    targets.discard(target)
+        done = b - args.skip + 1
+        if speed:
+            time.sleep(max(0, done * amp / speed - (time.time() - start)))
+        if args.status_json and time.time() - last_status >= args.status_timer:
+            last_status = time.time()
+            status = {
+                "status": 3,
+                "target": args.hash_file,
+                "progress": [done * amp, limit * amp],
+            }
+            print(json.dumps(status), flush=True)
+        if not targets:
+            break
+
+    if args.o and found:
+        with open(args.o, "a") as f:
+            f.write("\n".join(found) + "\n")
+    sys.exit(0 if found else 1)
+
+
+if __name__ == "__main__":
+    main()
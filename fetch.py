@@ -0,0 +1,94 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from requests import Request
+from profiling import stage
+
+log = logging.getLogger("pwpolicylogger")
+
+
+class HostRateLimiter:
+    """Spaces out requests to the same host by at least 1/rate seconds."""
+
+    def __init__(self, rate=None):
+        self.interval = 1 / rate if rate else 0
+        self.lock = threading.Lock()
+        self.next_slot = dict()
+
+    def wait(self, url):
+        if not self.interval:
+            return
+        host = urlsplit(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def is_cached(session, url, params=None):
+    try:
+        request = session.prepare_request(Request("GET", url, params=params))
+        return session.cache.contains(request=request)
+    except Exception:
+        return False
+
+
+def fetch(session, url, params=None, limiter=None, retries=3, backoff=1.0):
+    """GET with retries and exponential backoff on errors, 429s and 5xx."""
+    for attempt in range(retries + 1):
+        try:
+            # cache hits don't go over the wire, no need to hold them back
+            if limiter and not is_cached(session, url, params):
+                limiter.wait(url)
+            r = session.get(url, params=params)
+            if r.status_code == 429 or r.status_code >= 500:
+                r.raise_for_status()
+            return r
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = backoff * 2**attempt
+            log.warning(f"Fetch of {url} failed ({e}), retrying in {delay}s")
+            time.sleep(delay)
+
+
+def fetch_all(
+    session,
+    urls,
+    handler=None,
+    params=None,
+    workers=4,
+    rate=None,
+    retries=3,
+    backoff=1.0,
+    limiter=None,
+):
+    """Fetch urls concurrently through one (cached) session, keeping order.
+
+    handler is applied to each response in the worker thread, so parsing
+    runs in parallel too. Failed fetches are logged and come back as None.
+    params is an optional list of query params, one per url. Pass a shared
+    limiter instead of rate if the handler makes requests of its own.
+    """
+    limiter = limiter or HostRateLimiter(rate)
+    params = params or [None] * len(urls)
+
+    def work(job):
+        url, p = job
+        try:
+            with stage("scrape"):
+                r = fetch(session, url, p, limiter, retries, backoff)
+            if not handler:
+                return r
+            with stage("parse"):
+                return handler(r)
+        except Exception as e:
+            log.error(f"Bad scrape of {url} - {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return list(pool.map(work, zip(urls, params)))
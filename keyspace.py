@@ -0,0 +1,93 @@
+import math
+import numpy as np
+
+# Keyspaces are charset_len ** length, which stops fitting a float64 around
+# 95 ** 156 (and loses integer precision way before that). Sizes past that
+# are handled as natural logs, so long passphrases keep ranking and pricing
+# correctly; exact integers are only built when someone asks for them.
+
+SECONDS_LOG = math.log(3600)
+LN10 = math.log(10)
+# below this plain float division is exact enough (exp(log) would cost a
+# few ulps), above it the log is the only thing that still fits
+FLOAT_LOG_LIMIT = 690.0
+
+
+def log_keyspace(charset_len, length):
+    """ln(charset_len ** length), vectorized over arrays of both."""
+    return np.asarray(length, dtype=np.float64) * np.log(
+        np.asarray(charset_len, dtype=np.float64)
+    )
+
+
+def exact_keyspace(charset_len, length):
+    return int(charset_len) ** int(length)
+
+
+def log_size(policy_size):
+    """ln of a policy size given as an exact int or a float."""
+    if policy_size <= 0:
+        return -math.inf
+    # math.log takes arbitrarily large ints without going through float
+    return math.log(policy_size)
+
+
+def from_log(value):
+    """exp() that quietly saturates to inf for values past float range."""
+    with np.errstate(over="ignore"):
+        return np.exp(value)
+
+
+def log_cost_time(log_policy_size, speed, price):
+    """Returns (ln policy cost, ln policy time in seconds).
+
+    speed is hashes per second and price is per hour, missing (NaN) speeds
+    or prices stay NaN.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_time = log_policy_size - np.log(speed)
+        log_cost = log_time - SECONDS_LOG + np.log(price)
+    return log_cost, log_time
+
+
+def cost_time(policy_size, speed, price):
+    """(policy cost, policy time in seconds) of one policy size.
+
+    Only costs and times beyond ~1e308 themselves come out as inf.
+    """
+    size_log = log_size(policy_size)
+    if size_log < FLOAT_LOG_LIMIT:
+        policy_time = float(policy_size) / speed
+        return policy_time / 3600 * price, policy_time
+    log_cost, log_time = log_cost_time(size_log, speed, price)
+    return from_log(log_cost), from_log(log_time)
+
+
+def keyspace_cost_time(charset_len, length, speed, price):
+    """Vectorized cost_time for keyspaces charset_len ** length.
+
+    All arguments broadcast against each other. Returns (policy cost,
+    policy time in seconds, ln policy cost, ln policy time), rank by the
+    logs - they stay finite when the values themselves don't fit a float.
+    """
+    with np.errstate(over="ignore"):
+        size = np.power(np.asarray(charset_len, dtype=np.float64), length)
+    return size_cost_time(log_keyspace(charset_len, length), size, speed, price)
+
+
+def size_cost_time(size_log, size, speed, price):
+    """keyspace_cost_time for precomputed (ln size, float size) arrays."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        direct_time = size / speed
+    log_cost, log_time = log_cost_time(size_log, speed, price)
+    fits = size_log < FLOAT_LOG_LIMIT
+    policy_time = np.where(fits, direct_time, from_log(log_time))
+    policy_cost = np.where(fits, policy_time / 3600 * price, from_log(log_cost))
+    return policy_cost, policy_time, log_cost, log_time
+
+
+def approx(value, log10_value, ndigits=3):
+    """round() for printing, falls back to 10^x when value didn't fit a float."""
+    if np.isfinite(value) or not np.isfinite(log10_value):
+        return round(value, ndigits)
+    return f"~10^{log10_value:.1f}"
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Cold-start latency of the CLI.
+
+Runs each command in a fresh interpreter a few times and reports the median
+wall time, next to the import cost of the stacks calc no longer loads.
+"""
+
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import click
+
+ROOT = Path(__file__).resolve().parent.parent
+TOOL = str(ROOT / "pw_policy_cost_tool.py")
+
+COMMANDS = {
+    "--help": [TOOL, "--help"],
+    "calc": [TOOL, "calc"],
+    "calc grid": [TOOL, "calc", "--mode", "0,100,1400", "--pw-len", "6-16"],
+}
+
+# what an eager top-level import used to cost on every invocation
+HEAVY_IMPORTS = {
+    "pandas": "import pandas",
+    "scrapers": "import bs4, requests_cache",
+    "corpus": "import corpus",
+    "everything": "import pandas, bs4, requests_cache, cProfile, pstats, corpus",
+}
+
+
+def median_runtime(args, repeat):
+    runs = list()
+    for _ in range(repeat):
+        t1 = time.perf_counter()
+        subprocess.run(
+            [sys.executable] + args,
+            cwd=ROOT,
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        runs.append(time.perf_counter() - t1)
+    return statistics.median(runs)
+
+
+@click.command()
+@click.option("--repeat", help="Runs per command", type=int, default=7)
+def main(repeat):
+    """Measure CLI startup time"""
+    # warm the cost cube first so calc measures the fast path
+    median_runtime(COMMANDS["calc"], 1)
+    base = median_runtime(["-c", "pass"], repeat)
+    click.echo(f"{'python -c pass':<24}{base * 1000:8.1f} ms")
+    for name, args in COMMANDS.items():
+        click.echo(f"{name:<24}{median_runtime(args, repeat) * 1000:8.1f} ms")
+    click.echo("")
+    click.echo("Avoided import costs (on top of the bare interpreter):")
+    for name, stmt in HEAVY_IMPORTS.items():
+        t = median_runtime(["-c", stmt], repeat) - base
+        click.echo(f"{name:<24}{t * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
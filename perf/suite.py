@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""Performance regression suite.
+
+Times parsing, device normalization, the merge into the cost cube,
+enrich_cost_time and stats end-to-end on synthetic inputs of a few sizes,
+and compares the best of --repeat runs against baselines saved earlier
+on the same machine with --save-baseline (they're machine specific, so
+none are shipped). A case only counts as a regression when it's both
+--threshold relatively and --min-delta ms absolutely slower, sub-ms cases
+jitter by more than any sane relative threshold.
+"""
+
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import click
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import synthetic  # noqa: E402
+
+# hashmodes the default stats report prices
+REPORT_MODES = [0, 10, 100, 1000, 1400, 1410, 1700, 3200, 8900]
+
+
+def best_of(fn, repeat, setup=None):
+    runs = list()
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t1 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t1)
+    return min(runs)
+
+
+def parse_cases(devices, hashmodes):
+    from benchmarks.hashcat import parse_hashcat_benchmark
+
+    for n in devices:
+        text = synthetic.hashcat_output(n, hashmodes)
+        yield f"parse_hashcat_benchmark[{n} devices]", lambda t=text: (
+            parse_hashcat_benchmark(t)
+        ), None
+
+
+def table_cases(rows, hashmodes, workdir):
+    import pandas as pd
+    from cube import CostCube, load_cube
+    from reports import default_report, run_reports
+    from utils import (
+        enrich_cost_time,
+        load_frames,
+        load_hashmode_map,
+        normalize_device,
+        normalize_devices,
+    )
+
+    modes_file = str(ROOT / "data" / "modes.csv")
+    hashmode_map = load_hashmode_map(modes_file)
+    pricing_file = str(workdir / "azure.csv")
+    synthetic.write_pricing_csv(pricing_file)
+    for n in rows:
+        benchmark_file = str(workdir / f"benchmark_{n}.csv")
+        synthetic.write_benchmark_csv(benchmark_file, n, hashmodes, REPORT_MODES)
+        benchmark, azure_data = load_frames(benchmark_file, pricing_file)
+        raw = pd.read_csv(benchmark_file)["device"]
+
+        yield f"load_frames[{n} rows]", lambda f=benchmark_file: load_frames(
+            f, pricing_file
+        ), None
+        yield f"normalize_devices[{n} rows]", lambda r=raw: normalize_devices(
+            r
+        ), normalize_device.cache_clear
+        yield f"merge[{n} rows]", lambda b=benchmark: CostCube.from_frames(
+            b, azure_data, hashmode_map
+        ), None
+
+        # enrich over every sample priced on every SKU of its device
+        merged = benchmark.astype({"device": object}).merge(azure_data, on="device")
+        yield f"enrich_cost_time[{n} rows]", lambda m=merged: enrich_cost_time(
+            m, 95**8
+        ), None
+
+        cube_dir = workdir / f"cube_{n}"
+        cube_args = (benchmark_file, pricing_file, modes_file, str(cube_dir))
+        yield f"stats cold[{n} rows]", lambda a=cube_args: run_reports(
+            [default_report], a
+        ), lambda d=cube_dir: shutil.rmtree(d, ignore_errors=True)
+        load_cube(*cube_args)
+        yield f"stats warm[{n} rows]", lambda a=cube_args: run_reports(
+            [default_report], a
+        ), None
+
+
+@click.command()
+@click.option(
+    "--rows",
+    help="Benchmark CSV sizes, comma separated (10000 to 10000000)",
+    default="10000,100000,1000000",
+    show_default=True,
+)
+@click.option(
+    "--devices",
+    help="Devices in the synthetic hashcat outputs, comma separated",
+    default="1,4,16",
+    show_default=True,
+)
+@click.option("--repeat", help="Runs per benchmark, the best one counts", default=5)
+@click.option(
+    "--baseline-file",
+    type=click.Path(dir_okay=False),
+    default=str(Path(__file__).resolve().parent / "baselines.json"),
+    help="Baselines of this machine, written by --save-baseline (not in git)",
+    show_default=True,
+)
+@click.option("--save-baseline", is_flag=True, help="Store these timings as baseline")
+@click.option(
+    "--threshold",
+    help="Allowed slowdown against the baseline before failing",
+    type=float,
+    default=0.25,
+    show_default=True,
+)
+@click.option(
+    "--min-delta",
+    help="Allowed slowdown in ms on top of --threshold, so timer noise on tiny cases isn't a regression",
+    type=float,
+    default=20,
+    show_default=True,
+)
+def main(rows, devices, repeat, baseline_file, save_baseline, threshold, min_delta):
+    """Run the perf suite"""
+    rows = [int(x) for x in rows.split(",")]
+    devices = [int(x) for x in devices.split(",")]
+    hashmodes = synthetic.load_hashmodes(ROOT / "data" / "modes.csv")
+
+    baselines = dict()
+    if Path(baseline_file).exists():
+        with open(baseline_file) as f:
+            baselines = json.load(f)
+
+    results = dict()
+    regressions = list()
+    with tempfile.TemporaryDirectory() as workdir:
+        cases = list(parse_cases(devices, hashmodes))
+        cases += list(table_cases(rows, hashmodes, Path(workdir)))
+        for name, fn, setup in cases:
+            t = best_of(fn, repeat, setup)
+            results[name] = t
+            line = f"{name:<40}{t * 1000:10.2f} ms"
+            if name in baselines:
+                change = t / baselines[name] - 1
+                line += f"{baselines[name] * 1000:10.2f} ms {change:+7.1%}"
+                if change > threshold and t - baselines[name] > min_delta / 1000:
+                    regressions.append(name)
+                    line += "  REGRESSION"
+            click.echo(line)
+
+    if save_baseline:
+        baselines.update(results)
+        with open(baseline_file, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        click.echo(f"Baselines saved to {baseline_file}")
+    elif regressions:
+        click.echo(
+            f"{len(regressions)} benchmark(s) over {threshold:.0%} and {min_delta:g} ms slower"
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Synthetic inputs for the perf suite, shaped like the real data files."""
+
+import csv
+import numpy as np
+
+# raw names as they show up in benchmarks, mapped, fallback-matched and unknown
+DEVICE_NAMES = [
+    "NVIDIA GeForce RTX 4090",
+    "GeForce RTX 3090",
+    "NVIDIA GeForce RTX 3080 Ti",
+    "GeForce GTX 1080 Ti",
+    "Tesla V100-SXM2-16GB",
+    "Tesla T4",
+    "A100-SXM4-40GB",
+    "NVIDIA H100 PCIe",
+    "NVIDIA RTX A5000",
+    "NVIDIA L4",
+    "NVIDIA GeForce RTX 2070 SUPER",
+    "AMD Radeon RX 7900 XTX",
+]
+
+# the SKUs the default stats report asks for are in here
+SKUS = [
+    ("Standard_NC6s_v3", "V100", 1),
+    ("Standard_NC12s_v3", "V100", 2),
+    ("Standard_NC24s_v3", "V100", 4),
+    ("Standard_NC4as_T4_v3", "T4", 1),
+    ("Standard_NC64as_T4_v3", "T4", 4),
+    ("Standard_ND96asr_A100_v4", "A100", 8),
+]
+
+
+def load_hashmodes(modes_file):
+    with open(modes_file) as f:
+        return [int(row[0]) for row in csv.reader(f, delimiter=";") if row[0].isdigit()]
+
+
+def speeds(rng, n):
+    # log-uniform between 1 kH/s and 300 GH/s, 4 significant digits like hashcat
+    raw = 10 ** rng.uniform(3, 11.5, n)
+    digits = 10 ** (np.floor(np.log10(raw)) - 3)
+    return np.round(raw / digits) * digits
+
+
+def write_benchmark_csv(path, rows, hashmodes, cover=(), seed=0):
+    """benchmark.csv with rows samples over all hashmodes and DEVICE_NAMES.
+
+    Every device gets a sample for each hashmode in cover, so reports asking
+    for those always find data.
+    """
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    names = np.array(
+        [f"{name} #{i}" for name in DEVICE_NAMES for i in range(1, 9)], dtype=object
+    )
+    covered = len(cover) * len(DEVICE_NAMES)
+    random_rows = max(0, rows - covered)
+    pd.DataFrame(
+        {
+            "device": np.concatenate(
+                [
+                    np.repeat(names[::8], len(cover)),
+                    names[rng.integers(0, len(names), random_rows)],
+                ]
+            ),
+            "hashmode": np.concatenate(
+                [
+                    np.tile(np.asarray(cover, dtype=np.int64), len(DEVICE_NAMES)),
+                    np.asarray(hashmodes)[rng.integers(0, len(hashmodes), random_rows)],
+                ]
+            ),
+            "speed": speeds(rng, covered + random_rows),
+        }
+    ).to_csv(path, index=False)
+
+
+def write_pricing_csv(path, extra_skus=0, seed=0):
+    """azure.csv with SKUS plus extra_skus made up ones on the same devices."""
+    rng = np.random.default_rng(seed)
+    rows = [(sku, dev, rng.uniform(0.1, 4), gpus) for sku, dev, gpus in SKUS]
+    for i in range(extra_skus):
+        sku, dev, gpus = SKUS[i % len(SKUS)]
+        rows.append((f"{sku}_x{i}", dev, rng.uniform(0.1, 4), gpus))
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["sku", "device", "price", "time unit", "gpus"])
+        for sku, dev, price, gpus in rows:
+            writer.writerow([sku, dev, round(price, 4), "1 Hour", float(gpus)])
+
+
+def hashcat_output(devices, hashmodes, seed=0):
+    """A hashcat 6 --benchmark log with devices GPUs (plus a skipped CPU)."""
+    rng = np.random.default_rng(seed)
+    lines = ["hashcat (v6.2.6) starting in benchmark mode", "", "CUDA API (CUDA 12.0)"]
+    lines.append("=" * 20)
+    for i in range(1, devices + 1):
+        name = DEVICE_NAMES[(i - 1) % len(DEVICE_NAMES)]
+        lines.append(f"* Device #{i}: {name}, 23867/24217 MB, 128MCU")
+    lines.append(f"* Device #{devices + 1}: AMD EPYC 7763 64-Core Processor, skipped")
+    lines.append("")
+    for mode in hashmodes:
+        lines += ["", f"Hashmode: {mode} - Synthetic", ""]
+        for i, speed in enumerate(speeds(rng, devices), start=1):
+            lines.append(
+                f"Speed.#{i}.........: {speed / 1e6:9.1f} MH/s (12.34ms) @ Accel:64 Loops:1024 Thr:512 Vec:1"
+            )
+        if devices > 1:
+            lines.append("Speed.#*.........:   123.4 GH/s")
+    return "\n".join(lines) + "\n"
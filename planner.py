@@ -0,0 +1,171 @@
+import logging
+import math
+import shlex
+import shutil
+import subprocess
+from policy import Policy
+
+log = logging.getLogger("pwpolicylogger")
+
+# hashmodes hashcat runs outside the kernel (iterated/slow hashes), their
+# masks only get a single amplifier position
+slow_modes = {400, 500, 1800, 3200, 7400, 8900, 10000, 11600, 12500, 13400, 22000}
+
+
+def policy_masks(policy):
+    """(mask, custom charsets) pairs covering a policy.
+
+    Length policies become one mask per length over a custom charset, which
+    can't express required classes. The empty password has no mask, lengths
+    start at 1.
+    """
+    if policy.mask is not None:
+        return [(policy.mask, policy.custom)]
+    if policy.required:
+        raise ValueError(
+            f"{policy.signature} has required classes, hashcat masks can't express "
+            "that - plan masks with custom charsets instead"
+        )
+    charset = "".join(f"?{c}" for c in policy.charset)
+    return [
+        ("?1" * n, {"1": charset})
+        for n in range(max(policy.min_len, 1), policy.max_len + 1)
+    ]
+
+
+def amplifier_positions(sizes, mode):
+    """How many leftmost mask positions hashcat iterates inside the kernel."""
+    if mode in slow_modes or len(sizes) < 6:
+        positions = 1
+    elif len(sizes) == 6:
+        positions = 2
+    else:
+        positions = 2 if sizes[0] * sizes[1] > 256 else 3
+    return min(positions, len(sizes))
+
+
+def split_keyspace(sizes, mode):
+    """(base keyspace, amplifier) of a mask with sizes charsets per position.
+
+    Mirrors how hashcat splits brute-force masks: the leftmost positions are
+    the amplifier iterated inside the kernel, --skip/--limit (and
+    --keyspace) count in the remaining base keyspace.
+    """
+    n = amplifier_positions(sizes, mode)
+    return math.prod(sizes[n:]), math.prod(sizes[:n])
+
+
+def charset_args(custom):
+    return [arg for k, v in sorted(custom.items()) for arg in (f"-{k}", v)]
+
+
+def hashcat_keyspace(mode, mask, custom):
+    """Base keyspace straight from hashcat --keyspace, None without hashcat."""
+    if shutil.which("hashcat") is None:
+        return None
+    cmd = ["hashcat", "--keyspace", "-a", "3", "-m", str(mode)]
+    cmd += charset_args(custom) + [mask]
+    try:
+        out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+        return int(out.strip().splitlines()[-1])
+    except (subprocess.CalledProcessError, ValueError, IndexError):
+        log.warning(f"hashcat --keyspace failed for {mask}, estimating it")
+        return None
+
+
+def mask_jobs(policy, mode, keyspace=None):
+    """One job per mask of the policy with its base keyspace and amplifier.
+
+    keyspace is hashcat's base keyspace of the policy's only mask.
+    """
+    masks = policy_masks(policy)
+    if keyspace and len(masks) > 1:
+        raise ValueError(
+            f"{policy.signature} has {len(masks)} masks, a single keyspace "
+            "only works for a single mask"
+        )
+    jobs = list()
+    for mask, custom in masks:
+        sizes = [len(p) for p in Policy(mask=mask, custom=custom).mask_charsets()]
+        base, amp = split_keyspace(sizes, mode)
+        measured = keyspace or hashcat_keyspace(mode, mask, custom)
+        if measured:
+            # hashcat knows better, the amplifier is whatever is left over
+            amp = math.prod(sizes) // measured
+            base = measured
+        if not math.prod(sizes):
+            raise ValueError(f"{mask} allows no password")
+        jobs.append(
+            {
+                "mask": mask,
+                "custom": custom,
+                "length": len(sizes),
+                "base": base,
+                "amp": amp,
+            }
+        )
+    if not jobs:
+        raise ValueError(f"{policy.signature} allows no password")
+    return jobs
+
+
+def plan_chunks(jobs, nodes, chunk_seconds, max_chunks=100000):
+    """Split every job over nodes into --skip/--limit chunks.
+
+    nodes are dicts with a name and speeds, the VM speed (H/s) for every
+    job. Each node gets a contiguous share of a job's base keyspace
+    proportional to its speed, so they all finish together, cut into
+    chunks of about chunk_seconds.
+    """
+    plan = list()
+    for j, job in enumerate(jobs):
+        # integer weights keep the boundaries exact for any keyspace size
+        weights = [max(1, round(n["speeds"][j])) for n in nodes]
+        total = sum(weights)
+        bounds, acc = [0], 0
+        for w in weights:
+            acc += w
+            bounds.append(job["base"] * acc // total)
+        for node, lo, hi in zip(nodes, bounds, bounds[1:]):
+            units = hi - lo
+            if not units:
+                continue
+            speed = node["speeds"][j]
+            per_chunk = max(1, int(speed * chunk_seconds / job["amp"]))
+            chunks = -(-units // per_chunk)
+            if len(plan) + chunks > max_chunks:
+                raise ValueError(
+                    f"More than {max_chunks} chunks, use a longer chunk time or more nodes"
+                )
+            size = -(-units // chunks)
+            for skip in range(lo, hi, size):
+                limit = min(size, hi - skip)
+                plan.append(
+                    {
+                        "node": node["name"],
+                        "job": j,
+                        "skip": skip,
+                        "limit": limit,
+                        "seconds": limit * job["amp"] / speed,
+                    }
+                )
+    return plan
+
+
+def hashcat_args(chunk, job, mode, hash_file, optimized=True):
+    """hashcat arguments (no binary, no outfile) cracking one chunk."""
+    args = ["-O"] if optimized else []
+    args += ["-a", "3", "-m", str(mode), *charset_args(job["custom"]), hash_file]
+    return args + [
+        job["mask"],
+        "--skip",
+        str(chunk["skip"]),
+        "--limit",
+        str(chunk["limit"]),
+    ]
+
+
+def hashcat_command(chunk, job, mode, hash_file, optimized=True):
+    """runcat.sh's hashcat call, limited to a chunk of the keyspace."""
+    cmd = ["hashcat", "--quiet", "-o", f"{hash_file}.{chunk['node']}.cracked"]
+    return shlex.join(cmd + hashcat_args(chunk, job, mode, hash_file, optimized))
@@ -0,0 +1,247 @@
+import math
+import string
+import numpy as np
+
+# hashcat's built-in charsets
+builtin_charsets = {
+    "l": string.ascii_lowercase,
+    "u": string.ascii_uppercase,
+    "d": string.digits,
+    "s": " " + string.punctuation,
+    "h": "0123456789abcdef",
+    "H": "0123456789ABCDEF",
+}
+builtin_charsets["a"] = "".join(builtin_charsets[c] for c in "luds")
+builtin_charsets["b"] = "".join(chr(i) for i in range(256))
+
+# disjoint classes a length policy can draw from and require
+classes = "luds"
+class_sizes = np.array([len(builtin_charsets[c]) for c in classes])
+
+# charset names used elsewhere in the tool, as classes
+charset_classes = {
+    "numbers": "d",
+    "lowercase": "l",
+    "lowercase+uppercase": "lu",
+    "lowercase+uppercase+number": "lud",
+    "ascii_printable": "luds",
+}
+
+# every subset of the classes as a (2^K, K) membership matrix and its
+# inclusion-exclusion sign
+subsets = (np.arange(2 ** len(classes))[:, None] >> np.arange(len(classes))) & 1
+subset_signs = (-1.0) ** subsets.sum(axis=1)
+
+
+class Policy:
+    """A password policy, either length-based or a hashcat mask.
+
+    Length policies are "MIN-MAX:CLASSES[:REQUIRED]", e.g. "8-16:luds:ud" is
+    8 to 16 characters of lower/upper/digits/specials with at least one
+    upper and one digit. CLASSES can also be a charset name (lowercase...).
+    Masks are hashcat masks with optional custom charsets, like
+    "?1?l?l?l?d?d -1 ?l?u".
+    """
+
+    def __init__(
+        self, min_len=0, max_len=0, charset="", required="", mask=None, custom=None
+    ):
+        self.min_len = min_len
+        self.max_len = max_len
+        self.charset = charset
+        self.required = required
+        self.mask = mask
+        self.custom = custom or dict()
+
+    @classmethod
+    def parse(cls, spec):
+        spec = spec.strip()
+        if "?" in spec:
+            mask, *rest = spec.split()
+            if len(rest) % 2:
+                raise ValueError(f"Custom charsets come in pairs (-1 ?l?d) in {spec}")
+            custom = dict()
+            for flag, chars in zip(rest[::2], rest[1::2]):
+                if flag not in ("-1", "-2", "-3", "-4"):
+                    raise ValueError(f"Unknown custom charset {flag} in {spec}")
+                custom[flag[1]] = chars
+            return cls(mask=mask, custom=custom)
+
+        parts = spec.split(":")
+        if len(parts) not in (2, 3):
+            raise ValueError(f"Expected MIN-MAX:CLASSES[:REQUIRED], got {spec}")
+        lengths = parts[0].split("-")
+        charset = charset_classes.get(parts[1], parts[1])
+        required = parts[2] if len(parts) == 3 else ""
+        unknown = set(charset + required) - set(classes)
+        if unknown or not set(required) <= set(charset):
+            raise ValueError(
+                f"Classes must be some of {classes} and required ones allowed in {spec}"
+            )
+        min_len, max_len = int(lengths[0]), int(lengths[-1])
+        # policies that allow no password at all would price at 0
+        if min_len < 0 or max_len < min_len:
+            raise ValueError(f"Lengths must be 0 <= MIN <= MAX in {spec}")
+        if not charset:
+            raise ValueError(f"No character classes in {spec}")
+        if max_len < len(set(required)):
+            raise ValueError(
+                f"{spec} allows no password, {len(set(required))} required classes "
+                f"don't fit in {max_len} characters"
+            )
+        return cls(
+            min_len,
+            max_len,
+            "".join(c for c in classes if c in charset),
+            "".join(c for c in classes if c in required),
+        )
+
+    @property
+    def signature(self):
+        # canonical form, equal policies share it (and their cache entry)
+        if self.mask is not None:
+            custom = " ".join(f"-{k} {v}" for k, v in sorted(self.custom.items()))
+            return f"{self.mask} {custom}".strip()
+        required = f":{self.required}" if self.required else ""
+        return f"{self.min_len}-{self.max_len}:{self.charset}{required}"
+
+    def __repr__(self):
+        return f"Policy({self.signature!r})"
+
+    def mask_charsets(self):
+        """Character set of every mask position."""
+        custom = {k: expand_charset(v) for k, v in self.custom.items()}
+        positions = list()
+        i = 0
+        while i < len(self.mask):
+            if self.mask[i] == "?" and i + 1 < len(self.mask):
+                key = self.mask[i + 1]
+                if key in custom:
+                    positions.append(custom[key])
+                elif key in builtin_charsets:
+                    positions.append(set(builtin_charsets[key]))
+                elif key == "?":
+                    positions.append({"?"})
+                else:
+                    raise ValueError(f"Unknown charset ?{key} in mask {self.mask}")
+                i += 2
+            else:
+                positions.append({self.mask[i]})
+                i += 1
+        return positions
+
+    def exact_keyspace(self):
+        """Exact number of passwords the policy allows (slow for huge ones)."""
+        if self.mask is not None:
+            return math.prod(len(p) for p in self.mask_charsets())
+        size = {c: len(builtin_charsets[c]) for c in classes}
+        total = sum(size[c] for c in self.charset)
+        keyspace = 0
+        for n in range(self.min_len, self.max_len + 1):
+            # inclusion-exclusion over the required classes that are missing
+            for row in subsets:
+                left_out = [c for c, bit in zip(classes, row) if bit]
+                if not set(left_out) <= set(self.required):
+                    continue
+                keyspace += (-1) ** len(left_out) * (
+                    total - sum(size[c] for c in left_out)
+                ) ** n
+        return keyspace
+
+
+def expand_charset(chars):
+    """Characters of a custom charset like "?l?d_" (builtins expanded)."""
+    expanded = set()
+    i = 0
+    while i < len(chars):
+        if chars[i] == "?" and i + 1 < len(chars) and chars[i + 1] in builtin_charsets:
+            expanded |= set(builtin_charsets[chars[i + 1]])
+            i += 2
+        else:
+            expanded.add(chars[i])
+            i += 1
+    return expanded
+
+
+def log_length_keyspaces(min_lens, max_lens, allowed, required):
+    """ln keyspace of many length policies at once.
+
+    min_lens and max_lens are (P,) arrays, allowed and required (P, K)
+    0/1 matrices over classes. For every length n the share of the
+    total ** n passwords that has all required classes comes from
+    inclusion-exclusion over (P, 2^K, L), then the lengths are summed up
+    with a logsumexp so nothing overflows.
+    """
+    min_lens = np.asarray(min_lens, dtype=np.int64)
+    max_lens = np.asarray(max_lens, dtype=np.int64)
+    allowed = np.asarray(allowed, dtype=np.float64)
+    required = np.asarray(required, dtype=np.float64)
+    lengths = np.arange(max_lens.max() + 1 if len(max_lens) else 1)
+
+    total = allowed @ class_sizes
+    # subsets that only leave out required classes take part
+    usable = (subsets[None, :, :] <= required[:, None, :]).all(axis=2)
+    left = total[:, None] - subsets @ class_sizes
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(total[:, None] > 0, left / total[:, None], 0)
+        share = np.sum(
+            np.where(usable, subset_signs, 0)[:, :, None]
+            * ratio[:, :, None] ** lengths[None, None, :],
+            axis=1,
+        )
+        in_range = (lengths[None, :] >= min_lens[:, None]) & (
+            lengths[None, :] <= max_lens[:, None]
+        )
+        terms = np.where(
+            in_range & (share > 0),
+            lengths[None, :] * np.log(total)[:, None] + np.log(share),
+            -np.inf,
+        )
+        top = terms.max(axis=1)
+        safe_top = np.where(np.isfinite(top), top, 0)
+        return safe_top + np.log(np.exp(terms - safe_top[:, None]).sum(axis=1))
+
+
+def log_mask_keyspace(policy):
+    return float(sum(math.log(len(p)) for p in policy.mask_charsets()))
+
+
+# ln keyspace per policy signature, filled in bulk by log_keyspaces
+_keyspace_cache = dict()
+
+
+def log_keyspaces(policies):
+    """ln keyspace of every policy, computed in one go for the uncached ones."""
+    signatures = [p.signature for p in policies]
+    todo = dict()
+    for p, sig in zip(policies, signatures):
+        if sig not in _keyspace_cache:
+            todo.setdefault(sig, p)
+
+    lengths = [p for p in todo.values() if p.mask is None]
+    if lengths:
+        values = log_length_keyspaces(
+            [p.min_len for p in lengths],
+            [p.max_len for p in lengths],
+            [[c in p.charset for c in classes] for p in lengths],
+            [[c in p.required for c in classes] for p in lengths],
+        )
+        _keyspace_cache.update(zip((p.signature for p in lengths), values))
+    for p in todo.values():
+        if p.mask is not None:
+            _keyspace_cache[p.signature] = log_mask_keyspace(p)
+    return np.array([_keyspace_cache[sig] for sig in signatures], dtype=np.float64)
+
+
+def load_policies(policy_file):
+    """Policy specs from a file, one per line ("name,spec" or just spec)."""
+    policies = dict()
+    with open(policy_file) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            name, comma, spec = line.partition(",")
+            spec = spec if comma else name
+            policies[name] = Policy.parse(spec)
+    return policies
@@ -0,0 +1,139 @@
+import csv
+import json
+import logging
+import numpy as np
+from pathlib import Path
+from utils import save_npy, write_json
+
+log = logging.getLogger("pwpolicylogger")
+
+
+class PriceIndex:
+    """Per-GPU prices grouped by (price type, region) for O(1) lookups.
+
+    Rows are sorted by price type, region and price, and every group is a
+    contiguous slice. The "*" region holds the cheapest region per SKU, so
+    "cheapest anywhere" is a lookup as well.
+    """
+
+    version = 1
+
+    def __init__(self, skus, devices, regions, price_types, price, units, groups):
+        self.skus = np.asarray(skus, dtype=object)
+        self.devices = np.asarray(devices, dtype=object)
+        self.regions = np.asarray(regions, dtype=object)
+        self.price_types = np.asarray(price_types, dtype=object)
+        self.price = np.asarray(price, dtype=np.float64)
+        self.units = np.asarray(units, dtype=object)
+        self.groups = groups
+
+    @classmethod
+    def from_csv(cls, pricing_input_file):
+        rows = list()
+        cheapest = dict()
+        with open(pricing_input_file) as f:
+            for row in csv.DictReader(f):
+                row["price"] = float(row["price"])
+                rows.append(row)
+                key = (row["price type"], row["sku"])
+                if key not in cheapest or row["price"] < cheapest[key]["price"]:
+                    cheapest[key] = row
+        rows += [dict(row, **{"group region": "*"}) for row in cheapest.values()]
+        rows.sort(
+            key=lambda r: (
+                r["price type"],
+                r.get("group region", r["region"]),
+                r["price"],
+            )
+        )
+
+        groups = dict()
+        for i, row in enumerate(rows):
+            key = cls.group_key(
+                row["price type"], row.get("group region", row["region"])
+            )
+            groups.setdefault(key, [i, i])[1] = i + 1
+        return cls(
+            [r["sku"] for r in rows],
+            [r["device"] for r in rows],
+            [r["region"] for r in rows],
+            [r["price type"] for r in rows],
+            [r["price"] for r in rows],
+            [r["time unit"] for r in rows],
+            groups,
+        )
+
+    @staticmethod
+    def group_key(price_type, region):
+        return f"{price_type}|{region}"
+
+    def lookup(self, price_type="consumption", region="*"):
+        """Return (skus, devices, regions, prices, units) for one group."""
+        key = self.group_key(price_type, region)
+        if key not in self.groups:
+            raise KeyError(f"No {price_type} prices for region {region}")
+        start, end = self.groups[key]
+        return (
+            self.skus[start:end],
+            self.devices[start:end],
+            self.regions[start:end],
+            self.price[start:end],
+            self.units[start:end],
+        )
+
+    def save(self, index_dir, key):
+        index_dir = Path(index_dir)
+        index_dir.mkdir(exist_ok=True, parents=True)
+        save_npy(index_dir / "price.npy", self.price)
+        manifest = {
+            "version": self.version,
+            "key": key,
+            "skus": self.skus.tolist(),
+            "devices": self.devices.tolist(),
+            "regions": self.regions.tolist(),
+            "price_types": self.price_types.tolist(),
+            "units": self.units.tolist(),
+            "groups": self.groups,
+        }
+        # manifest goes last, like the cube
+        write_json(index_dir / "manifest.json", manifest, indent=None)
+
+    @classmethod
+    def load(cls, index_dir, key):
+        index_dir = Path(index_dir)
+        try:
+            with open(index_dir / "manifest.json") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get("version") != cls.version or manifest.get("key") != key:
+            return None
+        return cls(
+            manifest["skus"],
+            manifest["devices"],
+            manifest["regions"],
+            manifest["price_types"],
+            np.load(index_dir / "price.npy", mmap_mode="r"),
+            manifest["units"],
+            manifest["groups"],
+        )
+
+
+def load_prices(pricing_input_file, cube_dir=None):
+    """Load the price index next to the cost cube, rebuilding it if stale."""
+    from cube import input_key
+
+    if not Path(pricing_input_file).exists():
+        raise FileNotFoundError(
+            f"Pricing table {pricing_input_file} not found, run get-cloud-data first"
+        )
+    if cube_dir is None:
+        return PriceIndex.from_csv(pricing_input_file)
+    index_dir = Path(cube_dir) / "prices"
+    key = input_key(pricing_input_file)
+    index = PriceIndex.load(index_dir, key)
+    if index is None:
+        log.info(f"Price index in {index_dir} is missing or stale, rebuilding")
+        index = PriceIndex.from_csv(pricing_input_file)
+        index.save(index_dir, key)
+    return index
@@ -0,0 +1,92 @@
+import json
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+log = logging.getLogger("pwpolicylogger")
+
+
+def max_rss_mb():
+    """Memory high-water mark of this process so far, None if unknown."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos
+    return rss / (1 << 20) if sys.platform == "darwin" else rss / 1024
+
+
+class StageTracer:
+    """Collects nested stage timings, see stage()."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = list()
+        # scrapers run stages in worker threads, each keeps its own nesting
+        self.local = threading.local()
+
+    @property
+    def stack(self):
+        if not hasattr(self.local, "stack"):
+            self.local.stack = list()
+        return self.local.stack
+
+    def report(self, command=None):
+        return {
+            "command": command,
+            "total_s": time.perf_counter() - self.start,
+            "max_rss_mb": max_rss_mb(),
+            "stages": sorted(self.stages, key=lambda s: s["start_s"]),
+        }
+
+
+# None unless --trace-stages is on, so stage() costs next to nothing
+_tracer = None
+
+
+def start_tracing():
+    global _tracer
+    _tracer = StageTracer()
+    return _tracer
+
+
+@contextmanager
+def stage(name):
+    """Time a block as a stage (nested stages get "outer/inner" names)."""
+    if _tracer is None:
+        yield
+        return
+    _tracer.stack.append(name)
+    path = "/".join(_tracer.stack)
+    t1 = time.perf_counter()
+    try:
+        yield
+    finally:
+        t2 = time.perf_counter()
+        _tracer.stack.pop()
+        _tracer.stages.append(
+            {
+                "stage": path,
+                "start_s": round(t1 - _tracer.start, 6),
+                "duration_s": round(t2 - t1, 6),
+                "max_rss_mb": max_rss_mb(),
+            }
+        )
+        log.debug(f"Stage {path} took {t2 - t1:.4f}s")
+
+
+def write_trace(path, command=None):
+    """Dump the collected stages as JSON to path ("-" for stderr)."""
+    report = _tracer.report(command)
+    if path == "-":
+        json.dump(report, sys.stderr, indent=2)
+        sys.stderr.write("\n")
+        return
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
@@ -1,38 +1,29 @@
 #!/usr/bin/env python3
 
-import base64
 import os
 import json
 import csv
-import hashlib
-from passlib.hash import scrypt
 import logging
 import sys
 import time
 import math
-import random
-import warnings
 from functools import update_wrapper
-from collections import defaultdict
-from benchmarks.benchmarks import OHCScraper, GistScraper, consolidate_stats
-from cloud.azure import AzureScraper
 from utils import (
-    normalize_device,
     cards_list,
     charset_lenghts,
-    charset_chars,
     calculate_policy_size,
-    enrich_cost_time,
+    parse_int_range,
+    file_sha256,
+    write_json,
 )
-import cProfile
-import pandas as pd
-import pstats
 
 import click
 from dotenv import load_dotenv
 from pathlib import Path
-import requests
-import requests_cache
+from profiling import stage
+
+# pandas and the scrapers are imported inside the subcommands that
+# need them, so calc (with a fresh cube) and --help start up fast
 
 load_dotenv()
 
@@ -70,7 +61,8 @@ def time_decorator(f):
     def new_func(ctx, *args, **kwargs):
         t1 = time.perf_counter()
         try:
-            r = ctx.invoke(f, *args, **kwargs)
+            with stage(ctx.info_name):
+                r = ctx.invoke(f, *args, **kwargs)
             return r
         except Exception as e:
             raise e
@@ -85,8 +77,41 @@ def time_decorator(f):
 
 
 @click.group()
-def cli():
-    pass
+@click.option(
+    "--profile",
+    help="Dump cProfile stats of the command to this file (python -m pstats FILE)",
+    type=click.Path(file_okay=True, dir_okay=False, writable=True),
+    default=None,
+)
+@click.option(
+    "--trace-stages",
+    help="Write per-stage timings and memory high-water marks as JSON to this file (- for stderr)",
+    type=click.Path(file_okay=True, dir_okay=False, writable=True, allow_dash=True),
+    default=None,
+)
+@click.pass_context
+def cli(ctx, profile, trace_stages):
+    if trace_stages:
+        from profiling import start_tracing, write_trace
+
+        start_tracing()
+        ctx.call_on_close(lambda: write_trace(trace_stages, ctx.invoked_subcommand))
+    if profile:
+        import cProfile
+        import pstats
+
+        profiler = cProfile.Profile()
+
+        def dump_profile():
+            profiler.disable()
+            profiler.dump_stats(profile)
+            if log.isEnabledFor(logging.INFO):
+                pstats.Stats(profiler, stream=sys.stderr).sort_stats(
+                    "cumulative"
+                ).print_stats(20)
+
+        ctx.call_on_close(dump_profile)
+        profiler.enable()
 
 
 @cli.command()
@@ -108,6 +133,22 @@ def cli():
     help="Proxy address",
     envvar="PROXY_ADDRESS",
 )
+@click.option(
+    "--workers",
+    help="Number of concurrent downloads (1 scrapes sequentially)",
+    type=int,
+    default=4,
+    show_default=True,
+    envvar="SCRAPE_WORKERS",
+)
+@click.option(
+    "--rate",
+    help="Max requests per second to a single host (0 for no limit)",
+    type=float,
+    default=5,
+    show_default=True,
+    envvar="SCRAPE_RATE",
+)
 @click.option(
     "--log-level",
     default="WARNING",
@@ -118,15 +159,19 @@ def cli():
 )
 @log_decorator
 @time_decorator
-def get_benchmarks(benchmark_output_file, proxy, proxy_address, log_level):
+def get_benchmarks(
+    benchmark_output_file, proxy, proxy_address, workers, rate, log_level
+):
     """Get benchmark data from onlinehashcrack and Chick3nman gists"""
     # ======================================================================
     #                        Your script starts here!
     # ======================================================================
+    from benchmarks.benchmarks import OHCScraper, GistScraper
+
     proxies = {"http": proxy_address, "https": proxy_address}
 
-    ohc = OHCScraper(proxy, proxies)
-    gists = GistScraper(proxy, proxies)
+    ohc = OHCScraper(proxy, proxies, workers=workers, rate=rate)
+    gists = GistScraper(proxy, proxies, workers=workers, rate=rate)
     data_ohc = ohc.crawl()
     data_gists = gists.crawl()
 
@@ -135,18 +180,108 @@ def get_benchmarks(benchmark_output_file, proxy, proxy_address, log_level):
         headers = ["device", "hashmode", "speed"]
         writer = csv.writer(f)
         writer.writerow(headers)
-        for bm, d in data_ohc.items():
-            for dev, value in d.items():
-                for hashmode, speed in value.items():
-                    writer.writerow([dev, hashmode, speed])
-        for bm, d in data_gists.items():
-            for dev, value in d.items():
-                for hashmode, speed in value.items():
-                    writer.writerow([dev, hashmode, speed])
-
-    # new_stats = consolidate_stats([data_ohc, data_gists])
-    # log.info(json.dumps(new_stats, indent=2))
+        for bm, rows in data_ohc.items():
+            writer.writerows(rows)
+        for bm, rows in data_gists.items():
+            writer.writerows(rows)
+
+    return 0
+
+
+@cli.command()
+@click.argument(
+    "paths",
+    nargs=-1,
+    required=True,
+    type=click.Path(exists=True, file_okay=True, dir_okay=True),
+)
+@click.option(
+    "--pattern",
+    help="Glob for benchmark logs when walking directories",
+    type=str,
+    default="*.txt",
+    show_default=True,
+)
+@click.option(
+    "--benchmark-output-file",
+    help="Benchmark CSV to append to",
+    type=click.Path(file_okay=True, dir_okay=False),
+    default="./data/benchmark.csv",
+)
+@click.option(
+    "--manifest-file",
+    help="JSON file remembering the content hashes of already ingested logs",
+    type=click.Path(file_okay=True, dir_okay=False),
+    default="./data/benchmark_ingested.json",
+)
+@click.option(
+    "--workers",
+    help="Number of parser processes",
+    type=int,
+    default=os.cpu_count(),
+)
+@click.option(
+    "--log-level",
+    default="WARNING",
+    type=click.Choice(["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]),
+    show_default=True,
+    help="Set logging level.",
+    envvar="LOG_LEVEL",
+)
+@log_decorator
+@time_decorator
+def ingest_benchmarks(
+    paths, pattern, benchmark_output_file, manifest_file, workers, log_level
+):
+    """Append local hashcat --benchmark outputs to the benchmark data"""
+    # ======================================================================
+    #                        Your script starts here!
+    # ======================================================================
+    from concurrent.futures import ProcessPoolExecutor
+    from benchmarks.hashcat import parse_benchmark_file
+
+    files = list()
+    for p in map(Path, paths):
+        files += (
+            sorted(x for x in p.rglob(pattern) if x.is_file()) if p.is_dir() else [p]
+        )
+
+    manifest = dict()
+    if Path(manifest_file).exists():
+        with open(manifest_file) as f:
+            manifest = json.load(f)
+
+    # hashing is way cheaper than parsing, so only new content hits the pool
+    new_files = dict()
+    for path in files:
+        digest = file_sha256(path)
+        if digest not in manifest and digest not in new_files:
+            new_files[digest] = path
+    log.info(f"{len(new_files)} new of {len(files)} benchmark logs")
+
+    write_header = not Path(benchmark_output_file).exists()
+    added = 0
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool, open(
+        benchmark_output_file, "a", newline=""
+    ) as f:
+        writer = csv.writer(f)
+        if write_header:
+            writer.writerow(["device", "hashmode", "speed"])
+        # the digests are known already, only parsing goes to the pool
+        parsed = pool.map(parse_benchmark_file, new_files.values())
+        for (digest, path), rows in zip(new_files.items(), parsed):
+            if not rows:
+                log.warning(f"No benchmark data in {path}")
+            writer.writerows(rows)
+            added += len(rows)
+            # rows hit the disk before the manifest says they're in, a crash
+            # in between repeats at most this one file on the next run
+            f.flush()
+            os.fsync(f.fileno())
+            manifest[digest] = {"path": str(path), "rows": len(rows)}
+            write_json(manifest_file, manifest)
 
+    click.echo(f"Ingested {len(new_files)} new benchmark logs, {added} rows added")
     return 0
 
 
@@ -157,6 +292,12 @@ def get_benchmarks(benchmark_output_file, proxy, proxy_address, log_level):
     type=click.Path(readable=True, file_okay=True, dir_okay=False),
     default="./data/azure.csv",
 )
+@click.option(
+    "--pricing-output-file",
+    help="Full pricing table (all regions and price types) output file",
+    type=click.Path(readable=True, file_okay=True, dir_okay=False),
+    default="./data/azure_prices.csv",
+)
 @click.option(
     "--proxy",
     is_flag=True,
@@ -169,6 +310,29 @@ def get_benchmarks(benchmark_output_file, proxy, proxy_address, log_level):
     help="Proxy address",
     envvar="PROXY_ADDRESS",
 )
+@click.option(
+    "--workers",
+    help="Number of concurrent downloads (1 scrapes sequentially)",
+    type=int,
+    default=4,
+    show_default=True,
+    envvar="SCRAPE_WORKERS",
+)
+@click.option(
+    "--rate",
+    help="Max requests per second to a single host (0 for no limit)",
+    type=float,
+    default=5,
+    show_default=True,
+    envvar="SCRAPE_RATE",
+)
+@click.option(
+    "--batch-size",
+    help="Number of SKUs priced by a single retail prices API query",
+    type=int,
+    default=10,
+    show_default=True,
+)
 @click.option(
     "--log-level",
     default="WARNING",
@@ -179,24 +343,97 @@ def get_benchmarks(benchmark_output_file, proxy, proxy_address, log_level):
 )
 @log_decorator
 @time_decorator
-def get_cloud_data(azure_output_file, proxy, proxy_address, log_level):
+def get_cloud_data(
+    azure_output_file,
+    pricing_output_file,
+    proxy,
+    proxy_address,
+    workers,
+    rate,
+    batch_size,
+    log_level,
+):
     """Get cloud pricing data"""
     # ======================================================================
     #                        Your script starts here!
     # ======================================================================
+    from cloud.azure import AzureScraper
+
     proxies = {"http": proxy_address, "https": proxy_address}
 
-    azure = AzureScraper(proxy, proxies, cards_list)
+    azure = AzureScraper(
+        proxy, proxies, cards_list, workers=workers, rate=rate, batch_size=batch_size
+    )
     azure_data = azure.crawl()
     with click.open_file(azure_output_file, "w") as f:
-        headers = ["sku", "device", "price", "time unit"]
+        headers = ["sku", "device", "price", "time unit", "gpus"]
         writer = csv.writer(f)
         writer.writerow(headers)
         for row in azure_data:
-            writer.writerow([row["sku"], row["gpu_type"], row["price"], row["unit"]])
+            writer.writerow(
+                [row["sku"], row["gpu_type"], row["price"], row["unit"], row["gpu_num"]]
+            )
+    with click.open_file(pricing_output_file, "w") as f:
+        headers = ["sku", "device", "region", "price type", "price", "time unit"]
+        writer = csv.writer(f)
+        writer.writerow(headers)
+        for row in azure.price_table:
+            writer.writerow(
+                [
+                    row["sku"],
+                    row["gpu_type"],
+                    row["region"],
+                    row["price_type"],
+                    row["price"],
+                    row["unit"],
+                ]
+            )
     return 0
 
 
+def echo_table(result, hashmode_map, extra=None):
+    """Print cube results as a table, one row per policy variant."""
+    import numpy as np
+    from tabulate import tabulate
+
+    table = {"mode": result.pop("mode")}
+    table["hash"] = [hashmode_map.get(str(m), "") for m in table["mode"]]
+    table.update(extra or dict())
+    table.update(result)
+    costs = [c for c in table if c.startswith("policy_cost (") and "log10" not in c]
+    if all(np.isfinite(table[c]).all() for c in ["policy_cost"] + costs):
+        # the log10 columns only matter for policies too big for a float
+        for column in [c for c in table if c.startswith("policy_") and "log10" in c]:
+            del table[column]
+    click.echo(tabulate(table, headers="keys", tablefmt="pipe"))
+
+
+def int_range(value, param_hint, names=None):
+    """parse_int_range, bad input being a usage error."""
+    try:
+        return parse_int_range(value, names)
+    except ValueError as e:
+        raise click.BadParameter(e.args[0], param_hint=param_hint)
+
+
+def adjusted(cube, calibration_file=None, throughput_file=None):
+    """cube.apply_models, telling on stderr when a calibration is applied."""
+    from cube import apply_models
+
+    if calibration_file:
+        from calibration import load_factors
+
+        applied = ", ".join(
+            f"{device} mode {mode} x{f:.3g}"
+            for (device, mode), f in load_factors(calibration_file).items()
+        )
+        # on stderr, it changes the numbers but shouldn't end up in tables
+        click.echo(
+            f"Calibrated with {calibration_file}: {applied or 'no factors'}", err=True
+        )
+    return apply_models(cube, calibration_file, throughput_file)
+
+
 @cli.command()
 @click.option(
     "--benchmark-input-file",
@@ -218,15 +455,15 @@ def get_cloud_data(azure_output_file, proxy, proxy_address, log_level):
 )
 @click.option(
     "--pw-len",
-    help="Length of the password",
-    type=int,
-    default=8,
+    help="Length of the password - a list/range like 8,10-12 computes a grid",
+    type=str,
+    default="8",
 )
 @click.option(
     "--mode",
-    help="Hash mode of the hash (refer to modes.csv)",
-    type=int,
-    default=0,
+    help="Hash mode of the hash (refer to modes.csv) - a list/range like 0,100,1400 computes a grid",
+    type=str,
+    default="0",
 )
 @click.option(
     "--sku",
@@ -236,9 +473,60 @@ def get_cloud_data(azure_output_file, proxy, proxy_address, log_level):
 )
 @click.option(
     "--charset-length",
-    help="Length of character set.",
-    type=int,
-    default=95,
+    help="Length of character set - a list/range or charset names (e.g. lowercase,95) computes a grid",
+    type=str,
+    default="95",
+)
+@click.option(
+    "--policy",
+    help="Policy like 8-16:luds:ud (lengths:classes:required) or a hashcat mask like '?u?l?l?l?d?d', replaces --pw-len and --charset-length",
+    type=str,
+    multiple=True,
+)
+@click.option(
+    "--policy-file",
+    help="File with one policy per line (name,policy or just policy)",
+    type=click.Path(readable=True, file_okay=True, dir_okay=False),
+    default=None,
+)
+@click.option(
+    "--pricing-input-file",
+    help="Full pricing table from get-cloud-data, used with --region or --price-type",
+    type=click.Path(file_okay=True, dir_okay=False),
+    default="./data/azure_prices.csv",
+)
+@click.option(
+    "--region",
+    help="Azure region to price in (e.g. eastus), * for the cheapest region per SKU",
+    type=str,
+    default=None,
+)
+@click.option(
+    "--price-type",
+    help="Price type - consumption, spot, low priority, devtest, reservation 1 year or reservation 3 years",
+    type=str,
+    default=None,
+)
+@click.option(
+    "--throughput-file",
+    help="Throughput model (multi-GPU scaling, fractional GPUs, pure kernels) as JSON, applied when the file exists",
+    type=click.Path(file_okay=True, dir_okay=False),
+    default="./data/throughput.json",
+    envvar="THROUGHPUT_FILE",
+)
+@click.option(
+    "--calibration-file",
+    help="Apply the per-device, per-hashmode efficiency factors calibrate fitted into this file (e.g. ./data/calibration.json)",
+    type=click.Path(exists=True, file_okay=True, dir_okay=False),
+    default=None,
+    envvar="CALIBRATION_FILE",
+)
+@click.option(
+    "--cube-dir",
+    help="Directory with the precompiled cost cube, rebuilt when the input files change",
+    type=click.Path(file_okay=False, dir_okay=True),
+    default="./data/cube",
+    envvar="CUBE_DIR",
 )
 @click.option(
     "--log-level",
@@ -258,59 +546,127 @@ def calc(
     mode,
     sku,
     charset_length,
+    policy,
+    policy_file,
+    pricing_input_file,
+    region,
+    price_type,
+    throughput_file,
+    calibration_file,
+    cube_dir,
     log_level,
 ):
     """Compute the stats"""
     # ======================================================================
     #                        Your script starts here!
     # ======================================================================
-    benchmark = pd.read_csv(benchmark_input_file)
-    benchmark["device"] = benchmark["device"].apply(normalize_device)
-    # log.debug(benchmark)
-    azure_data = pd.read_csv(azure_input_file)
-    # log.debug(azure_data)
-    merged = pd.merge(benchmark, azure_data, how="right", on=["device"])
-    # log.debug(merged)
-
-    hashmode_map = dict()
-    with open(hashmode_input_file) as f:
-        reader = csv.reader(f, delimiter=";")
-        for row in reader:
-            hashmode_map[row[0]] = row[1]
-
-    policy_size = calculate_policy_size(charset_length, pw_len)
-    log.info(f"Working with policy size {policy_size}")
-
-    relevant_hashes = merged.loc[merged["hashmode"] == mode]
-    # log.debug(relevant_hashes)
-    relevant_hashes = enrich_cost_time(relevant_hashes, policy_size)
-    log.debug(relevant_hashes)
+    from cube import load_cube
+
+    cube = adjusted(
+        load_cube(
+            benchmark_input_file, azure_input_file, hashmode_input_file, cube_dir
+        ),
+        calibration_file,
+        throughput_file,
+    )
+    hashmode_map = cube.hashmode_map
+    if region or price_type:
+        from prices import load_prices
+
+        try:
+            index = load_prices(pricing_input_file, cube_dir)
+            cube = cube.with_prices(
+                index.lookup(price_type or "consumption", region or "*")
+            )
+        except (FileNotFoundError, KeyError) as e:
+            raise click.UsageError(e.args[0])
+
+    modes = int_range(mode, "--mode")
+    if policy or policy_file:
+        from policy import Policy, load_policies, log_keyspaces
+
+        try:
+            policies = {p: Policy.parse(p) for p in policy}
+            if policy_file:
+                policies.update(load_policies(policy_file))
+        except ValueError as e:
+            raise click.BadParameter(e.args[0], param_hint="--policy/--policy-file")
+        size_log = log_keyspaces(list(policies.values()))
+        empty = [name for name, v in zip(policies, size_log) if v == -math.inf]
+        if empty:
+            raise click.BadParameter(
+                f"No feasible policy - {', '.join(empty)} allow(s) no password",
+                param_hint="--policy/--policy-file",
+            )
+        try:
+            result = cube.price_keyspaces(modes, size_log, sku)
+        except (ValueError, KeyError) as e:
+            raise click.UsageError(e.args[0])
+        echo_table(result, hashmode_map, {"policy": list(policies) * len(modes)})
+        return 0
+
+    pw_lens = int_range(pw_len, "--pw-len")
+    charset_lens = int_range(charset_length, "--charset-length", charset_lenghts)
+    if min(pw_lens) < 0:
+        raise click.BadParameter("Lengths can't be negative", param_hint="--pw-len")
+    if min(charset_lens) < 1:
+        raise click.BadParameter(
+            "An empty charset allows no password", param_hint="--charset-length"
+        )
+    try:
+        result = cube.grid(modes, pw_lens, charset_lens, sku)
+    except KeyError as e:
+        raise click.UsageError(e.args[0])
+
+    if len(result["mode"]) > 1:
+        # grid mode - one tidy row per policy variant
+        echo_table(result, hashmode_map)
+        return 0
+
+    from keyspace import approx
+
+    row = {k: v[0] for k, v in result.items()}
+    where = f" in region {row['region']}" if "region" in row else ""
+    log.info(
+        "Working with policy size {}".format(
+            calculate_policy_size(row["charset_length"], row["pw_len"])
+        )
+    )
     click.echo(
-        f"We are cracking password length {pw_len} with charset of length {charset_length}, on mode {mode} - that's {hashmode_map[str(mode)]}"
+        f"We are cracking password length {row['pw_len']} with charset of length {row['charset_length']}, on mode {row['mode']} - that's {hashmode_map[str(row['mode'])]}"
     )
     if sku == "cheapest":
-        index = relevant_hashes["policy_cost"].idxmin()
-        row = relevant_hashes.loc[index]
         click.echo(
-            "The cheapest option is {} with GPU {} - total cost {}$ and time {}s".format(
+            "The cheapest option is {}{} with GPU {} - total cost {}$ and time {}s".format(
                 row["sku"],
+                where,
                 row["device"],
-                round(row["policy_cost"], 3),
-                round(row["policy_time"], 3),
+                approx(row["policy_cost"], row["policy_cost (log10)"]),
+                approx(row["policy_time (s)"], row["policy_time (log10 s)"]),
             )
         )
     else:
-        sku_hashes = relevant_hashes.loc[relevant_hashes["sku"] == sku]
-        index = sku_hashes["policy_cost"].idxmin()
-        row = sku_hashes.loc[index]
         click.echo(
-            "With SKU {} and GPU {} the total cost is {}$ and time {}s".format(
+            "With SKU {}{} and GPU {} the total cost is {}$ and time {}s".format(
                 sku,
+                where,
                 row["device"],
-                round(row["policy_cost"], 3),
-                round(row["policy_time"], 3),
+                approx(row["policy_cost"], row["policy_cost (log10)"]),
+                approx(row["policy_time (s)"], row["policy_time (log10 s)"]),
             )
         )
+    click.echo(
+        "Depending on the benchmark ({} samples) it costs between {}$ (fastest benchmark) and {}$ (p10 speed)".format(
+            row["samples"],
+            approx(
+                row["policy_cost (optimistic)"], row["policy_cost (optimistic, log10)"]
+            ),
+            approx(
+                row["policy_cost (pessimistic)"],
+                row["policy_cost (pessimistic, log10)"],
+            ),
+        )
+    )
     return 0
 
 
@@ -333,6 +689,62 @@ def calc(
     type=click.Path(readable=True, file_okay=True, dir_okay=False),
     default="./data/modes.csv",
 )
+@click.option(
+    "--wordlist",
+    help="Wordlist to attack with",
+    type=click.Path(exists=True, readable=True, file_okay=True, dir_okay=False),
+    required=True,
+)
+@click.option(
+    "--rules",
+    help="hashcat rules file, repeat it to stack rules like hashcat -r",
+    type=click.Path(exists=True, readable=True, file_okay=True, dir_okay=False),
+    multiple=True,
+)
+@click.option(
+    "--mask",
+    help="Mask appended/prepended to every word for hybrid attacks (-a 6/-a 7), e.g. '?d?d?d'",
+    type=str,
+    default=None,
+)
+@click.option(
+    "--mode",
+    help="Hash mode of the hash (refer to modes.csv) - a list/range like 0,100,1400",
+    type=str,
+    default="0",
+)
+@click.option(
+    "--sku",
+    help="Specific VM configuration to use (Azure SKUs) - if set to cheapest, it'd calculate the cheapest version",
+    type=str,
+    default="cheapest",
+)
+@click.option(
+    "--cpu-check",
+    is_flag=True,
+    help="Time candidate generation (with the first rules file) on a sample of the wordlist on this CPU",
+)
+@click.option(
+    "--throughput-file",
+    help="Throughput model (multi-GPU scaling, fractional GPUs, pure kernels) as JSON, applied when the file exists",
+    type=click.Path(file_okay=True, dir_okay=False),
+    default="./data/throughput.json",
+    envvar="THROUGHPUT_FILE",
+)
+@click.option(
+    "--calibration-file",
+    help="Apply the per-device, per-hashmode efficiency factors calibrate fitted into this file (e.g. ./data/calibration.json)",
+    type=click.Path(exists=True, file_okay=True, dir_okay=False),
+    default=None,
+    envvar="CALIBRATION_FILE",
+)
+@click.option(
+    "--cube-dir",
+    help="Directory with the precompiled cost cube, rebuilt when the input files change",
+    type=click.Path(file_okay=False, dir_okay=True),
+    default="./data/cube",
+    envvar="CUBE_DIR",
+)
 @click.option(
     "--log-level",
     default="WARNING",
@@ -343,133 +755,172 @@ def calc(
 )
 @log_decorator
 @time_decorator
-def stats(benchmark_input_file, azure_input_file, hashmode_input_file, log_level):
-    """Compute the stats"""
+def attack(
+    benchmark_input_file,
+    azure_input_file,
+    hashmode_input_file,
+    wordlist,
+    rules,
+    mask,
+    mode,
+    sku,
+    cpu_check,
+    throughput_file,
+    calibration_file,
+    cube_dir,
+    log_level,
+):
+    """Cost of a wordlist + rules (or hybrid) attack"""
     # ======================================================================
     #                        Your script starts here!
     # ======================================================================
-    benchmark = pd.read_csv(benchmark_input_file)
-    benchmark["device"] = benchmark["device"].apply(normalize_device)
-    # log.debug(benchmark)
-    azure_data = pd.read_csv(azure_input_file)
-    # log.debug(azure_data)
-    merged = pd.merge(benchmark, azure_data, how="right", on=["device"])
-    # log.debug(merged)
-
-    hashmode_map = dict()
-    with open(hashmode_input_file) as f:
-        reader = csv.reader(f, delimiter=";")
-        for row in reader:
-            hashmode_map[row[0]] = row[1]
-
-    # Different hashes on pw_len 8
-    click.echo("Different hashes on password length 8")
-    policy_size = calculate_policy_size(charset_lenghts["ascii_printable"], 8)
-    hashmodes = [0, 10, 100, 1000, 1400, 3200, 8900]
-    mapped = [hashmode_map[str(h)] for h in hashmodes]
-    prices = list()
-
-    for h in hashmodes:
-        relevant_hashes = merged.loc[merged["hashmode"] == h]
-        relevant_hashes = enrich_cost_time(relevant_hashes, policy_size)
-        # log.debug(relevant_hashes)
-        index = relevant_hashes["policy_cost"].idxmin()
-        row = relevant_hashes.loc[index]
-
-        prices.append(str(round(row["policy_cost"], 3)) + "$")
-    results = pd.DataFrame(
-        {"Hashmode": hashmodes, "Hash": mapped, "Cracking price": prices}
+    from attack import (
+        count_lines,
+        cpu_candidate_rate,
+        iter_rules,
+        log_candidates,
+    )
+    from cube import load_cube
+
+    words, size = count_lines(wordlist)
+    rule_counts = [sum(1 for _ in iter_rules(r)) for r in rules]
+    log_mask = 0.0
+    if mask:
+        from policy import Policy, log_mask_keyspace
+
+        try:
+            log_mask = log_mask_keyspace(Policy.parse(mask))
+        except ValueError as e:
+            raise click.UsageError(e.args[0])
+    log.info(f"{wordlist}: {words} words, {size} bytes, rules {rule_counts}")
+
+    cube = adjusted(
+        load_cube(
+            benchmark_input_file, azure_input_file, hashmode_input_file, cube_dir
+        ),
+        calibration_file,
+        throughput_file,
     )
-    click.echo(results.to_markdown())
-    click.echo("")
-
-    # MD5 on password lenghts
-    click.echo("MD5 on password lengths (lower) from 6")
-    pw_lens = range(6, 16)
-    prices = list()
-
-    for p in pw_lens:
-        policy_size = calculate_policy_size(charset_lenghts["lowercase"], p)
-        relevant_hashes = merged.loc[merged["hashmode"] == 0]
-        # log.debug(relevant_hashes)
-        relevant_hashes = enrich_cost_time(relevant_hashes, policy_size)
-        index = relevant_hashes["policy_cost"].idxmin()
-        row = relevant_hashes.loc[index]
-
-        prices.append(str(round(row["policy_cost"], 3)) + "$")
-    results = pd.DataFrame({"Password length": pw_lens, "Cracking price": prices})
-    click.echo(results.to_markdown())
-    click.echo("")
-
-    # MD5 on password lenghts
-    click.echo("MD5 on password lengths (lower, upper, nums, symbols) from 6")
-    pw_lens = range(6, 16)
-    prices = list()
-
-    for p in pw_lens:
-        policy_size = calculate_policy_size(charset_lenghts["ascii_printable"], p)
-        relevant_hashes = merged.loc[merged["hashmode"] == 0]
-        relevant_hashes = enrich_cost_time(relevant_hashes, policy_size)
-        # log.debug(relevant_hashes)
-        index = relevant_hashes["policy_cost"].idxmin()
-        row = relevant_hashes.loc[index]
-
-        prices.append(str(round(row["policy_cost"], 3)) + "$")
-    results = pd.DataFrame({"Password length": pw_lens, "Cracking price": prices})
-    click.echo(results.to_markdown())
-    click.echo("")
-
-    # charsets on MD5 len 12
-    click.echo("Different charsets on MD5, password length 12")
-    charsets = list(charset_lenghts.keys())
-    cs_lens = [charset_lenghts[x] for x in charsets]
-    prices = list()
-
-    for c in cs_lens:
-        policy_size = calculate_policy_size(c, 12)
-        relevant_hashes = merged.loc[merged["hashmode"] == 0]
-        relevant_hashes = enrich_cost_time(relevant_hashes, policy_size)
-        # log.debug(relevant_hashes)
-        index = relevant_hashes["policy_cost"].idxmin()
-        row = relevant_hashes.loc[index]
-
-        prices.append(str(round(row["policy_cost"], 3)) + "$")
-    results = pd.DataFrame(
-        {"Charset": charsets, "Charset lenght": cs_lens, "Cracking price": prices}
+    log_total = log_candidates(words, rule_counts, log_mask)
+    try:
+        result = cube.price_keyspaces(int_range(mode, "--mode"), [log_total], sku)
+    except KeyError as e:
+        raise click.UsageError(e.args[0])
+
+    click.echo(
+        f"{words} words x {' x '.join(map(str, rule_counts)) or 'no'} rules"
+        + (f" x mask {mask}" if mask else "")
+    )
+    if cpu_check:
+        from keyspace import LN10, approx, from_log
+
+        rate, timed = cpu_candidate_rate(
+            wordlist, iter_rules(rules[0]) if rules else ()
+        )
+        if rate is None:
+            click.echo("None of the rules are supported by the CPU check")
+        else:
+            # log10 seconds to generate everything on one core
+            cpu_time = (log_total - math.log(rate)) / LN10
+            click.echo(
+                f"One CPU core generates {rate:.0f} candidates/s ({timed:.0%} of the rules timed), piping them all in would take {approx(from_log(cpu_time * LN10), cpu_time)}s"
+            )
+            if cpu_time > min(result["policy_time (log10 s)"]):
+                click.echo(
+                    "That's slower than the GPU - keep the rules on the GPU (-r) instead of piping candidates"
+                )
+    echo_table(
+        result,
+        cube.hashmode_map,
+        {"candidates (log10)": result.pop("keyspace (log10)")},
     )
-    click.echo(results.to_markdown())
-    click.echo("")
-
-    # experiments estimates
-    sku = "Standard_NC6s_v3"
-    experiments = [
-        {"mode": 0, "len": 8, "charset": "ascii_printable", "full": True},
-        {"mode": 0, "len": 11, "charset": "lowercase", "full": True},
-        {"mode": 100, "len": 7, "charset": "ascii_printable", "full": True},
-        {"mode": 1400, "len": 7, "charset": "ascii_printable", "full": True},
-        {"mode": 1410, "len": 7, "charset": "ascii_printable", "full": True},
-        {"mode": 1700, "len": 7, "charset": "ascii_printable", "full": True},
-        {"mode": 8900, "len": 5, "charset": "ascii_printable", "full": True},
-    ]
-    table = list()
-    for exp in experiments:
-        policy_size = calculate_policy_size(charset_lenghts[exp["charset"]], exp["len"])
-        relevant_hashes = merged.loc[merged["hashmode"] == exp["mode"]]
-        relevant_hashes = enrich_cost_time(relevant_hashes, policy_size)
-        sku_hashes = relevant_hashes.loc[relevant_hashes["sku"] == sku]
-        index = sku_hashes["policy_cost"].idxmin()
-        row = dict(sku_hashes.loc[index])
-        table.append(row)
-    click.echo(pd.DataFrame.from_dict(table).to_markdown())
     return 0
 
 
 @cli.command()
 @click.option(
-    "--experiment-dir",
-    default="./experiment",
-    type=click.Path(dir_okay=True, file_okay=False, writable=True),
-    help="Directory to generate the hashes and passwords to",
+    "--benchmark-input-file",
+    help="Benchmark data input file",
+    type=click.Path(readable=True, file_okay=True, dir_okay=False),
+    default="./data/benchmark.csv",
+)
+@click.option(
+    "--azure-input-file",
+    help="Azure costs input file",
+    type=click.Path(readable=True, file_okay=True, dir_okay=False),
+    default="./data/azure.csv",
+)
+@click.option(
+    "--hashmode-input-file",
+    help="CSV with hashcat hashmodes map",
+    type=click.Path(readable=True, file_okay=True, dir_okay=False),
+    default="./data/modes.csv",
+)
+@click.option(
+    "--pw-len",
+    help="Length of the password",
+    type=int,
+    default=8,
+)
+@click.option(
+    "--mode",
+    help="Hash mode of the hash (refer to modes.csv)",
+    type=int,
+    default=0,
+)
+@click.option(
+    "--charset-length",
+    help="Length of character set (or a charset name, e.g. lowercase)",
+    type=str,
+    default="95",
+)
+@click.option(
+    "--max-vms",
+    help="Largest fleet of VMs running in parallel to consider",
+    type=int,
+    default=64,
+    show_default=True,
+)
+@click.option(
+    "--vm-overhead",
+    help="Seconds every VM pays before cracking (provisioning, hashcat startup)",
+    type=float,
+    default=300,
+    show_default=True,
+)
+@click.option(
+    "--billing-granularity",
+    help="VMs are billed per started this many seconds",
+    type=float,
+    default=60,
+    show_default=True,
+)
+@click.option(
+    "--deadline",
+    help="Only show the cheapest fleet per SKU finishing within this many hours",
+    type=float,
+    default=None,
+)
+@click.option(
+    "--throughput-file",
+    help="Throughput model (multi-GPU scaling, fractional GPUs, pure kernels) as JSON, applied when the file exists",
+    type=click.Path(file_okay=True, dir_okay=False),
+    default="./data/throughput.json",
+    envvar="THROUGHPUT_FILE",
+)
+@click.option(
+    "--calibration-file",
+    help="Apply the per-device, per-hashmode efficiency factors calibrate fitted into this file (e.g. ./data/calibration.json)",
+    type=click.Path(exists=True, file_okay=True, dir_okay=False),
+    default=None,
+    envvar="CALIBRATION_FILE",
+)
+@click.option(
+    "--cube-dir",
+    help="Directory with the precompiled cost cube, rebuilt when the input files change",
+    type=click.Path(file_okay=False, dir_okay=True),
+    default="./data/cube",
+    envvar="CUBE_DIR",
 )
 @click.option(
     "--log-level",
@@ -481,91 +932,1116 @@ def stats(benchmark_input_file, azure_input_file, hashmode_input_file, log_level
 )
 @log_decorator
 @time_decorator
-def gen_experiment(experiment_dir, log_level):
-    """Generate files for running the cracking experiment"""
+def frontier(
+    benchmark_input_file,
+    azure_input_file,
+    hashmode_input_file,
+    pw_len,
+    mode,
+    charset_length,
+    max_vms,
+    vm_overhead,
+    billing_granularity,
+    deadline,
+    throughput_file,
+    calibration_file,
+    cube_dir,
+    log_level,
+):
+    """Cost/time trade-offs across SKUs and fleet sizes"""
     # ======================================================================
     #                        Your script starts here!
     # ======================================================================
-    experiments = [
-        {"mode": 0, "len": 8, "charset": "ascii_printable", "full": True},
-        {"mode": 0, "len": 11, "charset": "lowercase", "full": True},
-        {"mode": 100, "len": 7, "charset": "ascii_printable", "full": True},
-        {"mode": 1400, "len": 7, "charset": "ascii_printable", "full": True},
-        {"mode": 1410, "len": 7, "charset": "ascii_printable", "full": True},
-        {"mode": 1700, "len": 7, "charset": "ascii_printable", "full": True},
-        {"mode": 8900, "len": 5, "charset": "ascii_printable", "full": True},
-        {"mode": 0, "len": 4, "charset": "ascii_printable", "full": False},
-        {"mode": 0, "len": 5, "charset": "lowercase", "full": False},
-        {"mode": 100, "len": 3, "charset": "ascii_printable", "full": False},
-        {"mode": 1400, "len": 3, "charset": "ascii_printable", "full": False},
-        {"mode": 1410, "len": 3, "charset": "ascii_printable", "full": False},
-        {"mode": 1700, "len": 3, "charset": "ascii_printable", "full": False},
-        {"mode": 8900, "len": 2, "charset": "ascii_printable", "full": False},
-    ]  # normally, I'd use dataclasses, but today I couldn't be bothered
-
-    hashmodehashmap = {
-        0: {"f": "md5", "salt": False},
-        100: {"f": "sha1", "salt": False},
-        1400: {"f": "sha256", "salt": False},
-        1410: {"f": "sha256", "salt": True},
-        1700: {"f": "sha512", "salt": False},
-        8900: {"f": "scrypt", "salt": True},
-    }
-
-    hashmaphashmap = {
-        "md5": hashlib.md5,
-        "sha1": hashlib.sha1,
-        "sha256": hashlib.sha256,
-        "sha512": hashlib.sha512,
-        "scrypt": hashlib.scrypt,
-    }  # it's a hashmap mapping hashes. I found it funny.
-
-    answers = defaultdict(list)
-
-    for e in experiments:
-        password = "".join(
-            random.choice(charset_chars[e["charset"]]) for i in range(e["len"])
-        ).encode()
-
-        func_name = hashmodehashmap[e["mode"]]["f"]
-        has_salt = hashmodehashmap[e["mode"]]["salt"]
-        func = hashmaphashmap[func_name]
-        salt = "deadbeef".encode()
-
-        final_hash = ""
-        if not has_salt:
-            final_hash = func(password).hexdigest()
-        elif e["mode"] == 1410:
-            final_hash = func(password + salt).hexdigest() + ":" + salt.decode()
-        elif e["mode"] == 8900:
-            # scrypt is weird AF man
-            # for some reason the hashlib threw a format error in hashcat
-            scrypt_hash = scrypt.using(rounds=10, block_size=1, parallelism=1).hash(
-                password
+    from cube import load_cube
+    from tabulate import tabulate
+
+    cube = adjusted(
+        load_cube(
+            benchmark_input_file, azure_input_file, hashmode_input_file, cube_dir
+        ),
+        calibration_file,
+        throughput_file,
+    )
+    charset_length = int_range(charset_length, "--charset-length", charset_lenghts)[0]
+    try:
+        if deadline is None:
+            table = cube.frontier(
+                mode,
+                pw_len,
+                charset_length,
+                max_vms,
+                vm_overhead,
+                billing_granularity,
             )
-            # more weirdness - basically transform that format into the result
-            s, params, s_salt, digest = scrypt_hash[1:].replace("$", ":").split(":")
-            ln, r, p = params.split(",")
-            # this would probably fail for a different sized password, but not salt as salt is default
-            final_hash = f"{s.upper()}:{pow(2,int(ln.split('=')[1]))}:{r.split('=')[1]}:{p.split('=')[1]}:{s_salt}==:{digest}="  # brb washing my eyes and hands with bleach (doubt it'd help)
-
-        dname = "full" if e["full"] else "halved"
-        outdir = Path(experiment_dir) / dname
-        fname = "hash_{}_len{}_{}.txt".format(
-            e["mode"], e["len"], e["charset"].replace("_", "-")
-        )
-        outfile = outdir / fname
-        outfile.parent.mkdir(exist_ok=True, parents=True)
+        else:
+            table = cube.deadline(
+                mode,
+                pw_len,
+                charset_length,
+                deadline * 3600,
+                max_vms,
+                vm_overhead,
+                billing_granularity,
+            )
+    except KeyError as e:
+        raise click.UsageError(e.args[0])
 
-        with open(outfile, "w") as f:
-            f.write(final_hash)
+    click.echo(
+        f"We are cracking password length {pw_len} with charset of length {charset_length}, on mode {mode} - that's {cube.hashmode_map[str(mode)]}"
+    )
+    if not len(table["sku"]):
+        if deadline is None:
+            click.echo("This policy is too big to price a fleet for")
+        else:
+            click.echo(f"Nothing finishes within {deadline}h with up to {max_vms} VMs")
+        return 0
+    click.echo(tabulate(table, headers="keys", tablefmt="pipe"))
+    return 0
 
-        answers[dname].append(f"{final_hash}:{password.decode()}")
 
-    for k in answers:
-        with open(Path(experiment_dir) / k / "answers.log", "w") as f:
-            for a in answers[k]:
-                f.write(a + "\n")
+@cli.command()
+@click.option(
+    "--benchmark-input-file",
+    help="Benchmark data input file",
+    type=click.Path(readable=True, file_okay=True, dir_okay=False),
+    default="./data/benchmark.csv",
+)
+@click.option(
+    "--azure-input-file",
+    help="Azure costs input file",
+    type=click.Path(readable=True, file_okay=True, dir_okay=False),
+    default="./data/azure.csv",
+)
+@click.option(
+    "--hashmode-input-file",
+    help="CSV with hashcat hashmodes map",
+    type=click.Path(readable=True, file_okay=True, dir_okay=False),
+    default="./data/modes.csv",
+)
+@click.option(
+    "--mode",
+    help="Hash mode of the hash (refer to modes.csv)",
+    type=int,
+    default=0,
+)
+@click.option(
+    "--pw-len",
+    help="Length of the password, long ones run on pure kernels",
+    type=int,
+    default=8,
+)
+@click.option(
+    "--throughput-file",
+    help="Throughput model (multi-GPU scaling, fractional GPUs, pure kernels) as JSON, applied when the file exists",
+    type=click.Path(file_okay=True, dir_okay=False),
+    default="./data/throughput.json",
+    envvar="THROUGHPUT_FILE",
+)
+@click.option(
+    "--calibration-file",
+    help="Apply the per-device, per-hashmode efficiency factors calibrate fitted into this file (e.g. ./data/calibration.json)",
+    type=click.Path(exists=True, file_okay=True, dir_okay=False),
+    default=None,
+    envvar="CALIBRATION_FILE",
+)
+@click.option(
+    "--cube-dir",
+    help="Directory with the precompiled cost cube, rebuilt when the input files change",
+    type=click.Path(file_okay=False, dir_okay=True),
+    default="./data/cube",
+    envvar="CUBE_DIR",
+)
+@click.option(
+    "--log-level",
+    default="WARNING",
+    type=click.Choice(["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]),
+    show_default=True,
+    help="Set logging level.",
+    envvar="LOG_LEVEL",
+)
+@log_decorator
+@time_decorator
+def throughput(
+    benchmark_input_file,
+    azure_input_file,
+    hashmode_input_file,
+    mode,
+    pw_len,
+    throughput_file,
+    calibration_file,
+    cube_dir,
+    log_level,
+):
+    """Effective VM speed and hashes per dollar of every SKU"""
+    # ======================================================================
+    #                        Your script starts here!
+    # ======================================================================
+    from cube import load_cube
+    from tabulate import tabulate
+
+    cube = adjusted(
+        load_cube(
+            benchmark_input_file, azure_input_file, hashmode_input_file, cube_dir
+        ),
+        calibration_file,
+        throughput_file,
+    )
+    try:
+        table = cube.throughput_table(mode, pw_len)
+    except KeyError as e:
+        raise click.UsageError(e.args[0])
+    click.echo(
+        f"Throughput on mode {mode} ({cube.hashmode_map[str(mode)]}), password length {pw_len}"
+    )
+    click.echo(tabulate(table, headers="keys", tablefmt="pipe"))
+    return 0
+
+
+@cli.command()
+@click.option(
+    "--benchmark-input-file",
+    help="Benchmark data input file",
+    type=click.Path(readable=True, file_okay=True, dir_okay=False),
+    default="./data/benchmark.csv",
+)
+@click.option(
+    "--azure-input-file",
+    help="Azure costs input file",
+    type=click.Path(readable=True, file_okay=True, dir_okay=False),
+    default="./data/azure.csv",
+)
+@click.option(
+    "--hashmode-input-file",
+    help="CSV with hashcat hashmodes map",
+    type=click.Path(readable=True, file_okay=True, dir_okay=False),
+    default="./data/modes.csv",
+)
+@click.option(
+    "--policy",
+    help="hashcat mask like '?u?l?l?l?d?d' or a length policy like 8-10:lud (no required classes)",
+    type=str,
+    required=True,
+)
+@click.option(
+    "--mode",
+    help="Hash mode of the hash (refer to modes.csv)",
+    type=int,
+    default=0,
+)
+@click.option(
+    "--fleet",
+    help="SKU=VMS of the fleet, repeat it for a mixed fleet (e.g. --fleet Standard_NC6s_v3=4)",
+    type=str,
+    multiple=True,
+    required=True,
+)
+@click.option(
+    "--chunk-time",
+    help="Target minutes of work per --skip/--limit chunk",
+    type=float,
+    default=60,
+    show_default=True,
+)
+@click.option(
+    "--hash-file",
+    help="Hash file the commands crack",
+    type=str,
+    default="hashes.txt",
+    show_default=True,
+)
+@click.option(
+    "--keyspace",
+    help="Base keyspace from hashcat --keyspace, for a single mask when hashcat isn't installed here",
+    type=int,
+    default=None,
+)
+@click.option(
+    "--output-dir",
+    help="Write one shell script per VM here instead of printing the commands",
+    type=click.Path(file_okay=False, dir_okay=True),
+    default=None,
+)
+@click.option(
+    "--queue-db",
+    help="Queue the chunks in this sqlite work queue for the work command instead of printing the commands",
+    type=click.Path(file_okay=True, dir_okay=False),
+    default=None,
+)
+@click.option(
+    "--max-chunks",
+    help="Refuse plans with more chunks than this",
+    type=int,
+    default=100000,
+    show_default=True,
+)
+@click.option(
+    "--throughput-file",
+    help="Throughput model (multi-GPU scaling, fractional GPUs, pure kernels) as JSON, applied when the file exists",
+    type=click.Path(file_okay=True, dir_okay=False),
+    default="./data/throughput.json",
+    envvar="THROUGHPUT_FILE",
+)
+@click.option(
+    "--calibration-file",
+    help="Apply the per-device, per-hashmode efficiency factors calibrate fitted into this file (e.g. ./data/calibration.json)",
+    type=click.Path(exists=True, file_okay=True, dir_okay=False),
+    default=None,
+    envvar="CALIBRATION_FILE",
+)
+@click.option(
+    "--cube-dir",
+    help="Directory with the precompiled cost cube, rebuilt when the input files change",
+    type=click.Path(file_okay=False, dir_okay=True),
+    default="./data/cube",
+    envvar="CUBE_DIR",
+)
+@click.option(
+    "--log-level",
+    default="WARNING",
+    type=click.Choice(["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]),
+    show_default=True,
+    help="Set logging level.",
+    envvar="LOG_LEVEL",
+)
+@log_decorator
+@time_decorator
+def plan(
+    benchmark_input_file,
+    azure_input_file,
+    hashmode_input_file,
+    policy,
+    mode,
+    fleet,
+    chunk_time,
+    hash_file,
+    keyspace,
+    output_dir,
+    queue_db,
+    max_chunks,
+    throughput_file,
+    calibration_file,
+    cube_dir,
+    log_level,
+):
+    """Split a mask attack into --skip/--limit chunks over a fleet of VMs"""
+    # ======================================================================
+    #                        Your script starts here!
+    # ======================================================================
+    from cube import load_cube
+    from planner import hashcat_args, hashcat_command, mask_jobs, plan_chunks
+    from policy import Policy
+    from tabulate import tabulate
+
+    cube = adjusted(
+        load_cube(
+            benchmark_input_file, azure_input_file, hashmode_input_file, cube_dir
+        ),
+        calibration_file,
+        throughput_file,
+    )
+    try:
+        jobs = mask_jobs(Policy.parse(policy), mode, keyspace)
+    except ValueError as e:
+        raise click.BadParameter(e.args[0], param_hint="--policy/--keyspace")
+    try:
+        mode_idx = cube.mode_index([mode])[0]
+    except KeyError as e:
+        raise click.UsageError(e.args[0])
+
+    nodes = list()
+    sku_index = {sku: i for i, sku in enumerate(cube.skus)}
+    speeds = [cube.vm_speed(mode_idx, job["length"]) for job in jobs]
+    for entry in fleet:
+        sku, _, count = entry.partition("=")
+        if sku not in sku_index:
+            raise click.UsageError(f"Unknown SKU {sku}")
+        s = sku_index[sku]
+        if any(math.isnan(v[s]) for v in speeds):
+            raise click.UsageError(f"No benchmark of {sku} for hashmode {mode}")
+        for i in range(int(count or 1)):
+            nodes.append(
+                {
+                    "name": f"{sku}-{i + 1}",
+                    "sku": sku,
+                    "speeds": [float(v[s]) for v in speeds],
+                }
+            )
+
+    try:
+        chunks = plan_chunks(jobs, nodes, chunk_time * 60, max_chunks)
+    except ValueError as e:
+        raise click.UsageError(e.args[0])
+    optimized = cube.throughput.optimized(mode, [job["length"] for job in jobs])
+
+    summary = {n["name"]: [n["sku"], n["speeds"][0], 0, 0, 0.0] for n in nodes}
+    commands = {n["name"]: list() for n in nodes}
+    queued = list()
+    for chunk in chunks:
+        job = jobs[chunk["job"]]
+        row = summary[chunk["node"]]
+        row[2] += 1
+        row[3] += chunk["limit"] * job["amp"]
+        row[4] += chunk["seconds"] / 3600
+        commands[chunk["node"]].append(
+            hashcat_command(chunk, job, mode, hash_file, optimized[chunk["job"]])
+        )
+        queued.append(
+            (
+                chunk["node"],
+                hashcat_args(chunk, job, mode, hash_file, optimized[chunk["job"]]),
+            )
+        )
+
+    total = sum(job["base"] * job["amp"] for job in jobs)
+    click.echo(
+        f"Splitting {len(jobs)} mask(s) with {total} candidates on mode {mode} ({cube.hashmode_map[str(mode)]}) over {len(nodes)} VMs"
+    )
+    click.echo(
+        tabulate(
+            [
+                [name, *row[:2], row[2], row[3] / total, row[4]]
+                for name, row in summary.items()
+            ],
+            headers=["VM", "sku", "speed (H/s)", "chunks", "share", "hours"],
+            tablefmt="pipe",
+        )
+    )
+    if queue_db:
+        from workqueue import WorkQueue
+
+        queue = WorkQueue(queue_db)
+        queue.add_chunks(queued, hash_file)
+        queue.close()
+        log.info(f"Queued {len(queued)} chunks in {queue_db}")
+        return 0
+    if output_dir:
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        for name, lines in commands.items():
+            path = Path(output_dir) / f"{name}.sh"
+            with open(path, "w") as f:
+                f.write("#!/bin/bash\n\n" + "\n".join(lines) + "\n")
+            path.chmod(0o755)
+        log.info(f"Wrote {len(commands)} scripts to {output_dir}")
+        return 0
+    for name, lines in commands.items():
+        click.echo(f"\n# {name}")
+        click.echo("\n".join(lines))
+    return 0
+
+
+@cli.command()
+@click.option(
+    "--benchmark-input-file",
+    help="Benchmark data input file",
+    type=click.Path(readable=True, file_okay=True, dir_okay=False),
+    default="./data/benchmark.csv",
+)
+@click.option(
+    "--azure-input-file",
+    help="Azure costs input file",
+    type=click.Path(readable=True, file_okay=True, dir_okay=False),
+    default="./data/azure.csv",
+)
+@click.option(
+    "--hashmode-input-file",
+    help="CSV with hashcat hashmodes map",
+    type=click.Path(readable=True, file_okay=True, dir_okay=False),
+    default="./data/modes.csv",
+)
+@click.option(
+    "--throughput-file",
+    help="Throughput model (multi-GPU scaling, fractional GPUs, pure kernels) as JSON, applied when the file exists",
+    type=click.Path(file_okay=True, dir_okay=False),
+    default="./data/throughput.json",
+    envvar="THROUGHPUT_FILE",
+)
+@click.option(
+    "--calibration-file",
+    help="Apply the per-device, per-hashmode efficiency factors calibrate fitted into this file (e.g. ./data/calibration.json)",
+    type=click.Path(exists=True, file_okay=True, dir_okay=False),
+    default=None,
+    envvar="CALIBRATION_FILE",
+)
+@click.option(
+    "--cube-dir",
+    help="Directory with the precompiled cost cube, rebuilt when the input files change",
+    type=click.Path(file_okay=False, dir_okay=True),
+    default="./data/cube",
+    envvar="CUBE_DIR",
+)
+@click.option(
+    "--host",
+    help="Address to listen on",
+    type=str,
+    default="127.0.0.1",
+    envvar="SERVE_HOST",
+)
+@click.option(
+    "--port",
+    help="Port to listen on",
+    type=int,
+    default=8765,
+    envvar="SERVE_PORT",
+)
+@click.option(
+    "--log-level",
+    default="WARNING",
+    type=click.Choice(["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]),
+    show_default=True,
+    help="Set logging level.",
+    envvar="LOG_LEVEL",
+)
+@log_decorator
+@time_decorator
+def serve(
+    benchmark_input_file,
+    azure_input_file,
+    hashmode_input_file,
+    throughput_file,
+    calibration_file,
+    cube_dir,
+    host,
+    port,
+    log_level,
+):
+    """Answer policy cost queries over local HTTP (POST /query)"""
+    # ======================================================================
+    #                        Your script starts here!
+    # ======================================================================
+    from cube import load_cube
+    from server import make_server
+
+    cube = adjusted(
+        load_cube(
+            benchmark_input_file, azure_input_file, hashmode_input_file, cube_dir
+        ),
+        calibration_file,
+        throughput_file,
+    )
+    httpd = make_server(cube, host, port)
+    click.echo(f"Serving policy cost queries on http://{host}:{port}/query")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+    return 0
+
+
+@cli.command()
+@click.option(
+    "--benchmark-input-file",
+    help="Benchmark data input file",
+    type=click.Path(readable=True, file_okay=True, dir_okay=False),
+    default="./data/benchmark.csv",
+)
+@click.option(
+    "--azure-input-file",
+    help="Azure costs input file",
+    type=click.Path(readable=True, file_okay=True, dir_okay=False),
+    default="./data/azure.csv",
+)
+@click.option(
+    "--hashmode-input-file",
+    help="CSV with hashcat hashmodes map",
+    type=click.Path(readable=True, file_okay=True, dir_okay=False),
+    default="./data/modes.csv",
+)
+@click.option(
+    "--cube-dir",
+    help="Directory to write the precompiled cost cube to",
+    type=click.Path(file_okay=False, dir_okay=True),
+    default="./data/cube",
+    envvar="CUBE_DIR",
+)
+@click.option(
+    "--log-level",
+    default="WARNING",
+    type=click.Choice(["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]),
+    show_default=True,
+    help="Set logging level.",
+    envvar="LOG_LEVEL",
+)
+@log_decorator
+@time_decorator
+def build_cube(
+    benchmark_input_file, azure_input_file, hashmode_input_file, cube_dir, log_level
+):
+    """Precompile the benchmark and pricing data for calc and stats"""
+    # ======================================================================
+    #                        Your script starts here!
+    # ======================================================================
+    from cube import load_cube
+
+    cube = load_cube(
+        benchmark_input_file,
+        azure_input_file,
+        hashmode_input_file,
+        cube_dir,
+        rebuild=True,
+    )
+    click.echo(
+        f"Cost cube with {len(cube.devices)} devices, {len(cube.hashmodes)} hashmodes and {len(cube.skus)} SKUs written to {cube_dir}"
+    )
+    return 0
+
+
+@cli.command()
+@click.option(
+    "--benchmark-input-file",
+    help="Benchmark data input file",
+    type=click.Path(readable=True, file_okay=True, dir_okay=False),
+    default="./data/benchmark.csv",
+)
+@click.option(
+    "--azure-input-file",
+    help="Azure costs input file",
+    type=click.Path(readable=True, file_okay=True, dir_okay=False),
+    default="./data/azure.csv",
+)
+@click.option(
+    "--hashmode-input-file",
+    help="CSV with hashcat hashmodes map",
+    type=click.Path(readable=True, file_okay=True, dir_okay=False),
+    default="./data/modes.csv",
+)
+@click.option(
+    "--report-file",
+    help="JSON report spec (sections of kind hashmodes, pw_lens, charsets or experiments), repeat for several reports - the default is the article's report",
+    type=click.Path(exists=True, readable=True, file_okay=True, dir_okay=False),
+    multiple=True,
+)
+@click.option(
+    "--format",
+    "fmt",
+    help="Output format",
+    type=click.Choice(["markdown", "csv", "json"]),
+    default="markdown",
+    show_default=True,
+)
+@click.option(
+    "--output-dir",
+    help="Write every report here (CSV gets a file per section) instead of printing it",
+    type=click.Path(file_okay=False, dir_okay=True),
+    default=None,
+)
+@click.option(
+    "--workers",
+    help="Number of processes computing report sections in parallel",
+    type=int,
+    default=1,
+    show_default=True,
+)
+@click.option(
+    "--throughput-file",
+    help="Throughput model (multi-GPU scaling, fractional GPUs, pure kernels) as JSON, applied when the file exists",
+    type=click.Path(file_okay=True, dir_okay=False),
+    default="./data/throughput.json",
+    envvar="THROUGHPUT_FILE",
+)
+@click.option(
+    "--calibration-file",
+    help="Apply the per-device, per-hashmode efficiency factors calibrate fitted into this file (e.g. ./data/calibration.json)",
+    type=click.Path(exists=True, file_okay=True, dir_okay=False),
+    default=None,
+    envvar="CALIBRATION_FILE",
+)
+@click.option(
+    "--cube-dir",
+    help="Directory with the precompiled cost cube, rebuilt when the input files change",
+    type=click.Path(file_okay=False, dir_okay=True),
+    default="./data/cube",
+    envvar="CUBE_DIR",
+)
+@click.option(
+    "--log-level",
+    default="WARNING",
+    type=click.Choice(["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]),
+    show_default=True,
+    help="Set logging level.",
+    envvar="LOG_LEVEL",
+)
+@log_decorator
+@time_decorator
+def stats(
+    benchmark_input_file,
+    azure_input_file,
+    hashmode_input_file,
+    report_file,
+    fmt,
+    output_dir,
+    workers,
+    throughput_file,
+    calibration_file,
+    cube_dir,
+    log_level,
+):
+    """Compute the stats (as seen in the article)"""
+    # ======================================================================
+    #                        Your script starts here!
+    # ======================================================================
+    from cube import load_cube
+    from reports import (
+        default_report,
+        load_report,
+        run_reports,
+        to_json,
+        to_markdown,
+        write_report,
+    )
+
+    try:
+        reports = [load_report(f) for f in report_file] or [default_report]
+    except (ValueError, KeyError) as e:
+        raise click.UsageError(str(e))
+
+    # build (or refresh) the cube once here, the workers just map it
+    cube_args = (benchmark_input_file, azure_input_file, hashmode_input_file, cube_dir)
+    adjusted(load_cube(*cube_args), calibration_file, throughput_file)
+    try:
+        results = run_reports(
+            reports, cube_args, workers, (calibration_file, throughput_file)
+        )
+    except KeyError as e:
+        raise click.UsageError(e.args[0])
+
+    for report, sections in results:
+        if output_dir:
+            for path in write_report(report, sections, output_dir, fmt):
+                log.info(f"Wrote {path}")
+        elif fmt == "markdown":
+            click.echo(to_markdown(sections))
+        elif fmt == "json":
+            click.echo(to_json(sections))
+        else:
+            for section, table in sections:
+                click.echo(f"# {section['name']}")
+                click.echo(table.to_csv(index=False), nl=False)
+    return 0
+
+
+@cli.command()
+@click.option(
+    "--experiment-dir",
+    default="./experiment",
+    type=click.Path(dir_okay=True, file_okay=False, writable=True),
+    help="Directory to generate the hashes and passwords to",
+)
+@click.option(
+    "--spec-file",
+    help="JSON experiment spec (modes, lengths, charsets and count per cell), defaults to the article's experiment",
+    type=click.Path(exists=True, dir_okay=False, readable=True),
+)
+@click.option(
+    "--chunk-size",
+    default=100000,
+    show_default=True,
+    help="Passwords per hash file",
+)
+@click.option(
+    "--workers",
+    type=int,
+    help="Processes hashing chunks, defaults to the number of CPUs",
+)
+@click.option(
+    "--scrypt-n", type=int, help="scrypt N (CPU/memory cost), overrides the spec"
+)
+@click.option("--scrypt-r", type=int, help="scrypt r (block size), overrides the spec")
+@click.option("--scrypt-p", type=int, help="scrypt p (parallelism), overrides the spec")
+@click.option("--seed", help="Seed for reproducible passwords and salts")
+@click.option(
+    "--log-level",
+    default="WARNING",
+    type=click.Choice(["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]),
+    show_default=True,
+    help="Set logging level.",
+    envvar="LOG_LEVEL",
+)
+@log_decorator
+@time_decorator
+def gen_experiment(
+    experiment_dir,
+    spec_file,
+    chunk_size,
+    workers,
+    scrypt_n,
+    scrypt_r,
+    scrypt_p,
+    seed,
+    log_level,
+):
+    """Generate files for running the cracking experiment"""
+    # ======================================================================
+    #                        Your script starts here!
+    # ======================================================================
+    from corpus import default_spec, generate, load_spec
+
+    spec = load_spec(spec_file) if spec_file else default_spec
+    overrides = {"n": scrypt_n, "r": scrypt_r, "p": scrypt_p}
+    spec = dict(
+        spec,
+        scrypt=dict(
+            spec.get("scrypt", {}), **{k: v for k, v in overrides.items() if v}
+        ),
+    )
+    try:
+        counts = generate(spec, experiment_dir, chunk_size, workers, seed)
+    except (ValueError, KeyError) as e:
+        raise click.UsageError(str(e))
+    for dname, count in counts.items():
+        log.info(f"Generated {count} passwords in {Path(experiment_dir) / dname}")
+
+
+@cli.command()
+@click.argument(
+    "paths",
+    nargs=-1,
+    required=True,
+    type=click.Path(exists=True, file_okay=True, dir_okay=True),
+)
+@click.option(
+    "--pattern",
+    help="Glob for run logs when walking directories",
+    type=str,
+    default="*_log.txt",
+    show_default=True,
+)
+@click.option(
+    "--sku",
+    help="Azure SKU the logged runs were done on",
+    type=str,
+    default="Standard_NC6s_v3",
+    show_default=True,
+)
+@click.option(
+    "--mode",
+    help="Hash mode of --status-json runs whose target isn't named like hash_<mode>_...",
+    type=int,
+    default=None,
+)
+@click.option(
+    "--min-samples",
+    help="Measured runs a hashmode needs before it gets a factor",
+    type=int,
+    default=3,
+    show_default=True,
+)
+@click.option(
+    "--max-ratio",
+    help="Skip runs measuring more than this many times faster or slower than the benchmark",
+    type=float,
+    default=5.0,
+    show_default=True,
+)
+@click.option(
+    "--calibration-file",
+    help="JSON file with the ingested runs and the fitted efficiency factors",
+    type=click.Path(file_okay=True, dir_okay=False),
+    default="./data/calibration.json",
+    envvar="CALIBRATION_FILE",
+)
+@click.option(
+    "--throughput-file",
+    help="Throughput model (multi-GPU scaling, fractional GPUs, pure kernels) as JSON, applied when the file exists",
+    type=click.Path(file_okay=True, dir_okay=False),
+    default="./data/throughput.json",
+    envvar="THROUGHPUT_FILE",
+)
+@click.option(
+    "--benchmark-input-file",
+    help="Benchmark data input file",
+    type=click.Path(readable=True, file_okay=True, dir_okay=False),
+    default="./data/benchmark.csv",
+)
+@click.option(
+    "--azure-input-file",
+    help="Azure costs input file",
+    type=click.Path(readable=True, file_okay=True, dir_okay=False),
+    default="./data/azure.csv",
+)
+@click.option(
+    "--hashmode-input-file",
+    help="CSV with hashcat hashmodes map",
+    type=click.Path(readable=True, file_okay=True, dir_okay=False),
+    default="./data/modes.csv",
+)
+@click.option(
+    "--cube-dir",
+    help="Directory with the precompiled cost cube, rebuilt when the input files change",
+    type=click.Path(file_okay=False, dir_okay=True),
+    default="./data/cube",
+    envvar="CUBE_DIR",
+)
+@click.option(
+    "--log-level",
+    default="WARNING",
+    type=click.Choice(["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]),
+    show_default=True,
+    help="Set logging level.",
+    envvar="LOG_LEVEL",
+)
+@log_decorator
+@time_decorator
+def calibrate(
+    paths,
+    pattern,
+    sku,
+    mode,
+    min_samples,
+    max_ratio,
+    calibration_file,
+    throughput_file,
+    benchmark_input_file,
+    azure_input_file,
+    hashmode_input_file,
+    cube_dir,
+    log_level,
+):
+    """Fit per-hashmode efficiency factors from experiment run logs"""
+    # ======================================================================
+    #                        Your script starts here!
+    # ======================================================================
+    from calibration import (
+        compare,
+        fit_factors,
+        load_calibration,
+        parse_run_log,
+        save_calibration,
+    )
+    from cube import apply_models, load_cube
+    from tabulate import tabulate
+
+    files = list()
+    for p in map(Path, paths):
+        files += (
+            sorted(x for x in p.rglob(pattern) if x.is_file()) if p.is_dir() else [p]
+        )
+
+    calibration = load_calibration(calibration_file)
+    new_runs = 0
+    for path in files:
+        digest = file_sha256(path)
+        if digest in calibration["ingested"]:
+            continue
+        runs = parse_run_log(path, mode)
+        if not runs:
+            log.warning(f"No timed runs in {path}")
+        for run in runs:
+            run.update({"source": str(path), "sku": sku})
+        calibration["observations"] += runs
+        calibration["ingested"][digest] = {"path": str(path), "runs": len(runs)}
+        new_runs += len(runs)
+    log.info(f"{new_runs} new runs, {len(calibration['observations'])} in total")
+
+    # always against the current benchmark speeds and throughput model, the
+    # factors are what calc's VM speeds are still missing
+    cube = apply_models(
+        load_cube(
+            benchmark_input_file, azure_input_file, hashmode_input_file, cube_dir
+        ),
+        throughput_file=throughput_file,
+    )
+    rows = compare(cube, calibration["observations"])
+    calibration["factors"] = fit_factors(rows, min_samples, max_ratio)
+    calibration["throughput"] = vars(cube.throughput)
+    save_calibration(calibration, calibration_file)
+
+    if not rows:
+        click.echo("No runs to compare against the benchmarks")
+        return 0
+    columns = ["target", "mode", "sku", "measured", "seconds", "speed"]
+    columns += ["predicted speed", "efficiency", "used"]
+    click.echo(
+        tabulate(
+            [[r.get(c) for c in columns] for r in rows],
+            headers=columns,
+            tablefmt="pipe",
+        )
+    )
+    click.echo()
+    if not calibration["factors"]:
+        click.echo(
+            f"No hashmode has {min_samples} measured runs within {max_ratio:g}x of the benchmarks, no factors"
+        )
+        return 0
+    click.echo(
+        tabulate(
+            [
+                [device, int(m), cube.hashmode_map.get(m, ""), *f.values()]
+                for device, modes in calibration["factors"].items()
+                for m, f in modes.items()
+            ],
+            headers=["device", "mode", "hash", "factor", "samples", "min", "max"],
+            tablefmt="pipe",
+        )
+    )
+    return 0
+
+
+@cli.command()
+@click.option(
+    "--queue-db",
+    help="sqlite work queue filled by plan --queue-db",
+    type=click.Path(exists=True, file_okay=True, dir_okay=False),
+    required=True,
+)
+@click.option(
+    "--workers",
+    help="Number of worker processes on this machine (one per GPU box is usual)",
+    type=int,
+    default=1,
+    show_default=True,
+)
+@click.option(
+    "--cracker",
+    help="hashcat compatible command the chunks run with",
+    type=str,
+    default="hashcat",
+    show_default=True,
+)
+@click.option(
+    "--lease",
+    help="Seconds a chunk stays leased without a heartbeat before it's requeued",
+    type=float,
+    default=120,
+    show_default=True,
+)
+@click.option(
+    "--poll",
+    help="Seconds between claims while other workers still hold chunks",
+    type=float,
+    default=5,
+    show_default=True,
+)
+@click.option(
+    "--max-attempts",
+    help="Give up on a chunk after this many failed or expired runs",
+    type=int,
+    default=3,
+    show_default=True,
+)
+@click.option(
+    "--output-dir",
+    help="Directory for the crackers' outfiles",
+    type=click.Path(file_okay=False, dir_okay=True),
+    default=".",
+    show_default=True,
+)
+@click.option(
+    "--log-level",
+    default="WARNING",
+    type=click.Choice(["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]),
+    show_default=True,
+    help="Set logging level.",
+    envvar="LOG_LEVEL",
+)
+@log_decorator
+@time_decorator
+def work(
+    queue_db,
+    workers,
+    cracker,
+    lease,
+    poll,
+    max_attempts,
+    output_dir,
+    log_level,
+):
+    """Crack chunks from a work queue until it's drained or every hash is found"""
+    # ======================================================================
+    #                        Your script starts here!
+    # ======================================================================
+    from concurrent.futures import ProcessPoolExecutor
+    from workqueue import WorkQueue, run_worker, worker_name
+
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    args = [cracker, lease, poll, output_dir, max_attempts]
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [
+            pool.submit(run_worker, queue_db, worker_name(i), *args)
+            for i in range(max(1, workers))
+        ]
+        done = sum(f.result() for f in futures)
+
+    queue = WorkQueue(queue_db)
+    found, counts = queue.found(), queue.counts()
+    queue.close()
+    click.echo(f"Cracked {done} chunks here, queue: {counts}")
+    for row in found:
+        click.echo(f"{row['hash']}:{row['password']}")
+    return 0
+
+
+@cli.command()
+@click.option(
+    "--queue-db",
+    help="sqlite work queue filled by plan --queue-db",
+    type=click.Path(exists=True, file_okay=True, dir_okay=False),
+    required=True,
+)
+@click.option(
+    "--log-level",
+    default="WARNING",
+    type=click.Choice(["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]),
+    show_default=True,
+    help="Set logging level.",
+    envvar="LOG_LEVEL",
+)
+@log_decorator
+@time_decorator
+def queue_status(queue_db, log_level):
+    """Show chunk counts, running chunks and found passwords of a work queue"""
+    # ======================================================================
+    #                        Your script starts here!
+    # ======================================================================
+    from tabulate import tabulate
+    from workqueue import WorkQueue
+
+    queue = WorkQueue(queue_db)
+    counts = queue.counts()
+    click.echo(
+        tabulate(
+            [[s, counts.get(s, 0)] for s in ["pending", "running", "done", "failed"]],
+            headers=["status", "chunks"],
+            tablefmt="pipe",
+        )
+    )
+    if queue.stopped():
+        click.echo("\nStopped, every hash is cracked")
+    running = queue.running()
+    if running:
+        now = time.time()
+        click.echo()
+        click.echo(
+            tabulate(
+                [
+                    [
+                        r["id"],
+                        r["node"],
+                        r["worker"],
+                        r["progress"] / r["total"] if r["total"] else None,
+                        now - r["started"],
+                    ]
+                    for r in running
+                ],
+                headers=["chunk", "node", "worker", "progress", "seconds"],
+                tablefmt="pipe",
+            )
+        )
+    found = queue.found()
+    if found:
+        click.echo()
+        click.echo(
+            tabulate(
+                [list(r) for r in found],
+                headers=["hash", "password", "chunk", "worker"],
+                tablefmt="pipe",
+                disable_numparse=True,
+            )
+        )
+    queue.close()
+    return 0
 
 
 if __name__ == "__main__":
@@ -0,0 +1,269 @@
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from profiling import stage
+from utils import calculate_policy_size, charset_lenghts, enrich_cost_time
+
+log = logging.getLogger("pwpolicylogger")
+
+# the report stats has always printed, as a spec
+default_report = {
+    "name": "stats",
+    "sections": [
+        {
+            "name": "hashmodes",
+            "kind": "hashmodes",
+            "title": "Different hashes on password length 8",
+            "pw_len": 8,
+            "charset": "ascii_printable",
+            "hashmodes": [0, 10, 100, 1000, 1400, 3200, 8900],
+        },
+        {
+            "name": "md5_lower",
+            "kind": "pw_lens",
+            "title": "MD5 on password lengths (lower) from 6",
+            "mode": 0,
+            "charset": "lowercase",
+            "pw_lens": [6, 15],
+        },
+        {
+            "name": "md5_ascii",
+            "kind": "pw_lens",
+            "title": "MD5 on password lengths (lower, upper, nums, symbols) from 6",
+            "mode": 0,
+            "charset": "ascii_printable",
+            "pw_lens": [6, 15],
+        },
+        {
+            "name": "charsets",
+            "kind": "charsets",
+            "title": "Different charsets on MD5, password length 12",
+            "mode": 0,
+            "pw_len": 12,
+            "charsets": list(charset_lenghts),
+        },
+        {
+            "name": "experiments",
+            "kind": "experiments",
+            "sku": "Standard_NC6s_v3",
+            "experiments": [
+                {"mode": 0, "len": 8, "charset": "ascii_printable", "full": True},
+                {"mode": 0, "len": 11, "charset": "lowercase", "full": True},
+                {"mode": 100, "len": 7, "charset": "ascii_printable", "full": True},
+                {"mode": 1400, "len": 7, "charset": "ascii_printable", "full": True},
+                {"mode": 1410, "len": 7, "charset": "ascii_printable", "full": True},
+                {"mode": 1700, "len": 7, "charset": "ascii_printable", "full": True},
+                {"mode": 8900, "len": 5, "charset": "ascii_printable", "full": True},
+            ],
+        },
+    ],
+}
+
+
+def load_report(report_file):
+    with open(report_file) as f:
+        report = json.load(f)
+    report.setdefault("name", Path(report_file).stem)
+    for i, section in enumerate(report["sections"]):
+        if section.get("kind") not in section_kinds:
+            raise ValueError(
+                f"Section {i} of {report_file} has unknown kind {section.get('kind')}, "
+                f"expected one of {list(section_kinds)}"
+            )
+        section.setdefault("name", f"section{i}")
+    return report
+
+
+def _charset_length(charset):
+    return charset_lenghts.get(charset, charset)
+
+
+def _cheapest(frames, mode, pw_len, policy_size, sku=None):
+    frame = frames[mode]
+    # pure kernels past the optimized max length, like calc prices them
+    frame["speed"] *= float(frames.cube.throughput.kernel_efficiency(mode, pw_len))
+    relevant_hashes = enrich_cost_time(frame, policy_size)
+    if sku is not None:
+        if sku not in frames.cube.skus:
+            raise KeyError(f"Unknown SKU {sku}")
+        relevant_hashes = relevant_hashes.loc[relevant_hashes["sku"] == sku]
+    relevant_hashes = relevant_hashes.dropna(subset=["policy_cost"])
+    if relevant_hashes.empty:
+        raise KeyError(f"No prices for hashmode {mode} on {sku or 'any SKU'}")
+    index = relevant_hashes["policy_cost"].idxmin()
+    return relevant_hashes.loc[index]
+
+
+def _price(row):
+    return str(round(row["policy_cost"], 3)) + "$"
+
+
+def hashmodes_section(frames, section):
+    import pandas as pd
+
+    policy_size = calculate_policy_size(
+        _charset_length(section["charset"]), section["pw_len"]
+    )
+    hashmodes = section["hashmodes"]
+    return pd.DataFrame(
+        {
+            "Hashmode": hashmodes,
+            "Hash": [frames.cube.hashmode_map.get(str(h), "") for h in hashmodes],
+            "Cracking price": [
+                _price(_cheapest(frames, h, section["pw_len"], policy_size))
+                for h in hashmodes
+            ],
+        }
+    )
+
+
+def pw_lens_section(frames, section):
+    import pandas as pd
+
+    # [first, last] like the range flags
+    pw_lens = range(section["pw_lens"][0], section["pw_lens"][-1] + 1)
+    charset_length = _charset_length(section["charset"])
+    prices = [
+        _price(
+            _cheapest(
+                frames, section["mode"], p, calculate_policy_size(charset_length, p)
+            )
+        )
+        for p in pw_lens
+    ]
+    return pd.DataFrame({"Password length": pw_lens, "Cracking price": prices})
+
+
+def charsets_section(frames, section):
+    import pandas as pd
+
+    charsets = section["charsets"]
+    cs_lens = [_charset_length(c) for c in charsets]
+    prices = [
+        _price(
+            _cheapest(
+                frames,
+                section["mode"],
+                section["pw_len"],
+                calculate_policy_size(c, section["pw_len"]),
+            )
+        )
+        for c in cs_lens
+    ]
+    return pd.DataFrame(
+        {"Charset": charsets, "Charset lenght": cs_lens, "Cracking price": prices}
+    )
+
+
+def experiments_section(frames, section):
+    import pandas as pd
+
+    table = list()
+    for exp in section["experiments"]:
+        policy_size = calculate_policy_size(_charset_length(exp["charset"]), exp["len"])
+        table.append(
+            dict(
+                _cheapest(frames, exp["mode"], exp["len"], policy_size, section["sku"])
+            )
+        )
+    return pd.DataFrame.from_dict(table)
+
+
+section_kinds = {
+    "hashmodes": hashmodes_section,
+    "pw_lens": pw_lens_section,
+    "charsets": charsets_section,
+    "experiments": experiments_section,
+}
+
+# per worker process. The cube is memory-mapped so all of them share the
+# pages of the cube files, and each only builds the hashmode tables its
+# sections ask for
+_frames = None
+
+
+def _init_worker(cube_args, models=(None, None)):
+    global _frames
+    from cube import apply_models, load_cube
+
+    cube = apply_models(load_cube(*cube_args), *models)
+    _frames = cube.mode_frames()
+
+
+def _run_section(section):
+    with stage(f"section {section['name']}"):
+        try:
+            return section_kinds[section["kind"]](_frames, section)
+        except KeyError as e:
+            raise KeyError(f"Section {section['name']}: {e.args[0]}") from None
+
+
+def run_reports(reports, cube_args, workers=1, models=(None, None)):
+    """Compute every section of every report, each one as its own task.
+
+    cube_args are the load_cube arguments, the cube has to be built already
+    for the workers to just map it. models are the (calibration file,
+    throughput file) cube.apply_models puts on top, like calc. Returns a list of (report, [(section,
+    DataFrame)]) in spec order.
+    """
+    sections = [s for r in reports for s in r["sections"]]
+    if workers > 1 and len(sections) > 1:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(sections)),
+            initializer=_init_worker,
+            initargs=(cube_args, models),
+        ) as pool:
+            tables = list(pool.map(_run_section, sections))
+    else:
+        _init_worker(cube_args, models)
+        tables = [_run_section(s) for s in sections]
+
+    results = list()
+    tables = iter(tables)
+    for report in reports:
+        results.append((report, [(s, next(tables)) for s in report["sections"]]))
+    return results
+
+
+def to_markdown(sections):
+    out = list()
+    for section, table in sections:
+        if section.get("title"):
+            out.append(section["title"])
+        out.append(table.to_markdown())
+        out.append("")
+    # the last section never had a blank line after it
+    return "\n".join(out[:-1])
+
+
+def to_json(sections):
+    return json.dumps(
+        [
+            {
+                "name": section["name"],
+                "title": section.get("title", ""),
+                "rows": json.loads(table.to_json(orient="records")),
+            }
+            for section, table in sections
+        ],
+        indent=2,
+    )
+
+
+def write_report(report, sections, output_dir, fmt):
+    """Write one report to output_dir, CSV gets one file per section."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    written = list()
+    if fmt == "csv":
+        for section, table in sections:
+            path = output_dir / f"{report['name']}_{section['name']}.csv"
+            table.to_csv(path, index=False)
+            written.append(path)
+        return written
+    path = output_dir / f"{report['name']}.{'md' if fmt == 'markdown' else fmt}"
+    with open(path, "w") as f:
+        f.write(to_markdown(sections) if fmt == "markdown" else to_json(sections))
+        f.write("\n")
+    return [path]
@@ -0,0 +1,106 @@
+import json
+import logging
+import numpy as np
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from utils import charset_lenghts
+
+log = logging.getLogger("pwpolicylogger")
+
+
+def answer_queries(cube, queries):
+    """Answer a batch of JSON queries with a single vectorized cube lookup.
+
+    Each query looks like {"mode": 0, "pw_len": 8, "charset": 95, "sku": "cheapest"},
+    charset can also be a name from charset_lenghts. Missing keys fall back
+    to the calc defaults.
+    """
+    modes, pw_lens, charset_lens, skus = list(), list(), list(), list()
+    for q in queries:
+        charset = q.get("charset", q.get("charset_length", 95))
+        modes.append(int(q.get("mode", 0)))
+        pw_lens.append(int(q.get("pw_len", 8)))
+        charset_lens.append(int(charset_lenghts.get(charset, charset)))
+        skus.append(q.get("sku", "cheapest"))
+        if pw_lens[-1] < 0 or charset_lens[-1] < 1:
+            raise ValueError("no feasible policy, it allows no password")
+    if not queries:
+        return list()
+
+    result = cube.query(modes, pw_lens, charset_lens, skus)
+    answers = list()
+    for i in range(len(queries)):
+        row = {k: v[i] for k, v in result.items()}
+        answers.append(
+            {
+                "mode": int(row["mode"]),
+                "hash": cube.hashmode_map.get(str(row["mode"]), ""),
+                "pw_len": int(row["pw_len"]),
+                "charset_length": int(row["charset_length"]),
+                "sku": row["sku"],
+                "device": row["device"],
+                "policy_cost": _json_float(row["policy_cost"]),
+                "policy_time": _json_float(row["policy_time (s)"]),
+                "policy_cost_log10": _json_float(row["policy_cost (log10)"]),
+                "policy_time_log10": _json_float(row["policy_time (log10 s)"]),
+                "policy_cost_optimistic": _json_float(row["policy_cost (optimistic)"]),
+                "policy_cost_pessimistic": _json_float(
+                    row["policy_cost (pessimistic)"]
+                ),
+                "policy_cost_optimistic_log10": _json_float(
+                    row["policy_cost (optimistic, log10)"]
+                ),
+                "policy_cost_pessimistic_log10": _json_float(
+                    row["policy_cost (pessimistic, log10)"]
+                ),
+                "samples": int(row["samples"]),
+            }
+        )
+    return answers
+
+
+def _json_float(value):
+    # json has no inf/nan, null it is
+    return float(value) if np.isfinite(value) else None
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    cube = None
+
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_json(200, {"status": "ok", "skus": self.cube.skus.tolist()})
+        else:
+            self.send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if self.path != "/query":
+            self.send_json(404, {"error": "Not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            batch = isinstance(body, list)
+            answers = answer_queries(self.cube, body if batch else [body])
+        except (ValueError, TypeError, AttributeError) as e:
+            self.send_json(400, {"error": f"Bad query - {e}"})
+            return
+        except KeyError as e:
+            self.send_json(400, {"error": e.args[0]})
+            return
+        self.send_json(200, answers if batch else answers[0])
+
+    def send_json(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        log.debug("%s - %s", self.address_string(), format % args)
+
+
+def make_server(cube, host="127.0.0.1", port=8765):
+    handler = type("CubeQueryHandler", (QueryHandler,), {"cube": cube})
+    return ThreadingHTTPServer((host, port), handler)
@@ -0,0 +1,29 @@
+from pathlib import Path
+
+import pytest
+from calibration import compare
+from cube import load_cube
+from throughput import ThroughputModel
+
+data = Path(__file__).resolve().parent.parent / "data"
+
+
+@pytest.fixture(scope="module")
+def cube():
+    cube = load_cube(data / "benchmark.csv", data / "azure.csv", data / "modes.csv")
+    model = ThroughputModel(
+        scaling=0.9, pure={"default": 0.5}, optimized_max_len={"default": 7}
+    )
+    return cube.with_throughput(model)
+
+
+@pytest.mark.parametrize("sku", ["Standard_NC6s_v3", "Standard_NC24s_v3"])
+@pytest.mark.parametrize("length", [None, 6, 9])
+def test_compare_predicts_the_priced_vm_speed(cube, sku, length):
+    obs = {"target": "t", "mode": 0, "sku": sku, "length": length, "speed": 1e10}
+    (row,) = compare(cube, [obs])
+    s = list(cube.skus).index(sku)
+    assert row["predicted speed"] == pytest.approx(
+        cube.vm_speed(cube.mode_index([0])[0], length or 0)[s]
+    )
+    assert row["efficiency"] == pytest.approx(1e10 / row["predicted speed"])
@@ -0,0 +1,21 @@
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+from pw_policy_cost_tool import cli
+
+
+@pytest.mark.parametrize(
+    "args, hint",
+    [
+        (["--pw-len", "abc"], "--pw-len"),
+        (["--pw-len", "10-8"], "--pw-len"),
+        (["--charset-length", "foo"], "--charset-length"),
+        (["--mode", ","], "--mode"),
+    ],
+)
+def test_calc_bad_ranges_are_usage_errors(monkeypatch, args, hint):
+    monkeypatch.chdir(Path(__file__).parent.parent)
+    result = CliRunner().invoke(cli, ["calc", *args])
+    assert result.exit_code == 2, result.output
+    assert hint in result.output
@@ -0,0 +1,61 @@
+import math
+from pathlib import Path
+
+import pytest
+from cube import load_cube
+
+data = Path(__file__).resolve().parent.parent / "data"
+
+
+@pytest.fixture(scope="module")
+def cube():
+    return load_cube(data / "benchmark.csv", data / "azure.csv", data / "modes.csv")
+
+
+def brute_force_deadline(cube, mode, pw_len, charset_len, deadline, max_vms):
+    overhead, granularity = 300, 60
+    skus, work, vm_price = cube.fleet(mode, pw_len, charset_len)
+    best = dict()
+    for sku, w, price in zip(skus, work, vm_price):
+        for vms in range(1, max_vms + 1):
+            wall = overhead + w / vms
+            if wall > deadline:
+                continue
+            cost = price * (vms * math.ceil(wall / granularity) * granularity) / 3600
+            if sku not in best or cost < best[sku][1]:
+                best[sku] = (vms, cost)
+    return {cube.skus[sku]: fleet for sku, fleet in best.items()}
+
+
+@pytest.mark.parametrize(
+    "mode, pw_len, charset_len, hours",
+    [
+        (0, 9, 62, 0.5),
+        (100, 9, 62, 2),
+        (0, 8, 95, 1),
+        (1400, 8, 62, 4),
+        (1000, 9, 26, 0.25),
+        (1700, 10, 26, 12),
+    ],
+)
+def test_deadline_matches_brute_force(cube, mode, pw_len, charset_len, hours):
+    max_vms = 64
+    table = cube.deadline(mode, pw_len, charset_len, hours * 3600, max_vms)
+    expected = brute_force_deadline(
+        cube, mode, pw_len, charset_len, hours * 3600, max_vms
+    )
+    assert set(table["sku"]) == set(expected)
+    for sku, vms, cost in zip(table["sku"], table["VMs"], table["policy_cost"]):
+        assert cost == pytest.approx(expected[sku][1])
+        assert vms == expected[sku][0]
+    assert list(table["policy_cost"]) == sorted(table["policy_cost"])
+
+
+@pytest.mark.parametrize("sku", ["cheapest", "Standard_NC24s_v3", "Standard_NC6s_v3"])
+@pytest.mark.parametrize("mode, pw_len", [(0, 8), (0, 10), (1400, 9), (3200, 6)])
+def test_cost_lies_within_its_error_bars(cube, sku, mode, pw_len):
+    from server import answer_queries
+
+    (row,) = answer_queries(cube, [{"mode": mode, "pw_len": pw_len, "sku": sku}])
+    assert row["policy_cost_optimistic"] == pytest.approx(row["policy_cost"])
+    assert row["policy_cost"] <= row["policy_cost_pessimistic"] * (1 + 1e-12)
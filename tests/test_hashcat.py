@@ -0,0 +1,35 @@
+import pytest
+from benchmarks.hashcat import iter_hashcat_benchmark
+
+log = """\
+* Device #1: Tesla V100-SXM2-16GB, 15999/16150 MB, 80MCU
+* Device #2: Tesla T4, skipped
+
+Hashmode: 0 - MD5
+
+Speed.#1.........: 56168.1 MH/s (51.68ms) @ Accel:256 Loops:1024 Thr:512 Vec:1
+Speed.#*.........:   111.1 GH/s
+
+* Hash-Mode 100 (SHA1)
+
+Speed.#1.........: 17613.9 kH/s (81.88ms)
+"""
+rows = [
+    ("Tesla V100-SXM2-16GB #1", "0", 56168.1e6),
+    ("Tesla V100-SXM2-16GB #1", "100", 17613.9e3),
+]
+
+
+@pytest.mark.parametrize(
+    "lines",
+    [
+        log,
+        log.splitlines(keepends=True),
+        # what requests' response.iter_lines() yields
+        [line.encode() for line in log.splitlines()],
+    ],
+)
+def test_iter_hashcat_benchmark(lines):
+    parsed = list(iter_hashcat_benchmark(lines))
+    assert [row[:2] for row in parsed] == [row[:2] for row in rows]
+    assert [row[2] for row in parsed] == pytest.approx([row[2] for row in rows])
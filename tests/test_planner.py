@@ -0,0 +1,70 @@
+import math
+
+import planner
+import pytest
+from planner import mask_jobs, plan_chunks, policy_masks, split_keyspace
+from policy import Policy
+
+
+@pytest.fixture(autouse=True)
+def no_hashcat(monkeypatch):
+    monkeypatch.setattr(planner, "hashcat_keyspace", lambda *args: None)
+
+
+def test_length_policy_masks():
+    masks = policy_masks(Policy.parse("6-8:lu"))
+    assert [m for m, _ in masks] == ["?1" * 6, "?1" * 7, "?1" * 8]
+    assert all(custom == {"1": "?l?u"} for _, custom in masks)
+
+
+def test_policy_masks_skip_the_empty_password():
+    assert [m for m, _ in policy_masks(Policy.parse("0-2:l"))] == ["?1", "?1?1"]
+    with pytest.raises(ValueError):
+        mask_jobs(Policy.parse("0-0:l"), 0)
+
+
+def test_policy_masks_reject_required_classes():
+    with pytest.raises(ValueError):
+        policy_masks(Policy.parse("8-8:lud:lud"))
+
+
+@pytest.mark.parametrize(
+    "sizes, mode, base, amp",
+    [
+        ([26], 0, 1, 26),
+        ([26] * 5, 0, 26**4, 26),
+        ([26] * 6, 0, 26**4, 26**2),
+        ([26] * 8, 0, 26**6, 26**2),
+        ([10] * 8, 0, 10**5, 10**3),
+        ([26] * 8, 3200, 26**7, 26),
+    ],
+)
+def test_split_keyspace(sizes, mode, base, amp):
+    assert split_keyspace(sizes, mode) == (base, amp)
+    assert base * amp == math.prod(sizes)
+
+
+def test_keyspace_only_for_a_single_mask():
+    (job,) = mask_jobs(Policy.parse("?l?l?l?l?l"), 0, keyspace=26**4)
+    assert (job["base"], job["amp"]) == (26**4, 26)
+    with pytest.raises(ValueError):
+        mask_jobs(Policy.parse("6-8:l"), 0, keyspace=26**4)
+
+
+@pytest.mark.parametrize("base", [1, 7, 1000, 26**6 + 1])
+@pytest.mark.parametrize("speeds", [[1e6], [3e6, 1e6], [1e9, 5e8, 1.0]])
+def test_plan_chunks_cover_the_base_keyspace(base, speeds):
+    jobs = [{"base": base, "amp": 26}]
+    nodes = [{"name": f"vm{i}", "speeds": [s]} for i, s in enumerate(speeds)]
+    chunks = plan_chunks(jobs, nodes, chunk_seconds=60)
+    position = 0
+    for chunk in chunks:
+        assert chunk["skip"] == position and chunk["limit"] > 0
+        position += chunk["limit"]
+    assert position == base
+
+
+def test_plan_chunks_limit():
+    nodes = [{"name": "vm", "speeds": [1.0]}]
+    with pytest.raises(ValueError):
+        plan_chunks([{"base": 10**6, "amp": 1}], nodes, 1, max_chunks=10)
@@ -0,0 +1,19 @@
+import math
+
+import pytest
+from policy import Policy, log_keyspaces
+
+
+@pytest.mark.parametrize("spec", ["2-2:lud:lud", "8-4:l", "8-8:", "5-3:lu"])
+def test_parse_rejects_policies_without_passwords(spec):
+    with pytest.raises(ValueError):
+        Policy.parse(spec)
+
+
+@pytest.mark.parametrize("spec", ["3-3:lud:lud", "2-4:lud:lud", "0-0:l"])
+def test_smallest_feasible_policies_have_passwords(spec):
+    policy = Policy.parse(spec)
+    assert policy.exact_keyspace() > 0
+    assert log_keyspaces([policy])[0] == pytest.approx(
+        math.log(policy.exact_keyspace())
+    )
@@ -0,0 +1,30 @@
+from pathlib import Path
+
+import pytest
+from reports import run_reports
+
+data = Path(__file__).resolve().parent.parent / "data"
+cube_args = (data / "benchmark.csv", data / "azure.csv", data / "modes.csv")
+
+
+@pytest.mark.parametrize(
+    "section, message",
+    [
+        (
+            {
+                "kind": "experiments",
+                "sku": "Nope",
+                "experiments": [{"mode": 0, "len": 8, "charset": 26}],
+            },
+            "Unknown SKU Nope",
+        ),
+        (
+            {"kind": "hashmodes", "pw_len": 8, "charset": 26, "hashmodes": [0, 77777]},
+            "77777",
+        ),
+    ],
+)
+def test_bad_sections_name_themselves(section, message):
+    report = {"name": "r", "sections": [{"name": "bad", **section}]}
+    with pytest.raises(KeyError, match=f"Section bad: .*{message}"):
+        run_reports([report], cube_args)
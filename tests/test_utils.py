@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from utils import charset_lenghts, normalize_device, parse_int_range, save_npy
+
+
+@pytest.mark.parametrize(
+    "device, card",
+    [
+        ("GeForce RTX 2070 SUPER #1", "RTX 2070 SUPER"),
+        ("NVIDIA GeForce RTX 3090 #2", "RTX 3090"),
+        ("NVIDIA GeForce RTX 4080", "RTX 4080"),
+        ("RTX 4080 SUPER", "RTX 4080 SUPER"),
+        ("NVIDIA GeForce RTX 4070 Ti SUPER", "RTX 4070 Ti SUPER"),
+        ("NVIDIA GeForce RTX 3080 Laptop GPU", "RTX 3080 Laptop GPU"),
+        ("NVIDIA GeForce RTX 2070", "RTX 2070"),
+        ("NVIDIA GeForce GTX 1660 Ti", "GTX 1660 Ti"),
+        ("NVIDIA L4", "L4"),
+        ("NVIDIA H100 80GB HBM3", "H100"),
+    ],
+)
+def test_normalize_device(device, card):
+    assert normalize_device(device) == card
+
+
+@pytest.mark.parametrize(
+    "device",
+    ["NVIDIA GeForce RTX 3060 LHR", "NVIDIA GeForce RTX 4090 D", "Apple M3 Pro"],
+)
+def test_unknown_variants_stay_unmapped(device):
+    assert normalize_device(device) is None
+
+
+def test_variants_dont_share_a_card():
+    cards = {
+        normalize_device(d)
+        for d in ["RTX 2070", "RTX 2070 SUPER", "RTX 3080", "RTX 3080 Laptop GPU"]
+    }
+    assert len(cards) == 4
+
+
+@pytest.mark.parametrize(
+    "value, values",
+    [("8", [8]), ("6-8", [6, 7, 8]), ("0,100,1400-1401", [0, 100, 1400, 1401])],
+)
+def test_parse_int_range(value, values):
+    assert parse_int_range(value) == values
+
+
+def test_parse_int_range_names():
+    assert parse_int_range("lowercase,10", charset_lenghts) == [26, 10]
+
+
+@pytest.mark.parametrize("value", ["abc", "foo", ",", "", "10-8", "6-x", "1,,2"])
+def test_parse_int_range_rejects(value):
+    with pytest.raises(ValueError):
+        parse_int_range(value, charset_lenghts)
+
+
+def test_save_npy_leaves_mapped_files_alone(tmp_path):
+    path = tmp_path / "a.npy"
+    save_npy(path, np.arange(5))
+    mapped = np.load(path, mmap_mode="r")
+    save_npy(path, np.arange(5) * 10)
+    assert mapped.tolist() == [0, 1, 2, 3, 4]
+    assert np.load(path).tolist() == [0, 10, 20, 30, 40]
+    assert [p.name for p in tmp_path.iterdir()] == ["a.npy"]
@@ -0,0 +1,53 @@
+import json
+import numpy as np
+
+
+class ThroughputModel:
+    """Effective speed of a GPU in a SKU, relative to its benchmark speed.
+
+    hashcat --benchmark measures a single GPU with optimized (-O) kernels.
+    In a VM with n GPUs each one keeps scaling ** log2(n) of that (scaling
+    is what's left per doubling), a slice of a GPU (the 1/2 or 1/6 GPU
+    SKUs) keeps fractional of its share, and passwords longer than the
+    optimized kernels handle run on pure kernels at pure of the speed.
+    pure and optimized_max_len are per hashmode, "default" for the rest.
+    The defaults are the old assumptions - linear scaling, benchmark speeds.
+    """
+
+    def __init__(self, scaling=1.0, fractional=1.0, pure=None, optimized_max_len=None):
+        self.scaling = scaling
+        self.fractional = fractional
+        self.pure = {"default": 1.0, **(pure or dict())}
+        self.optimized_max_len = {"default": 31, **(optimized_max_len or dict())}
+
+    @classmethod
+    def load(cls, model_file):
+        with open(model_file) as f:
+            return cls(**json.load(f))
+
+    def gpu_efficiency(self, gpus):
+        """Per-GPU share of the benchmark speed for VMs with gpus GPUs."""
+        gpus = np.asarray(gpus, dtype=np.float64)
+        return np.where(
+            gpus >= 1,
+            self.scaling ** np.log2(np.maximum(gpus, 1)),
+            self.fractional,
+        )
+
+    def _per_mode(self, table, modes):
+        modes = np.asarray(modes)
+        values = [table.get(str(int(m)), table["default"]) for m in modes.ravel()]
+        return np.array(values, dtype=np.float64).reshape(modes.shape)
+
+    def optimized(self, modes, pw_lens):
+        """Whether the optimized kernels take pw_lens long passwords on modes.
+
+        modes and pw_lens broadcast against each other.
+        """
+        max_len = self._per_mode(self.optimized_max_len, modes)
+        return np.asarray(pw_lens) <= max_len
+
+    def kernel_efficiency(self, modes, pw_lens):
+        """Speed factor of the kernel cracking pw_lens long passwords on modes."""
+        pure = self._per_mode(self.pure, modes)
+        return np.where(self.optimized(modes, pw_lens), 1.0, pure)
@@ -1,4 +1,13 @@
+import csv
+import hashlib
+import json
+import logging
+import os
+import re
 import warnings
+from functools import lru_cache
+
+log = logging.getLogger("pwpolicylogger")
 
 card_mapping = {
     "A100": ["A100-PCIE-40GB", "A100-SXM4-40GB"],
@@ -8,7 +17,7 @@ card_mapping = {
     "T4": ["Tesla T4"],
     "A5000": ["NVIDIA RTX A5000"],
     "GTX 1080 Ti": ["GeForce GTX 1080 Ti", "NVIDIA GeForce GTX 1080 Ti"],
-    "RTX 2070": ["GeForce RTX 2070 SUPER", "NVIDIA GeForce RTX 2070 SUPER"],
+    "RTX 2070 SUPER": ["GeForce RTX 2070 SUPER", "NVIDIA GeForce RTX 2070 SUPER"],
     "RTX 2080 Ti": ["GeForce RTX 2080 Ti", "NVIDIA GeForce RTX 2080 Ti"],
     "RTX 3080": ["GeForce RTX 3080", "NVIDIA GeForce RTX 3080"],
     "RTX 3080 Ti": ["GeForce RTX 3080 Ti", "NVIDIA GeForce RTX 3080 Ti"],
@@ -20,15 +29,62 @@ card_mapping = {
 
 cards_list = list(card_mapping.keys())
 
+# fallbacks for names not listed above, first match wins
+card_rules = [
+    (re.compile(r"\bA100\b"), "A100"),
+    (re.compile(r"\bH100\b"), "H100"),
+    (re.compile(r"\bV100\b"), "V100"),
+    (re.compile(r"\bP100\b"), "P100"),
+    (re.compile(r"\bL4\b"), "L4"),
+    (re.compile(r"\bT4\b"), "T4"),
+    (re.compile(r"\bRTX A5000\b"), "A5000"),
+    # only the bare consumer names, Ti/SUPER/Laptop are separate cards and
+    # anything else (LHR, D, ...) stays unmapped rather than mixing speeds
+    (
+        re.compile(
+            r"^(?:NVIDIA )?(?:GeForce )?(RTX|GTX) (\d{4})( Ti)?( SUPER)?( Laptop GPU)?$"
+        ),
+        r"\1 \2\3\4\5",
+    ),
+]
+
+# alias -> card, the card names map to themselves so normalizing is idempotent
+device_index = {alias: c for c in card_mapping for alias in card_mapping[c] + [c]}
 
+
+@lru_cache(maxsize=None)
 def normalize_device(device):
-    if "#" in device:
-        new_dev = device.split(" #")[0]
-    else:
-        new_dev = device
-    for c in card_mapping:
-        if new_dev in card_mapping[c]:
-            return c
+    new_dev = device.split(" #")[0]
+    if new_dev in device_index:
+        return device_index[new_dev]
+    for rule, card in card_rules:
+        m = rule.search(new_dev)
+        if m:
+            return m.expand(card)
+
+
+def normalize_devices(devices):
+    """Normalize a whole pandas column into a categorical.
+
+    Each distinct name is looked up once and the codes are remapped in bulk.
+    Unmapped devices are logged and come back as missing values.
+    """
+    import numpy as np
+    import pandas as pd
+
+    codes, uniques = pd.factorize(devices)
+    mapped = pd.Index([normalize_device(d) for d in uniques], dtype=object)
+    unmapped = sorted({d.split(" #")[0] for d in uniques[mapped.isna()]})
+    if unmapped:
+        log.info(f"Unmapped devices: {unmapped}")
+    categories = mapped.dropna().unique()
+    card_codes = categories.get_indexer(mapped)
+    normalized = np.where(codes >= 0, card_codes[codes], -1)
+    return pd.Series(
+        pd.Categorical.from_codes(normalized, categories=categories),
+        index=devices.index,
+        name=devices.name,
+    )
 
 
 charset_lenghts = {
@@ -49,14 +105,113 @@ charset_chars = {
 
 
 def calculate_policy_size(charset_len, password_len):
-    return pow(float(charset_len), password_len)
+    # exact, floats stop at ~1e308 and lose precision way before that
+    from keyspace import exact_keyspace
+
+    return exact_keyspace(charset_len, password_len)
 
 
 def enrich_cost_time(data, policy_size):
+    from keyspace import cost_time
+
     with warnings.catch_warnings():
         warnings.simplefilter(action="ignore")
-        data["policy_cost"] = policy_size / data["speed"] / 3600 * data["price"]
-        data["policy_time (s)"] = policy_size / data["speed"]
-        data["policy_time (h)"] = policy_size / data["speed"] / 3600
+        policy_cost, policy_time = cost_time(policy_size, data["speed"], data["price"])
+        data["policy_cost"] = policy_cost
+        data["policy_time (s)"] = policy_time
+        data["policy_time (h)"] = policy_time / 3600
 
     return data
+
+
+def parse_int_range(value, names=None):
+    """Parse "8", "6-15" or "0,100,1400-1410" into a list of ints.
+
+    Ranges are inclusive. If names is given (e.g. charset_lenghts), its keys
+    are accepted as aliases for their values. Raises ValueError for anything
+    else, reversed ranges and empty input.
+    """
+
+    def to_int(part):
+        try:
+            return int(part)
+        except ValueError:
+            raise ValueError(f"{part!r} is not an integer") from None
+
+    values = list()
+    for part in str(value).split(","):
+        part = part.strip()
+        if names and part in names:
+            values.append(names[part])
+        elif "-" in part[1:]:
+            start, end = part.split("-", 1)
+            start, end = to_int(start), to_int(end)
+            if end < start:
+                raise ValueError(f"{part!r} is a reversed range")
+            values += list(range(start, end + 1))
+        else:
+            values.append(to_int(part))
+    if not values:
+        raise ValueError(f"No values in {value!r}")
+    return values
+
+
+def load_hashmode_map(hashmode_input_file):
+    hashmode_map = dict()
+    with open(hashmode_input_file) as f:
+        reader = csv.reader(f, delimiter=";")
+        for row in reader:
+            hashmode_map[row[0]] = row[1]
+    return hashmode_map
+
+
+def load_frames(benchmark_input_file, azure_input_file, store_dir=None):
+    """Benchmark (from the compact store, see benchmarks.store) and Azure frames."""
+    import pandas as pd
+    from benchmarks.store import load_store
+    from profiling import stage
+
+    with stage("load benchmarks"):
+        benchmark = load_store(benchmark_input_file, store_dir).frame()
+    with stage("normalize"):
+        benchmark["device"] = normalize_devices(benchmark["device"])
+    with stage("load CSV"):
+        azure_data = pd.read_csv(azure_input_file)
+    return benchmark, azure_data
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def write_atomic(path, write, mode="w"):
+    """Write a file through a temp file next to it and a rename.
+
+    A crash never leaves half a file, and readers that already opened or
+    memory-mapped the old one keep seeing the old contents.
+    """
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, mode) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def write_json(path, data, indent=2):
+    write_atomic(path, lambda f: json.dump(data, f, indent=indent))
+
+
+def save_npy(path, array):
+    """np.save through write_atomic."""
+    import numpy as np
+
+    write_atomic(path, lambda f: np.save(f, array), "wb")
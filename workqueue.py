@@ -0,0 +1,294 @@
+import json
+import logging
+import os
+import shlex
+import socket
+import sqlite3
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+log = logging.getLogger("pwpolicylogger")
+
+schema = """
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY,
+    node TEXT,
+    args TEXT NOT NULL,
+    hash_file TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    progress INTEGER,
+    total INTEGER,
+    started REAL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS chunks_status ON chunks (status, id);
+CREATE TABLE IF NOT EXISTS found (
+    hash TEXT PRIMARY KEY,
+    password TEXT,
+    chunk INTEGER,
+    worker TEXT,
+    at REAL
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+# hashcat exit codes, anything else is an error
+EXIT_CRACKED = 0
+EXIT_EXHAUSTED = 1
+
+
+def load_hashes(hash_file):
+    try:
+        with open(hash_file) as f:
+            return [line.strip() for line in f if line.strip()]
+    except OSError:
+        return list()
+
+
+def split_cracked(line, hashes):
+    """(hash, password) of a hash:password outfile line.
+
+    Both sides can contain ":" (salts, passwords), so the hash is matched
+    against the hash file first.
+    """
+    for h in hashes:
+        if line.startswith(h + ":"):
+            return h, line[len(h) + 1 :]
+    return tuple(line.rsplit(":", 1))
+
+
+class WorkQueue:
+    """sqlite backed queue of hashcat chunks.
+
+    Workers lease a chunk for lease seconds and keep the lease alive while
+    hashcat runs. A chunk whose lease ran out (the worker or its VM died)
+    goes back to pending for the next claim, until max_attempts. Once every
+    hash of the hash file is found the queue is stopped and workers quit.
+    """
+
+    def __init__(self, db_path, max_attempts=3):
+        self.db_path = str(db_path)
+        self.max_attempts = max_attempts
+        # autocommit, transactions are explicit where they matter
+        self.db = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(schema)
+
+    def close(self):
+        self.db.close()
+
+    def add_chunks(self, chunks, hash_file):
+        """Queue (node, args) chunks cracking hash_file."""
+        with self.db:
+            self.db.execute("BEGIN IMMEDIATE")
+            self.db.executemany(
+                "INSERT INTO chunks (node, args, hash_file) VALUES (?, ?, ?)",
+                [(node, json.dumps(args), str(hash_file)) for node, args in chunks],
+            )
+            self.db.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('hashes', ?)",
+                (str(len(load_hashes(hash_file)) or 1),),
+            )
+            self.db.execute("DELETE FROM meta WHERE key = 'stop'")
+
+    def requeue_expired(self, now=None):
+        now = time.time() if now is None else now
+        expired = self.db.execute(
+            "SELECT id, worker FROM chunks WHERE status = 'running' AND lease_until < ?",
+            (now,),
+        ).fetchall()
+        for row in expired:
+            log.warning(
+                f"Lease of chunk {row['id']} ({row['worker']}) expired, requeuing"
+            )
+        self.db.execute(
+            "UPDATE chunks SET status = CASE WHEN attempts + 1 >= ? THEN 'failed' "
+            "ELSE 'pending' END, attempts = attempts + 1, worker = NULL "
+            "WHERE status = 'running' AND lease_until < ?",
+            (self.max_attempts, now),
+        )
+        return len(expired)
+
+    def claim(self, worker, lease):
+        """Lease the next pending chunk, None if there's nothing to do now."""
+        now = time.time()
+        with self.db:
+            self.db.execute("BEGIN IMMEDIATE")
+            if self.stopped():
+                return None
+            self.requeue_expired(now)
+            row = self.db.execute(
+                "SELECT * FROM chunks WHERE status = 'pending' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            self.db.execute(
+                "UPDATE chunks SET status = 'running', worker = ?, lease_until = ?, "
+                "started = ?, progress = NULL WHERE id = ?",
+                (worker, now + lease, now, row["id"]),
+            )
+        return row
+
+    def heartbeat(self, chunk_id, worker, lease, progress=None):
+        """Extend the lease, False if the chunk isn't this worker's anymore."""
+        cur = self.db.execute(
+            "UPDATE chunks SET lease_until = ?, progress = COALESCE(?, progress), "
+            "total = COALESCE(?, total) "
+            "WHERE id = ? AND worker = ? AND status = 'running'",
+            (
+                time.time() + lease,
+                progress[0] if progress else None,
+                progress[1] if progress else None,
+                chunk_id,
+                worker,
+            ),
+        )
+        return cur.rowcount == 1
+
+    def complete(self, chunk_id, worker, cracked=()):
+        """Mark a chunk done and record its (hash, password) pairs."""
+        now = time.time()
+        with self.db:
+            self.db.execute("BEGIN IMMEDIATE")
+            self.db.execute(
+                "UPDATE chunks SET status = 'done', finished = ?, lease_until = NULL "
+                "WHERE id = ? AND worker = ?",
+                (now, chunk_id, worker),
+            )
+            self.db.executemany(
+                "INSERT OR IGNORE INTO found VALUES (?, ?, ?, ?, ?)",
+                [(h, pw, chunk_id, worker, now) for h, pw in cracked],
+            )
+            found = self.db.execute("SELECT COUNT(*) FROM found").fetchone()[0]
+            hashes = self.db.execute(
+                "SELECT value FROM meta WHERE key = 'hashes'"
+            ).fetchone()
+            if found and found >= int(hashes[0] if hashes else 1):
+                log.info("Every hash is cracked, stopping the queue")
+                self.stop()
+
+    def release(self, chunk_id, worker, failed=False):
+        """Give a chunk back (stopped or failed), failures count as attempts."""
+        self.db.execute(
+            "UPDATE chunks SET status = CASE WHEN ? AND attempts + 1 >= ? "
+            "THEN 'failed' ELSE 'pending' END, attempts = attempts + ?, "
+            "worker = NULL, lease_until = NULL WHERE id = ? AND worker = ?",
+            (failed, self.max_attempts, int(failed), chunk_id, worker),
+        )
+
+    def stop(self):
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES ('stop', '1')")
+
+    def stopped(self):
+        return (
+            self.db.execute("SELECT 1 FROM meta WHERE key = 'stop'").fetchone()
+            is not None
+        )
+
+    def unfinished(self):
+        return self.db.execute(
+            "SELECT COUNT(*) FROM chunks WHERE status IN ('pending', 'running')"
+        ).fetchone()[0]
+
+    def counts(self):
+        return dict(
+            self.db.execute("SELECT status, COUNT(*) FROM chunks GROUP BY status")
+        )
+
+    def running(self):
+        return self.db.execute(
+            "SELECT id, node, worker, progress, total, started FROM chunks "
+            "WHERE status = 'running' ORDER BY id"
+        ).fetchall()
+
+    def found(self):
+        return self.db.execute(
+            "SELECT hash, password, chunk, worker FROM found ORDER BY at"
+        ).fetchall()
+
+
+def _read_status(stream, status):
+    # hashcat --status-json prints one JSON object per status update
+    for line in stream:
+        line = line.strip()
+        if line.startswith("{"):
+            try:
+                status["progress"] = json.loads(line).get("progress")
+            except ValueError:
+                pass
+
+
+def run_chunk(queue, chunk, worker, cracker, lease, outdir):
+    """Run the cracker on a leased chunk, heartbeating until it exits."""
+    outfile = Path(outdir) / f"chunk{chunk['id']}.cracked"
+    outfile.unlink(missing_ok=True)
+    cmd = shlex.split(cracker) + json.loads(chunk["args"])
+    cmd += ["-o", str(outfile), "--potfile-disable"]
+    cmd += ["--status", "--status-json", "--status-timer", str(max(1, int(lease / 4)))]
+    log.info(f"{worker} cracking chunk {chunk['id']}: {shlex.join(cmd)}")
+
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    status = dict()
+    reader = threading.Thread(target=_read_status, args=(proc.stdout, status))
+    reader.start()
+    while True:
+        try:
+            code = proc.wait(timeout=lease / 4)
+            break
+        except subprocess.TimeoutExpired:
+            pass
+        if queue.stopped() or not queue.heartbeat(
+            chunk["id"], worker, lease, status.get("progress")
+        ):
+            # found elsewhere, or our lease expired and the chunk moved on
+            proc.terminate()
+            proc.wait()
+            reader.join()
+            queue.release(chunk["id"], worker)
+            return None
+    reader.join()
+
+    if code not in (EXIT_CRACKED, EXIT_EXHAUSTED):
+        log.warning(f"{worker}: cracker exited with {code} on chunk {chunk['id']}")
+        queue.release(chunk["id"], worker, failed=True)
+        return None
+    cracked = list()
+    if outfile.exists():
+        hashes = load_hashes(chunk["hash_file"])
+        with open(outfile) as f:
+            cracked = [split_cracked(line.rstrip("\n"), hashes) for line in f]
+        outfile.unlink()
+    queue.complete(chunk["id"], worker, cracked)
+    return cracked
+
+
+def run_worker(
+    db_path, worker, cracker="hashcat", lease=120, poll=5, outdir=".", max_attempts=3
+):
+    """Crack chunks until the queue is drained or stopped."""
+    queue = WorkQueue(db_path, max_attempts)
+    done = 0
+    try:
+        while not queue.stopped():
+            chunk = queue.claim(worker, lease)
+            if chunk is None:
+                if not queue.unfinished():
+                    break
+                # others are still running, their chunks may come back
+                time.sleep(poll)
+                continue
+            if run_chunk(queue, chunk, worker, cracker, lease, outdir) is not None:
+                done += 1
+    finally:
+        queue.close()
+    return done
+
+
+def worker_name(i):
+    return f"{socket.gethostname()}-{os.getpid()}-{i}"